@@ -1,29 +1,333 @@
 from os import read
-from tle2czmlMaster.tle2czml.tle2czml import create_czml, db_create_czml
-from flask import Flask
+import json
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from tle2czmlMaster.tle2czml.tle2czml import (ORBIT_RING_VERTICES, PAGE_SIZE, REFERENCE_FRAMES,
+                                              TIME_STEP, catalog_number, count_tles,
+                                              create_czml, db_create_czml, deduplicate_tles,
+                                              report_collapsed, select_satellites)
+from tle2czmlMaster.tle2czml import cost, instrumentation
+from flask import Flask, Response, g, request
 from flask_cors import CORS, cross_origin
+import buildQueue
+import documentCache
 import spaceObjectsDataAccess
 
 app = Flask(__name__)
 
 cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
+# the most a single /getData document may take, and whether one over it is degraded to fit
+# or refused; degrade=0 on a request refuses it either way
+app.config['CZML_BUDGET'] = cost.Budget(max_samples=1000000, max_bytes=64 * 10**6)
+app.config['CZML_DEGRADE'] = True
+
+metrics = instrumentation.INSTRUMENTATION
+metrics.describe('http_requests_total', 'HTTP requests handled, by route and status.')
+metrics.describe('http_request_duration_seconds', 'HTTP request latency, by route.')
+metrics.describe('http_requests_in_progress', 'HTTP requests currently being handled.')
+
+# sent with paginated documents, so clients know how many pages to ask for
+PAGE_HEADERS = ['X-Page-Count', 'X-Satellite-Count', 'X-Duplicates-Collapsed']
+# sent with documents degraded to fit the budget, listing what was changed
+DEGRADED_HEADERS = ['X-Degraded']
+# seconds the window /positions fits its ephemeris over, aligned to UTC days
+EPHEMERIS_PERIOD = 24 * 3600
+# the Chebyshev ephemeris /positions evaluates, keyed by the catalog and window it was fitted to
+EPHEMERIS = {}
+# held while the ephemeris is fitted, so concurrent requests fit it once
+EPHEMERIS_LOCK = threading.Lock()
+
+
+@app.before_request
+def start_timing():
+    g.request_started = time.perf_counter()
+    g.timing_token = instrumentation.start_collection()
+    metrics.add_gauge('http_requests_in_progress', 1)
+
+
+def requested_time():
+    'returns the time of ?time=, ISO 8601 and UTC unless it says otherwise, None if not given'
+    value = request.args.get('time')
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def catalog_at(moment):
+    'returns the TLEs in use at moment, those of the current catalog when moment is None'
+    if moment is None:
+        return spaceObjectsDataAccess.retrieve_current_tle_entries()
+    return spaceObjectsDataAccess.retrieve_tles_at(moment)
+
+
+def client():
+    'returns who is asking, so build slots can be shared between clients'
+    return request.access_route[0] if request.access_route else request.remote_addr
+
+
+def queue_full(error):
+    'responds to a build that could not get a slot'
+    return str(error), 503, {'Retry-After': str(buildQueue.MAX_WAIT)}
+
+
+def cached_czml(key, build):
+    'responds with the document cached for key, built by build() when it is not'
+    try:
+        entry = documentCache.DOCUMENTS.get(key, build)
+    except cost.OverBudget as error:
+        return str(error), 422
+    except buildQueue.QueueFull as error:
+        return queue_full(error)
+    if entry is None:
+        return spaceObjectsDataAccess.CONNECTION_ERROR, 503
+    return entry.respond(request)
+
+
+@app.after_request
+def add_server_timing(response):
+    timings = instrumentation.collected()
+    if timings is not None and 'request_started' in g:
+        elapsed = time.perf_counter() - g.request_started
+        timings['total'] = elapsed
+        response.headers['Server-Timing'] = instrumentation.server_timing_header(timings)
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.increment('http_requests_total', route=route,
+                          method=request.method, status=response.status_code)
+        metrics.observe_value('http_request_duration_seconds', elapsed, route=route)
+    return response
+
+
+@app.teardown_request
+def stop_timing(exc):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        instrumentation.stop_collection(token)
+        metrics.add_gauge('http_requests_in_progress', -1)
+
 
 @app.route("/objects")
 @cross_origin()
 def space_objects_tle():
     ##create_czml("C:/Hackathon NASA/data/testData.tle",'C:/Hackathon NASA/data/newCzml.czml')
     #return "dada"
-    tleData=open("C:/Hackathon NASA/data/testData.tle", "r")
+    start_time = documentCache.DOCUMENTS.window_start()
 
-    return db_create_czml(tleData.read())
+    def build():
+        with open("C:/Hackathon NASA/data/testData.tle", "r") as tleData:
+            return documentCache.CachedDocument(
+                db_create_czml(tleData.read(), start_time=start_time, templated=True))
+    return cached_czml(('objects', start_time), build)
 
 @app.route("/getData")
-@cross_origin()
+@cross_origin(expose_headers=PAGE_HEADERS + DEGRADED_HEADERS)
 def converter():
-    result = spaceObjectsDataAccess.retrieve_tle_entries()
-    return db_create_czml(result)
-    
+    reference_frame = request.args.get('frame', 'INERTIAL').upper()
+    if reference_frame not in REFERENCE_FRAMES:
+        return "frame must be one of " + ", ".join(REFERENCE_FRAMES), 400
+    ground_tracks = request.args.get('tracks', '').lower() in ('1', 'true', 'yes')
+    overview = request.args.get('overview', '').lower() in ('1', 'true', 'yes')
+    labels = request.args.get('labels', '').lower() not in ('0', 'false', 'no')
+    orbit_rings = request.args.get('rings', '').lower() in ('1', 'true', 'yes')
+    degrade = app.config['CZML_DEGRADE'] and (
+        request.args.get('degrade', '').lower() not in ('0', 'false', 'no'))
+    try:
+        footprint = request.args.get('footprint')
+        footprint_half_angle = float(footprint) if footprint else None
+        ring_vertices = int(request.args.get('vertices', ORBIT_RING_VERTICES))
+        page = int(request.args['page']) if 'page' in request.args else None
+        page_size = int(request.args.get('page_size', PAGE_SIZE))
+        norad = request.args.get('norad')
+        norad_ids = (tuple(catalog_number(number) for number in norad.split('-', 1))
+                     if norad else None)
+        moment = requested_time()
+    except ValueError:
+        return ("footprint must be a sensor half angle in degrees, vertices, page and page_size "
+                "whole numbers, norad a range of catalog numbers like 25544-A0001 and time "
+                "an ISO 8601 date"), 400
+    if norad_ids is not None and (len(norad_ids) != 2 or norad_ids[0] > norad_ids[1]):
+        return "norad must be a range of catalog numbers like 25544-A0001", 400
+    if (page is not None and page < 0) or not 1 <= page_size <= 10000:
+        return "page must be at least 0 and page_size within [1, 10000]", 400
+    if footprint_half_angle is not None and not 0 < footprint_half_angle < 90:
+        return "footprint must be within (0, 90) degrees", 400
+    if not 3 <= ring_vertices <= 1000:
+        return "vertices must be within [3, 1000]", 400
+    if orbit_rings and ground_tracks:
+        return "rings and tracks cannot be combined", 400
+    options = dict(reference_frame=reference_frame, ground_tracks=ground_tracks,
+                   footprint_half_angle=footprint_half_angle, overview=overview, labels=labels,
+                   orbit_rings=orbit_rings, ring_vertices=ring_vertices, page=page,
+                   page_size=page_size, norad_ids=norad_ids)
+    if moment is None:
+        start_time = documentCache.DOCUMENTS.window_start()
+        catalog = ('current', spaceObjectsDataAccess.PROBE.check())
+    else:
+        # replayed from the element sets nearest the time asked for
+        start_time = moment
+        catalog = ('history', spaceObjectsDataAccess.HISTORY_PROBE.check())
+
+    end_time = start_time + timedelta(hours=24)
+    requester = client()
+
+    def build():
+        result = catalog_at(moment)
+        if result == spaceObjectsDataAccess.CONNECTION_ERROR:
+            return None
+        # collapsed before counting, so pages split the catalog as the document does
+        result, collapsed = deduplicate_tles(result)
+        report_collapsed(collapsed)
+        satellites = count_tles(result)
+        headers = {'X-Page-Count': str(-(-satellites // page_size)),
+                   'X-Satellite-Count': str(satellites),
+                   'X-Duplicates-Collapsed': str(collapsed)}
+        # priced before any work, by the satellites the page or range selects
+        selected = count_tles(result, select_satellites(page, page_size, norad_ids))
+        time_step, fitted, changes = cost.fit(selected, start_time, end_time, TIME_STEP,
+                                              options, app.config['CZML_BUDGET'], degrade)
+        if changes:
+            headers['X-Degraded'] = ', '.join(changes)
+        with buildQueue.BUILDS.slot(requester):
+            document = db_create_czml(result, start_time=start_time, end_time=end_time,
+                                      templated=True, time_step=time_step,
+                                      deduplicate=False, **fitted)
+        return documentCache.CachedDocument(document, headers=headers)
+    return cached_czml(('getData', start_time, degrade) + catalog
+                       + tuple(sorted(options.items())), build)
+
+
+@app.route("/conjunctions")
+@cross_origin()
+def close_approaches():
+    # numpy is only imported once conjunctions are asked for
+    from tle2czmlMaster.tle2czml import conjunctions
+
+    try:
+        threshold = float(request.args.get('threshold', conjunctions.DEFAULT_THRESHOLD / 1000))
+        hours = float(request.args.get('hours', 24))
+        time_step = int(request.args.get('step', conjunctions.DEFAULT_TIME_STEP))
+        moment = requested_time()
+    except ValueError:
+        return ("threshold and hours must be numbers, step a whole number of seconds and time "
+                "an ISO 8601 date"), 400
+    if not (0 < threshold <= 1000 and 0 < hours <= 168 and 1 <= time_step <= 3600):
+        return "threshold must be within (0, 1000] km, hours (0, 168] and step [1, 3600] s", 400
+
+    result = catalog_at(moment)
+    if result == spaceObjectsDataAccess.CONNECTION_ERROR:
+        return result, 503
+    start_time = moment or datetime.now(timezone.utc)
+    try:
+        with buildQueue.BUILDS.slot(client()):
+            found = conjunctions.screen_tles(result, start_time,
+                                             start_time + timedelta(hours=hours),
+                                             threshold * 1000, time_step)
+    except buildQueue.QueueFull as error:
+        return queue_full(error)
+    return Response(json.dumps(found), content_type='application/json')
+
+
+@app.route("/passes")
+@cross_origin()
+def station_passes():
+    # numpy is only imported once passes are asked for
+    from tle2czmlMaster.tle2czml import passes
+
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lon'])
+        altitude = float(request.args.get('alt', 0))
+        hours = float(request.args.get('hours', 24))
+        min_elevation = float(request.args.get('min_elevation', passes.DEFAULT_MIN_ELEVATION))
+        time_step = int(request.args.get('step', passes.DEFAULT_TIME_STEP))
+        moment = requested_time()
+    except KeyError:
+        return "lat and lon are required", 400
+    except ValueError:
+        return ("lat, lon, alt, hours and min_elevation must be numbers, step a whole number "
+                "and time an ISO 8601 date"), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 360 and -500 <= altitude <= 10000
+            and 0 < hours <= 168 and -90 <= min_elevation < 90 and 1 <= time_step <= 3600):
+        return ("lat must be within [-90, 90], lon [-180, 360], alt [-500, 10000] m, "
+                "hours (0, 168], min_elevation [-90, 90) and step [1, 3600] s"), 400
+
+    result = catalog_at(moment)
+    if result == spaceObjectsDataAccess.CONNECTION_ERROR:
+        return result, 503
+    start_time = moment or datetime.now(timezone.utc)
+    try:
+        with buildQueue.BUILDS.slot(client()):
+            found = passes.predict_tles(result, start_time, latitude, longitude, altitude,
+                                        start_time + timedelta(hours=hours), min_elevation,
+                                        time_step)
+    except buildQueue.QueueFull as error:
+        return queue_full(error)
+    return Response(json.dumps(found), content_type='application/json')
+
+
+def ephemeris_window_start(now=None):
+    'returns the start of the EPHEMERIS_PERIOD now, the current time by default, falls in'
+    seconds = (now or datetime.now(timezone.utc)).timestamp()
+    return datetime.fromtimestamp(seconds - seconds % EPHEMERIS_PERIOD, timezone.utc)
+
+
+def fitted_ephemeris(key):
+    '''returns the ephemeris of the (catalog version, window start) key, fitting it unless it
+    was, or None when the catalog cannot be read'''
+    # numpy is only imported once positions are asked for
+    from tle2czmlMaster.tle2czml import chebyshev
+
+    with EPHEMERIS_LOCK:
+        ephemeris = EPHEMERIS.get(key)
+        if ephemeris is not None:
+            return ephemeris
+        result = catalog_at(None)
+        if result == spaceObjectsDataAccess.CONNECTION_ERROR:
+            return None
+        start_time = key[1]
+        with buildQueue.BUILDS.slot(client()):
+            ephemeris = chebyshev.compress_tles(
+                result, start_time, start_time + timedelta(seconds=EPHEMERIS_PERIOD))
+        # fitted once per window, then every time in it is a lookup
+        EPHEMERIS.clear()
+        EPHEMERIS[key] = ephemeris
+    return ephemeris
+
+
+@app.route("/positions")
+@cross_origin()
+def catalog_positions():
+    try:
+        moment = requested_time() or datetime.now(timezone.utc)
+    except ValueError:
+        return "time must be an ISO 8601 date", 400
+    start_time = ephemeris_window_start()
+    if not start_time <= moment <= start_time + timedelta(seconds=EPHEMERIS_PERIOD):
+        return "time must be within the 24 hours from {}".format(start_time.isoformat()), 400
+
+    key = (spaceObjectsDataAccess.PROBE.check(), start_time)
+    ephemeris = EPHEMERIS.get(key)
+    if ephemeris is None:
+        try:
+            ephemeris = fitted_ephemeris(key)
+        except buildQueue.QueueFull as error:
+            return queue_full(error)
+        if ephemeris is None:
+            return spaceObjectsDataAccess.CONNECTION_ERROR, 503
+    found = [{'satellite': name, 'position': None if math.isnan(position[0]) else position}
+             for name, position in zip(ephemeris.names, ephemeris.position_at(moment).tolist())]
+    return Response(json.dumps(found), content_type='application/json')
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
 
 @app.route("/test")
 @cross_origin()
@@ -0,0 +1 @@
+''' performance benchmarks for the TLE to CZML pipeline '''
@@ -0,0 +1,155 @@
+''' checks the document cost model and the build queue that admission control relies on
+
+Estimated sizes must be within ESTIMATE_TOLERANCE of the documents built, documents
+fitted to a budget must then stay within it, the build queue must serve a client that
+arrives behind another one's backlog in turn, and turn builds away once it is full.
+Exits with status 1 if any check fails:
+
+    python -m benchmarks.admission --size 500
+'''
+
+import argparse
+import sys
+import threading
+import time
+from datetime import timedelta
+
+import buildQueue
+from tle2czmlMaster.tle2czml import cost
+from tle2czmlMaster.tle2czml.tle2czml import TIME_STEP, tles_to_czml
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# the estimates measure within 2 percent, the rest is margin for other catalogs
+ESTIMATE_TOLERANCE = 0.05
+OPTIONS = (('plain', {}),
+           ('fixed frame', {'reference_frame': 'FIXED'}),
+           ('overview', {'overview': True, 'labels': False}),
+           ('tracks + footprints', {'ground_tracks': True, 'footprint_half_angle': 30.0}),
+           ('orbit rings', {'orbit_rings': True}))
+
+
+def check_estimates(tles, size, out):
+    'returns whether every estimate was within tolerance of the document built'
+    passed = True
+    for hours, time_step in ((6, 60), (24, TIME_STEP), (72, 900)):
+        end_time = CATALOG_EPOCH + timedelta(hours=hours)
+        for name, options in OPTIONS:
+            estimated = cost.estimate(size, CATALOG_EPOCH, end_time, time_step, **options).size
+            built = len(tles_to_czml(tles, CATALOG_EPOCH, end_time, silent=True,
+                                     time_step=time_step, templated=True, **options))
+            error = estimated / built - 1
+            within = abs(error) <= ESTIMATE_TOLERANCE
+            passed = passed and within
+            out.write('  {:>2} h, {:>3} s step, {:<20} {:8.2f} MB estimated {:+6.1%} {}\n'.format(
+                hours, time_step, name, estimated / 1e6, error, 'ok' if within else 'FAILED'))
+    return passed
+
+
+def check_fit(tles, size, out):
+    'returns whether documents fitted to shrinking budgets stayed within them'
+    passed = True
+    end_time = CATALOG_EPOCH + timedelta(hours=24)
+    full = cost.estimate(size, CATALOG_EPOCH, end_time, TIME_STEP).size
+    for fraction in (0.5, 0.2, 0.05):
+        budget = cost.Budget(max_samples=10**9, max_bytes=int(full * fraction))
+        try:
+            time_step, options, changes = cost.fit(size, CATALOG_EPOCH, end_time, TIME_STEP,
+                                                   {}, budget)
+        except cost.OverBudget:
+            out.write('  budget {:4.0%} of the document refused\n'.format(fraction))
+            continue
+        built = len(tles_to_czml(tles, CATALOG_EPOCH, end_time, silent=True,
+                                 time_step=time_step, templated=True, **options))
+        within = built <= budget.max_bytes * (1 + ESTIMATE_TOLERANCE)
+        passed = passed and within
+        out.write('  budget {:4.0%} of the document: {:<24} {:6.2f} MB of {:6.2f} MB {}\n'.format(
+            fraction, ', '.join(changes), built / 1e6, budget.max_bytes / 1e6,
+            'ok' if within else 'FAILED'))
+    return passed
+
+
+def check_fairness(backlog, out):
+    'returns whether a client arriving behind a backlog was served in turn with it'
+    queue = buildQueue.BuildQueue(workers=1, limit=backlog + 2)
+    finished = []
+    lock = threading.Lock()
+
+    def job(client):
+        with queue.slot(client):
+            time.sleep(0.01)
+            with lock:
+                finished.append(client)
+
+    threads = [threading.Thread(target=job, args=('greedy',)) for _ in range(backlog)]
+    for thread in threads:
+        thread.start()
+    while queue.waiting < backlog - 1:
+        time.sleep(0.001)
+    late = [threading.Thread(target=job, args=('late',)) for _ in range(2)]
+    for thread in late:
+        thread.start()
+    for thread in threads + late:
+        thread.join()
+    turns = [index + 1 for index, client in enumerate(finished) if client == 'late']
+    # first in first out would finish them last, behind the whole backlog
+    fair = max(turns) <= 5
+    out.write('  late client finished {} of {}, behind a backlog of {} {}\n'.format(
+        ' and '.join(str(turn) for turn in turns), len(finished), backlog,
+        'ok' if fair else 'FAILED'))
+    return fair
+
+
+def check_limit(limit, out):
+    'returns whether builds past the running one and limit waiting ones were turned away'
+    queue = buildQueue.BuildQueue(workers=1, limit=limit, max_wait=5)
+    release = threading.Event()
+    turned_away = []
+
+    def job():
+        try:
+            with queue.slot('client'):
+                release.wait()
+        except buildQueue.QueueFull:
+            turned_away.append(True)
+
+    threads = [threading.Thread(target=job) for _ in range(limit + 3)]
+    for thread in threads:
+        thread.start()
+    while queue.waiting + len(turned_away) < limit + 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    bounded = len(turned_away) == 2
+    out.write('  {} builds with 1 running and {} waiting: {} turned away {}\n'.format(
+        limit + 3, limit, len(turned_away), 'ok' if bounded else 'FAILED'))
+    return bounded
+
+
+def run(size, backlog=10, out=sys.stdout):
+    'runs the checks on a catalog of size satellites and returns whether they passed'
+    tles = synthetic_catalog(size)
+    out.write('{} satellites, estimates\n'.format(size))
+    estimated = check_estimates(tles, size, out)
+    out.write('fitted to budgets\n')
+    fitted = check_fit(tles, size, out)
+    out.write('build queue\n')
+    fair = check_fairness(backlog, out)
+    bounded = check_limit(4, out)
+    return estimated and fitted and fair and bounded
+
+
+def main(argv=None):
+    'runs the admission control checks'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=500,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--backlog', type=int, default=10,
+                            help='builds one client queues before another (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.backlog) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+''' times loading a TLE catalog into a SQLite stand-in spaceObjectTle table by batch size
+
+Every load must leave one line 1 and one line 2 row per satellite, loading the catalog
+again, or a file repeating its TLEs, must insert nothing, and loading newer element sets
+must replace the rows of every satellite. Exits with status 1 if any check fails:
+
+    python -m benchmarks.bulk_load --size 50000 --batch-sizes 1 100 1000 10000
+'''
+
+import argparse
+import sys
+from datetime import timedelta
+
+import tleLoader
+from tests.conftest import stand_in
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def run(size, batch_sizes, out=sys.stdout):
+    'loads the catalog with each batch size and returns whether the checks passed'
+    tles = synthetic_catalog(size)
+    out.write('{} satellites\n'.format(size))
+    passed = True
+    for batch_size in batch_sizes:
+        conn = stand_in()
+        report = tleLoader.load_tles(tles, conn, batch_size)
+        rows = conn.execute('SELECT LineNumber, COUNT(*) FROM spaceObjectTle '
+                            'GROUP BY LineNumber').fetchall()
+        loaded = report.inserted == size and rows == [(1, size), (2, size)]
+        again = tleLoader.load_tles(tles + tles, conn, batch_size)
+        idempotent = (again.inserted == 0 and again.stored == again.repeated == size
+                      and conn.execute('SELECT COUNT(*) FROM spaceObjectTle').fetchone()[0]
+                      == 2 * size)
+        conn.close()
+        passed = passed and loaded and idempotent
+        out.write('  batches of {:<6} {:8.3f} s {:8.3f} s inserting {:10.0f} rows/s  '
+                  'reload {:6.3f} s {}\n'.format(
+                      batch_size, report.seconds, report.insert_seconds,
+                      report.rows_per_second(), again.seconds,
+                      'ok' if loaded and idempotent else 'FAILED'))
+
+    conn = stand_in()
+    repeated = tleLoader.load_tles(tles + tles, conn)
+    deduplicated = repeated.inserted == size and repeated.repeated == size
+    out.write('  file repeating every TLE, {} inserted {}\n'.format(
+        repeated.inserted, 'ok' if deduplicated else 'FAILED'))
+
+    newer = tleLoader.load_tles(synthetic_catalog(size, epoch=CATALOG_EPOCH + timedelta(days=2)),
+                                conn)
+    epochs = conn.execute('SELECT COUNT(*), COUNT(DISTINCT NoradCatID) FROM spaceObjectTle '
+                          'WHERE LineNumber = 1').fetchone()
+    rows = conn.execute('SELECT COUNT(*) FROM spaceObjectTle').fetchone()[0]
+    conn.close()
+    replaced = newer.replaced == size and epochs == (size, size) and rows == 2 * size
+    out.write('  newer element sets, {} replaced {:8.3f} s {}\n'.format(
+        newer.replaced, newer.seconds, 'ok' if replaced else 'FAILED'))
+    return passed and deduplicated and replaced
+
+
+def main(argv=None):
+    'runs the bulk load benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=50000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 1000, 10000],
+                            help='TLEs per transaction to compare (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.batch_sizes) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+''' generates synthetic TLE catalogs for benchmarking '''
+
+import random
+from datetime import datetime, timedelta, timezone
+
+# fraction of the catalog in each orbit regime and its mean motion range (revs per day)
+ORBIT_REGIMES = (
+    (0.85, 11.0, 16.2),   # low earth orbit
+    (0.10, 1.8, 2.2),     # medium earth orbit, navigation constellations
+    (0.05, 0.99, 1.01),   # geostationary belt
+)
+CATALOG_EPOCH = datetime(2020, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def checksum(line):
+    'returns the modulo 10 checksum of a TLE line'
+    total = 0
+    for char in line:
+        if char.isdigit():
+            total += int(char)
+        elif char == '-':
+            total += 1
+    return str(total % 10)
+
+
+def format_exponent(value):
+    'formats a value in the TLE assumed decimal point notation, eg 17003-4'
+    if value == 0:
+        return ' 00000-0'
+    sign = '-' if value < 0 else ' '
+    mantissa, exponent = '{:.4e}'.format(abs(value)).split('e')
+    digits = mantissa.replace('.', '')
+    exponent = int(exponent) + 1
+    return '{}{}{}{}'.format(sign, digits, '-' if exponent < 0 else '+', abs(exponent))
+
+
+def tle_epoch(epoch):
+    'formats a datetime as a TLE epoch, YYDDD.DDDDDDDD'
+    start_of_year = datetime(epoch.year, 1, 1, tzinfo=epoch.tzinfo)
+    day_of_year = (epoch - start_of_year).total_seconds() / 86400.0 + 1
+    return '{:02d}{:012.8f}'.format(epoch.year % 100, day_of_year)
+
+
+def make_tle(catalog_number, name, epoch, inclination, raan, eccentricity,
+             argument_of_perigee, mean_anomaly, mean_motion, bstar=0.0):
+    'returns the three lines of a TLE for the given orbital elements'
+    line1 = '1 {:05d}U {:<8} {} {} {} {} 0 {:4d}'.format(
+        catalog_number, '20001A', tle_epoch(epoch), ' .00000000',
+        ' 00000-0', format_exponent(bstar), 999)
+    line2 = '2 {:05d} {:8.4f} {:8.4f} {:07d} {:8.4f} {:8.4f} {:11.8f}{:5d}'.format(
+        catalog_number, inclination, raan, int(round(eccentricity * 1e7)),
+        argument_of_perigee, mean_anomaly, mean_motion, 1)
+    return [name, line1 + checksum(line1), line2 + checksum(line2)]
+
+
+def synthetic_catalog(size, seed=0, epoch=CATALOG_EPOCH):
+    'returns a TLE string with size randomly distributed satellites'
+    rand = random.Random(seed)
+    weights = [regime[0] for regime in ORBIT_REGIMES]
+    lines = []
+    for index in range(size):
+        _, low, high = rand.choices(ORBIT_REGIMES, weights)[0]
+        sat_epoch = epoch - timedelta(hours=rand.uniform(0, 48))
+        lines.extend(make_tle(
+            index + 1, 'SYNTH-{:05d}'.format(index + 1), sat_epoch,
+            inclination=rand.uniform(0.0, 110.0),
+            raan=rand.uniform(0.0, 360.0),
+            eccentricity=rand.uniform(0.0001, 0.02),
+            argument_of_perigee=rand.uniform(0.0, 360.0),
+            mean_anomaly=rand.uniform(0.0, 360.0),
+            mean_motion=rand.uniform(low, high),
+            bstar=rand.uniform(0.0, 5e-4)))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,71 @@
+''' times the spaceObjectTle change probe against a full read, on a SQLite stand-in table
+
+The table is loaded as tleLoader loads it. What the probe must see change is checked by
+tests/test_data_access.py, this only times it:
+
+    python -m benchmarks.catalog_probe --size 20000
+'''
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import spaceObjectsDataAccess
+import tleLoader
+from tests.conftest import SCHEMA
+
+from .catalog import synthetic_catalog
+
+
+def time_call(function, repeat):
+    'returns the result of function() and the mean seconds it took'
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def run(size, repeat=20, out=sys.stdout):
+    'times probing a stand-in table against reading it whole'
+    handle, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(handle)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute(SCHEMA)
+        tleLoader.load_tles(synthetic_catalog(size), conn)
+        conn.close()
+        probe = spaceObjectsDataAccess.CatalogProbe(lambda: sqlite3.connect(path), interval=0)
+
+        def read():
+            'reads the whole stand-in table, as the database path does'
+            with sqlite3.connect(path) as reader:
+                return reader.execute('SELECT * FROM spaceObjectTle').fetchall()
+
+        _, read_seconds = time_call(read, repeat)
+        _, probe_seconds = time_call(probe.check, repeat)
+        out.write('{} satellites, {} rows\n'.format(size, 2 * size))
+        out.write('  full read   {:8.3f} ms\n'.format(read_seconds * 1e3))
+        out.write('  probe       {:8.3f} ms {:6.0f}x cheaper\n'.format(
+            probe_seconds * 1e3, read_seconds / probe_seconds))
+    finally:
+        os.remove(path)
+
+
+def main(argv=None):
+    'runs the change probe benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=20000,
+                            help='number of satellites in the table (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=20,
+                            help='reads and probes timed, the mean is reported '
+                                 '(default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    run(args.size, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+''' compares Chebyshev compressed ephemerides with the dense samples they replace
+
+The catalog is compressed at each tolerance and evaluated on a fine grid, where it must
+stay within the tolerance of SGP4 and be nan only from the minute a satellite decays.
+Its size is set against samples every 300 and 120 seconds, with the error Lagrange
+interpolation between those leaves, and looking every satellite up at a single time
+against propagating them there. Exits with status 1 if any check fails:
+
+    python -m benchmarks.chebyshev --size 2000 --tolerances 1 10 100
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from tle2czmlMaster.tle2czml import chebyshev, ephemeris
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_number_of_positions,
+                                              read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# seconds between the samples compressed ephemerides are checked on
+CHECK_STEP = 10
+# seconds between the dense samples compared against
+DENSE_STEPS = (300, 120)
+LOOKUPS = 20
+
+
+def interpolation_error(satellites, start_time, end_time, time_step):
+    'returns the largest error of Lagrange interpolation halfway between samples time_step apart'
+    grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                    time_step)
+    samples = ephemeris.propagate_catalog(satellites, grid)
+    halfway = TimeGrid(start_time + timedelta(seconds=time_step / 2), len(grid) - 1, time_step)
+    truth = ephemeris.propagate_catalog(satellites, halfway)
+    rows = np.repeat(np.arange(len(satellites)), len(halfway))
+    steps = np.tile(np.arange(len(halfway)), len(satellites))
+    windows, offsets = ephemeris.sample_windows(samples, rows, steps)
+    interpolated = ephemeris.interpolate(windows, offsets + 0.5).reshape(truth.shape)
+    return np.nanmax(np.linalg.norm(interpolated - truth, axis=2))
+
+
+def check_tolerance(satellites, end_time, truth, grid, tolerance, out):
+    'compresses the catalog at tolerance and returns whether it kept to it, and its bytes'
+    started = time.perf_counter()
+    compressed = chebyshev.compress(satellites, CATALOG_EPOCH, end_time, tolerance)
+    fit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    positions = chebyshev.Ephemeris.loads(compressed.dumps()).sample(grid)
+    sample_seconds = time.perf_counter() - started
+
+    both = np.isfinite(positions[..., 0]) & np.isfinite(truth[..., 0])
+    error = np.linalg.norm(positions - truth, axis=2)[both].max(initial=0.0)
+    # a satellite is lost from the start of the shortest segment its decay falls in
+    early = np.isnan(positions[..., 0]) & np.isfinite(truth[..., 0])
+    early_seconds = early.sum(axis=1).max(initial=0) * CHECK_STEP
+    late = np.isfinite(positions[..., 0]) & np.isnan(truth[..., 0])
+    passed = (error <= tolerance and early_seconds <= 2 * chebyshev.MIN_SEGMENT
+              and not late.any())
+    out.write('  {:>6g} m  fit {:6.2f} s  {:6d} segments {:8.2f} MB  sampled every {} s '
+              '{:6.2f} s  {:8.3f} m off, lost {} s early {}\n'.format(
+                  tolerance, fit_seconds, len(compressed.starts), compressed.nbytes / 1e6,
+                  CHECK_STEP, sample_seconds, error, early_seconds,
+                  'ok' if passed else 'FAILED'))
+    return passed, compressed
+
+
+def run(size, tolerances, hours, out=sys.stdout):
+    'compresses the catalog at each tolerance and returns whether the checks passed'
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    end_time = CATALOG_EPOCH + timedelta(hours=hours)
+    out.write('{} satellites over {} hours\n'.format(size, hours))
+    for time_step in DENSE_STEPS:
+        samples = get_number_of_positions(CATALOG_EPOCH, end_time, time_step)
+        out.write('  samples every {} s {:8.2f} MB, interpolated {:8.3f} m off\n'.format(
+            time_step, size * samples * 3 * 8 / 1e6,
+            interpolation_error(satellites, CATALOG_EPOCH, end_time, time_step)))
+
+    grid = TimeGrid(CATALOG_EPOCH, get_number_of_positions(CATALOG_EPOCH, end_time, CHECK_STEP),
+                    CHECK_STEP)
+    truth = ephemeris.propagate_catalog(satellites, grid)
+    passed = True
+    for tolerance in tolerances:
+        kept, compressed = check_tolerance(satellites, end_time, truth, grid, tolerance, out)
+        passed = passed and kept
+
+    moments = [CATALOG_EPOCH + (end_time - CATALOG_EPOCH) * fraction
+               for fraction in np.linspace(0.05, 0.95, LOOKUPS)]
+    started = time.perf_counter()
+    for moment in moments:
+        ephemeris.propagate_catalog(satellites, TimeGrid(moment, 1))
+    propagate_seconds = (time.perf_counter() - started) / LOOKUPS
+    started = time.perf_counter()
+    for moment in moments:
+        compressed.position_at(moment)
+    lookup_seconds = (time.perf_counter() - started) / LOOKUPS
+    out.write('  every satellite at one time: propagated {:7.2f} ms, looked up {:7.2f} ms\n'
+              .format(propagate_seconds * 1000, lookup_seconds * 1000))
+    return passed
+
+
+def main(argv=None):
+    'runs the Chebyshev ephemeris benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--tolerances', type=float, nargs='+', default=[1, 10, 100],
+                            help='metres the ephemerides may be off (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24,
+                            help='length of the window compressed (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.tolerances, args.hours) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+''' times conjunction screening on a large catalog and checks it against brute force
+
+The grid screening of a subset of the catalog must pass on exactly the candidates
+testing every pair does, and the refined approaches must match a dense SGP4 search
+around each closest approach. Exits with status 1 otherwise:
+
+    python -m benchmarks.conjunctions --size 10000
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+from tests.test_conjunctions import (DISTANCE_TOLERANCE, brute_force_screen,
+                                     dense_miss_distance)
+from tle2czmlMaster.tle2czml import conjunctions, ephemeris
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_number_of_positions,
+                                              read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def run(size, hours, time_step, threshold, check_size, out=sys.stdout):
+    'screens the catalog, cross checks a subset and returns whether the checks passed'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+
+    started = time.perf_counter()
+    positions = ephemeris.propagate_catalog(satellites, time_grid)
+    propagate_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    found = conjunctions.find_conjunctions(positions, time_step, threshold)
+    screen_seconds = time.perf_counter() - started
+
+    out.write('{} objects x {} samples, threshold {:g} km\n'.format(
+        size, len(time_grid), threshold / 1000))
+    out.write('  propagate       {:8.3f} s\n'.format(propagate_seconds))
+    out.write('  screen + refine {:8.3f} s  {} conjunctions\n'.format(screen_seconds, len(found)))
+
+    subset = positions[:check_size]
+    started = time.perf_counter()
+    grid = set(zip(*(column.tolist() for column in conjunctions.screen(subset, threshold))))
+    grid_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    brute = brute_force_screen(subset, threshold)
+    brute_seconds = time.perf_counter() - started
+    screened = grid == brute
+    out.write('  {} object subset: grid {:.3f} s, every pair {:.3f} s, {} candidates {}\n'.format(
+        len(subset), grid_seconds, brute_seconds, len(brute),
+        'identical' if screened else 'DIFFER'))
+
+    worst = 0.0
+    for conjunction in found[:20]:
+        worst = max(worst, abs(conjunction.distance -
+                               dense_miss_distance(satellites, time_grid, conjunction)))
+    refined = worst <= DISTANCE_TOLERANCE
+    out.write('  refined miss distances within {:.3f} m of a dense SGP4 search {}\n'.format(
+        worst, 'ok' if refined else 'FAILED'))
+    return screened and refined
+
+
+def main(argv=None):
+    'runs the conjunction benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=10000,
+                            help='number of objects in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=2.0,
+                            help='length of the screened window (default: 2)')
+    arg_parser.add_argument('--step', type=int, default=conjunctions.DEFAULT_TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--threshold', type=float, default=10.0,
+                            help='miss distance screened for in km (default: %(default)s)')
+    arg_parser.add_argument('--check-size', type=int, default=1000,
+                            help='objects cross checked against every pair (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.threshold * 1000,
+                    args.check_size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+''' times ground track and footprint generation and checks it against the converted positions
+
+Every ground track vertex must lie below the satellite's CARTOGRAPHIC position, and
+every build mode must write byte identical documents with coverage on. Exits with
+status 1 if any check fails:
+
+    python -m benchmarks.coverage --size 2000
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from tle2czmlMaster.tle2czml import compact, coverage, ephemeris
+from tle2czmlMaster.tle2czml.tle2czml import (TIME_STEP, Colors, TimeGrid,
+                                              create_converted_positions,
+                                              get_number_of_positions, read_tles, tles_to_czml)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# degrees a ground track vertex may be off the converted position, about 100 metres, as
+# sgp4's C extension and the legacy propagator drift apart by metres for high drag orbits
+TRACK_TOLERANCE = 1e-3
+MODES = (('czml objects', {}),
+         ('compact objects', {'compact': True}),
+         ('templates', {'templated': True}))
+
+
+def check_tracks(satellites, track_lists, start_time, end_time, time_step, time_grid):
+    '''returns the largest difference in degrees between the tracks and converted positions,
+    and how many satellites were skipped for having samples SGP4 could not propagate'''
+    worst = 0.0
+    skipped = 0
+    converted = create_converted_positions(satellites, start_time, end_time, 'CARTOGRAPHIC',
+                                           time_step, time_grid, compact)
+    for position, track in zip(converted, track_lists):
+        samples = np.array(position.cartographicDegrees).reshape(-1, 4)[:, 1:3]
+        vertices = np.array(track or ()).reshape(-1, 3)[:, :2]
+        if len(samples) != len(vertices):
+            skipped += 1
+            continue
+        # longitudes either side of the antimeridian
+        difference = np.abs(samples - vertices)
+        difference[:, 0] = np.minimum(difference[:, 0], 360 - difference[:, 0])
+        worst = max(worst, difference.max())
+    return worst, skipped
+
+
+def run(size, hours, time_step, half_angle, out=sys.stdout):
+    'builds the catalog with coverage in every mode and returns whether the checks passed'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    tles = synthetic_catalog(size)
+    satellites = read_tles(tles, Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+
+    started = time.perf_counter()
+    positions = ephemeris.propagate_catalog(satellites, time_grid)
+    propagate_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    track_lists, radius_lists = coverage.coverage(positions, time_grid, half_angle)
+    coverage_seconds = time.perf_counter() - started
+
+    out.write('{} satellites x {} samples, {:g} degree sensors\n'.format(
+        size, len(time_grid), half_angle))
+    out.write('  propagate           {:8.3f} s\n'.format(propagate_seconds))
+    out.write('  tracks + footprints {:8.3f} s {:8.1f} us/sat\n'.format(
+        coverage_seconds, coverage_seconds * 1e6 / size))
+
+    worst, skipped = check_tracks(satellites, track_lists, start_time, end_time, time_step,
+                                  time_grid)
+    tracked = worst <= TRACK_TOLERANCE
+    out.write('  tracks within {:.2e} degrees of the converted positions, {} decayed skipped '
+              '{}\n'.format(worst, skipped, 'ok' if tracked else 'FAILED'))
+
+    documents = []
+    for name, mode in MODES:
+        started = time.perf_counter()
+        plain = len(tles_to_czml(tles, start_time, end_time, silent=True, time_step=time_step,
+                                 **mode))
+        plain_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        documents.append(tles_to_czml(tles, start_time, end_time, silent=True,
+                                      time_step=time_step, ground_tracks=True,
+                                      footprint_half_angle=half_angle, **mode))
+        seconds = time.perf_counter() - started
+        out.write('  {:<16} {:8.3f} s plain {:8.3f} s with coverage, {:.1f} -> {:.1f} MB\n'.format(
+            name, plain_seconds, seconds, plain / 1e6, len(documents[-1]) / 1e6))
+    identical = all(document == documents[0] for document in documents)
+    out.write('  output {}\n'.format('identical' if identical else 'DIFFERS'))
+    return tracked and identical
+
+
+def main(argv=None):
+    'runs the coverage benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--half-angle', type=float, default=30.0,
+                            help='sensor half angle in degrees (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.half_angle) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
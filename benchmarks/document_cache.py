@@ -0,0 +1,85 @@
+''' times compressing a cached document and serving it, checking the bodies and ETags
+
+Each encoding must decompress to the document, and the same document must get the
+same ETag when cached again. Exits with status 1 if any check fails:
+
+    python -m benchmarks.document_cache --size 2000
+'''
+
+import argparse
+import gzip
+import sys
+import time
+from datetime import timedelta
+
+from flask import Flask
+
+import documentCache
+from tle2czmlMaster.tle2czml.tle2czml import TIME_STEP, tles_to_czml
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+DECOMPRESSORS = {'identity': lambda body: body, 'gzip': gzip.decompress}
+if documentCache.brotli is not None:
+    DECOMPRESSORS['br'] = documentCache.brotli.decompress
+
+
+def time_requests(entry, headers, repeat):
+    'returns the mean seconds entry takes to respond to a request with headers'
+    app = Flask(__name__)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with app.test_request_context(headers=headers) as context:
+            entry.respond(context.request)
+    return (time.perf_counter() - started) / repeat
+
+
+def run(size, hours, time_step, repeat=100, out=sys.stdout):
+    'caches a document of the catalog and returns whether the checks passed'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    document = tles_to_czml(synthetic_catalog(size), start_time, end_time, silent=True,
+                            time_step=time_step, templated=True)
+
+    started = time.perf_counter()
+    entry = documentCache.CachedDocument(document)
+    compress_seconds = time.perf_counter() - started
+    out.write('{} satellites, {:.1f} MB document, compressed in {:.3f} s\n'.format(
+        size, len(entry.bodies['identity']) / 1e6, compress_seconds))
+
+    passed = True
+    for encoding, body in entry.bodies.items():
+        restored = DECOMPRESSORS[encoding](body) == entry.bodies['identity']
+        passed = passed and restored
+        out.write('  {:<9} {:8.2f} MB {:6.1f}x {}\n'.format(
+            encoding, len(body) / 1e6, len(entry.bodies['identity']) / len(body),
+            'ok' if restored else 'FAILED'))
+
+    stable = documentCache.CachedDocument(document).etag('gzip') == entry.etag('gzip')
+    out.write('  ETag stable across builds {}\n'.format('ok' if stable else 'FAILED'))
+    served = time_requests(entry, {'Accept-Encoding': 'gzip, br'}, repeat)
+    not_modified = time_requests(entry, {'Accept-Encoding': 'gzip, br',
+                                         'If-None-Match': '"{}"'.format(entry.etag('gzip'))},
+                                 repeat)
+    out.write('  cached response {:8.1f} us, 304 {:8.1f} us\n'.format(served * 1e6,
+                                                                        not_modified * 1e6))
+    return passed and stable
+
+
+def main(argv=None):
+    'runs the document cache benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=100,
+                            help='requests timed, the mean is reported (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.repeat) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
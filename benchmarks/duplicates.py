@@ -0,0 +1,87 @@
+''' times documents of a catalog repeating its satellites, with and without deduplication
+
+The catalog is given with an older element set of every satellite in front of it and
+part of it repeated after it. Deduplicated, the document must be the one of the catalog
+alone, with one packet per satellite; without deduplication, satellites repeating the
+same TLE lines must share their samples instead of being propagated again. Exits with
+status 1 if any check fails:
+
+    python -m benchmarks.duplicates --size 2000 --repeated 0.5
+'''
+
+import argparse
+import json
+import sys
+import time
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml import instrumentation
+from tle2czmlMaster.tle2czml.tle2czml import deduplicate_tles, tles_to_czml
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+SHARED_METRIC = 'tle2czml_propagations_shared_total'
+
+
+def build(tles, hours, deduplicate):
+    'returns the templated document of tles, seconds taken and propagations shared'
+    shared = instrumentation.INSTRUMENTATION.snapshot()['counters'].get(SHARED_METRIC, 0)
+    started = time.perf_counter()
+    document = tles_to_czml(tles, CATALOG_EPOCH, CATALOG_EPOCH + timedelta(hours=hours),
+                            silent=True, templated=True, deduplicate=deduplicate)
+    seconds = time.perf_counter() - started
+    shared = instrumentation.INSTRUMENTATION.snapshot()['counters'].get(SHARED_METRIC, 0) - shared
+    return document, seconds, shared
+
+
+def packet_ids(document):
+    'returns the ids of the satellite packets of a document'
+    return [packet['id'] for packet in json.loads(document)[1:]]
+
+
+def run(size, repeated, hours, out=sys.stdout):
+    'builds the documents and returns whether the checks passed'
+    tles = synthetic_catalog(size)
+    older = synthetic_catalog(size, epoch=CATALOG_EPOCH - timedelta(days=2))
+    repeats = ''.join(tles.splitlines(True)[:3 * int(size * repeated)])
+    given = older + tles + repeats
+    out.write('{} satellites given {} times over\n'.format(size, given.count('\n') // 3 / size))
+
+    started = time.perf_counter()
+    _, collapsed = deduplicate_tles(given)
+    dedup_seconds = time.perf_counter() - started
+    counted = collapsed == given.count('\n') // 3 - size
+    out.write('  deduplicate_tles     {:7.3f} s  {} collapsed {}\n'.format(
+        dedup_seconds, collapsed, 'ok' if counted else 'FAILED'))
+
+    expected, catalog_seconds, _ = build(tles, hours, True)
+    document, seconds, _ = build(given, hours, True)
+    ids = packet_ids(document)
+    identical = document == expected and len(set(ids)) == len(ids) == size
+    out.write('  catalog alone        {:7.3f} s\n'.format(catalog_seconds))
+    out.write('  deduplicated         {:7.3f} s  {} packets, same document {}\n'.format(
+        seconds, len(ids), 'ok' if identical else 'FAILED'))
+
+    document, seconds, shared = build(tles + repeats, hours, False)
+    ids = packet_ids(document)
+    memoized = shared == repeats.count('\n') // 3 and len(ids) == size + shared
+    out.write('  repeats kept         {:7.3f} s  {} packets, {} sharing samples {}\n'.format(
+        seconds, len(ids), shared, 'ok' if memoized else 'FAILED'))
+    return counted and identical and memoized
+
+
+def main(argv=None):
+    'runs the duplicates benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of distinct satellites (default: %(default)s)')
+    arg_parser.add_argument('--repeated', type=float, default=0.5,
+                            help='fraction of the catalog repeated after it (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24,
+                            help='length of the document window (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.repeated, args.hours) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+''' times choosing each satellite's element set nearest a time in SQL, on a SQLite stand-in
+
+A history of element sets a few days apart is loaded, and for times across it the query
+must choose the same element set per satellite as a search of the whole history does,
+leaving out satellites with none within the allowed gap. Exits with status 1 if any
+choice differs:
+
+    python -m benchmarks.epoch_selection --size 5000 --epochs 20
+'''
+
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import timedelta
+
+import spaceObjectsDataAccess
+import tleLoader
+from tests.conftest import Connection
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# days between the element sets of each satellite
+EPOCH_SPACING = 3
+
+
+def nearest_in_python(history, moment, max_gap):
+    'returns the tles the query should, choosing from the whole history in Python'
+    seconds = moment.timestamp()
+    gap = timedelta(days=max_gap).total_seconds()
+    best = {}
+    for norad, epoch_time, name, line1, line2 in history:
+        if abs(epoch_time - seconds) > gap:
+            continue
+        rank = (abs(epoch_time - seconds), epoch_time)
+        if norad not in best or rank < best[norad][0]:
+            best[norad] = (rank, '{}\n{}\n{}\n'.format(name, line1, line2))
+    return ''.join(best[norad][1] for norad in sorted(best))
+
+
+def run(size, epochs, max_gap, out=sys.stdout):
+    'loads a history and returns whether the query chose as the whole history search did'
+    conn = sqlite3.connect(':memory:')
+    spaceObjectsDataAccess.create_history_table(conn)
+    for index in range(epochs):
+        # the same satellites, each element set a few days after the last
+        tles = synthetic_catalog(size, epoch=CATALOG_EPOCH + timedelta(days=EPOCH_SPACING * index))
+        tleLoader.load_tles(tles, conn, history=True)
+    out.write('{} satellites x {} element sets\n'.format(size, epochs))
+
+    span = timedelta(days=EPOCH_SPACING * epochs)
+    moments = [CATALOG_EPOCH + span * fraction for fraction in (-0.5, 0.0, 0.25, 0.5, 1.0)]
+    moments.append(CATALOG_EPOCH + span + timedelta(days=max_gap + 1))
+    passed = True
+    for moment in moments:
+        started = time.perf_counter()
+        chosen = spaceObjectsDataAccess.retrieve_tles_at(moment, lambda: Connection(conn),
+                                                          max_gap, limit=None)
+        query_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        history = conn.execute('SELECT NoradCatID, EpochTime, Name, Line1, Line2 '
+                               'FROM spaceObjectTleHistory').fetchall()
+        expected = nearest_in_python(history, moment, max_gap)
+        python_seconds = time.perf_counter() - started
+        matched = chosen == expected
+        passed = passed and matched
+        out.write('  {:%Y-%m-%d %H:%M}  query {:6d} rows {:7.3f} s, whole history in Python '
+                  '{:7d} rows {:7.3f} s {}\n'.format(
+                      moment, chosen.count('\n') // 3, query_seconds, len(history),
+                      python_seconds, 'ok' if matched else 'FAILED'))
+    conn.close()
+    return passed
+
+
+def main(argv=None):
+    'runs the epoch selection benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=5000,
+                            help='number of satellites in the history (default: %(default)s)')
+    arg_parser.add_argument('--epochs', type=int, default=20,
+                            help='element sets per satellite (default: %(default)s)')
+    arg_parser.add_argument('--max-gap', type=float,
+                            default=spaceObjectsDataAccess.MAX_EPOCH_GAP,
+                            help='days an element set may be from the time (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.epochs, args.max_gap) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+''' checks the vectorized TEME to geodetic conversion against the scalar reference
+
+The reference and tolerances are those of tests/test_frames.py, checked here over a larger
+catalog and timed. Exits with status 1 when any sample differs by more than the tolerances:
+
+    python -m benchmarks.frames_accuracy --size 500
+'''
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from tests.test_frames import (ANGLE_TOLERANCE_DEGREES, HEIGHT_TOLERANCE_METRES, catalog_samples,
+                               teme_to_geodetic_reference)
+from tle2czmlMaster.tle2czml import frames
+
+
+def run(size, hours, out=sys.stdout):
+    'returns the largest angle and height errors over the catalog'
+    samples, julian_dates = catalog_samples(size, hours)
+
+    started = time.perf_counter()
+    converted = frames.teme_samples_to_cartographic(samples, julian_dates)
+    vectorized_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reference = np.empty_like(samples)
+    for sat_index in range(len(samples)):
+        for time_index, julian_date in enumerate(julian_dates):
+            reference[sat_index, time_index, 1:] = teme_to_geodetic_reference(
+                samples[sat_index, time_index, 1:], julian_date)
+    scalar_seconds = time.perf_counter() - started
+
+    longitude_error = np.abs((converted[..., 1] - reference[..., 1] + 180.0) % 360.0 - 180.0)
+    latitude_error = np.abs(converted[..., 2] - reference[..., 2])
+    height_error = np.abs(converted[..., 3] - reference[..., 3])
+    angle_error = max(longitude_error.max(), latitude_error.max())
+
+    out.write('{} satellites x {} samples\n'.format(len(samples), len(julian_dates)))
+    out.write('  max longitude error {:.3e} deg\n'.format(longitude_error.max()))
+    out.write('  max latitude error  {:.3e} deg\n'.format(latitude_error.max()))
+    out.write('  max height error    {:.3e} m\n'.format(height_error.max()))
+    out.write('  vectorized {:.4f} s, scalar {:.4f} s ({:.0f}x)\n'.format(
+        vectorized_seconds, scalar_seconds, scalar_seconds / vectorized_seconds))
+    return angle_error, height_error.max()
+
+
+def main(argv=None):
+    'runs the accuracy check'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=200,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    args = arg_parser.parse_args(argv)
+    angle_error, height_error = run(args.size, args.hours)
+    if angle_error > ANGLE_TOLERANCE_DEGREES or height_error > HEIGHT_TOLERANCE_METRES:
+        sys.stderr.write('conversion error exceeds tolerance\n')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
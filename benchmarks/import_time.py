@@ -0,0 +1,68 @@
+''' measures the cold import time of the tle2czml package and enforces a budget
+
+Each sample imports the package in a fresh interpreter. Exits with status 1 when
+the median exceeds the budget, or when a dependency that should only be imported
+on first use is pulled in at import time:
+
+    python -m benchmarks.import_time --budget 75
+'''
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+PACKAGE = 'tle2czmlMaster.tle2czml'
+DEFAULT_BUDGET_MS = 75.0
+# dependencies only needed by rarely used inputs or output modes
+LAZY_MODULES = ('dateutil', 'numpy', 'pkg_resources', 'pygeoif', 'pytz')
+
+
+def import_time_ms(module=PACKAGE):
+    'returns the cumulative import time of module in a fresh interpreter, in milliseconds'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    for line in reversed(result.stderr.splitlines()):
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000.0
+    raise RuntimeError('no import time reported for ' + module)
+
+
+def eagerly_imported(module=PACKAGE, lazy_modules=LAZY_MODULES):
+    'returns the lazy dependencies that importing module loads anyway'
+    script = ('import sys, {}; print(" ".join(sorted(set(name.split(".")[0] '
+              'for name in sys.modules))))').format(module)
+    result = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    loaded = set(result.stdout.split())
+    return [name for name in lazy_modules if name in loaded]
+
+
+def main(argv=None):
+    'runs the import time benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--samples', type=int, default=7,
+                            help='fresh interpreters to time (default: %(default)s)')
+    arg_parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS,
+                            help='largest allowed median in milliseconds (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+
+    samples = [import_time_ms() for _ in range(args.samples)]
+    median = statistics.median(samples)
+    print('import {}: median {:.1f} ms, min {:.1f} ms, max {:.1f} ms, budget {:.1f} ms'.format(
+        PACKAGE, median, min(samples), max(samples), args.budget))
+
+    failed = False
+    if median > args.budget:
+        sys.stderr.write('import time exceeds the budget\n')
+        failed = True
+    eager = eagerly_imported()
+    if eager:
+        sys.stderr.write('imported eagerly: {}\n'.format(', '.join(eager)))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+''' compares tles_to_czml throughput with debug logging written to stdout and gated off
+
+The stdout run reproduces the per-satellite diagnostics tles_to_czml used to print
+unconditionally. Pipe stdout somewhere realistic to see the cost under a process
+manager, the report itself is written to stderr:
+
+    python -m benchmarks.logging_overhead --size 10000 > /tmp/log.txt
+'''
+
+import argparse
+import logging
+import sys
+import time
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml.tle2czml import LOGGER, tles_to_czml
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def timed_run(tles, start_time, end_time):
+    'returns the seconds taken by a full conversion'
+    started = time.perf_counter()
+    tles_to_czml(tles, start_time=start_time, end_time=end_time)
+    return time.perf_counter() - started
+
+
+def run(size, hours, out=sys.stderr):
+    'converts the catalog with logging to stdout and then gated off'
+    tles = synthetic_catalog(size)
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+
+    handler = logging.StreamHandler(sys.stdout)
+    previous_level = LOGGER.level
+    LOGGER.addHandler(handler)
+    try:
+        LOGGER.setLevel(logging.DEBUG)
+        verbose = timed_run(tles, start_time, end_time)
+        LOGGER.setLevel(logging.WARNING)
+        gated = timed_run(tles, start_time, end_time)
+    finally:
+        LOGGER.removeHandler(handler)
+        LOGGER.setLevel(previous_level)
+
+    out.write('{} satellites, {}h window\n'.format(size, hours))
+    out.write('  debug logging to stdout {:8.2f} s {:10.1f} sat/s\n'.format(verbose, size / verbose))
+    out.write('  debug logging gated off {:8.2f} s {:10.1f} sat/s\n'.format(gated, size / gated))
+    out.write('  speedup                 {:8.2f}x\n'.format(verbose / gated))
+    return verbose, gated
+
+
+def main(argv=None):
+    'runs the logging overhead benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=10000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    args = arg_parser.parse_args(argv)
+    run(args.size, args.hours)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
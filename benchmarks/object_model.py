@@ -0,0 +1,104 @@
+''' compares the czml and compact object models on a large document
+
+Builds the same document with both models from samples propagated once up front,
+then reports construction time, retained and peak memory, and serialization time.
+Exits with status 1 if the two models write different JSON:
+
+    python -m benchmarks.object_model --size 10000
+'''
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml import compact, czml
+from tle2czmlMaster.tle2czml.tle2czml import (TIME_STEP, Colors, TimeGrid,
+                                              create_converted_position,
+                                              create_czml_file, create_satellite_packet,
+                                              get_future_sat_positions,
+                                              get_number_of_positions, read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+MODELS = (('czml', czml), ('compact', compact))
+
+
+def build(model, satellites, samples, start_time, end_time, time_step):
+    'returns a document of one packet per satellite built with the model'
+    doc = create_czml_file(start_time, end_time, model)
+    for sat, sat_samples in zip(satellites, samples):
+        # fresh floats for every build, as propagation would produce
+        position = create_converted_position(start_time, [value * 1.0 for value in sat_samples],
+                                             'FIXED', model)
+        doc.packets.append(create_satellite_packet(sat, start_time, end_time, time_step,
+                                                   position, model=model))
+    return doc
+
+
+def measure(model, satellites, samples, start_time, end_time, time_step):
+    'returns build seconds, retained and peak bytes, dumps seconds and the JSON'
+    gc.collect()
+    started = time.perf_counter()
+    doc = build(model, satellites, samples, start_time, end_time, time_step)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    output = doc.dumps()
+    dumps_seconds = time.perf_counter() - started
+    del doc
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        doc = build(model, satellites, samples, start_time, end_time, time_step)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del doc
+    return build_seconds, retained, peak, dumps_seconds, output
+
+
+def run(size, hours, time_step, out=sys.stdout):
+    'builds the document with each model and returns whether the JSON matched'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    samples = [get_future_sat_positions(sat.tle_object, len(time_grid), start_time, time_step,
+                                        time_grid)
+               for sat in satellites]
+
+    out.write('{} packets x {} samples\n'.format(size, len(time_grid)))
+    outputs = []
+    for name, model in MODELS:
+        build_seconds, retained, peak, dumps_seconds, output = measure(
+            model, satellites, samples, start_time, end_time, time_step)
+        outputs.append(output)
+        out.write('  {:<8} build {:7.2f} s  dumps {:7.2f} s  retained {:8.1f} MB  '
+                  'peak {:8.1f} MB\n'.format(name, build_seconds, dumps_seconds,
+                                             retained / 1048576.0, peak / 1048576.0))
+    identical = all(output == outputs[0] for output in outputs)
+    out.write('  output {}\n'.format('identical' if identical else 'DIFFERS'))
+    return identical
+
+
+def main(argv=None):
+    'runs the object model benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=10000,
+                            help='number of packets in the document (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+''' compares static orbit rings with time dynamic paths and checks the ring vertices
+
+Documents are built with paths and with rings of each vertex count, timing the build
+and measuring the size. Ring vertices of a subset are compared with SGP4 itself, and
+every build mode must write byte identical documents. Exits with status 1 if any
+check fails:
+
+    python -m benchmarks.orbit_rings --size 2000 --vertices 30 90 180
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+from sgp4.propagation import sgp4
+
+from tle2czmlMaster.tle2czml.tle2czml import (TIME_STEP, Colors, TimeGrid, create_orbit_rings,
+                                              get_number_of_positions, read_tles, tles_to_czml)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# metres a ring vertex may be off the position SGP4 computes for it
+VERTEX_TOLERANCE = 1.0
+MODES = (('czml objects', {}),
+         ('compact objects', {'compact': True}),
+         ('templates', {'templated': True}))
+
+
+def check_rings(satellites, time_grid, vertices, check_size):
+    'returns the largest distance in metres between ring vertices and SGP4 positions'
+    worst = 0.0
+    subset = satellites[:check_size]
+    for sat, ring in zip(subset, create_orbit_rings(subset, time_grid, vertices)):
+        if ring is None:
+            continue
+        start = time_grid.minutes_since_epoch(sat.tle_object)[0]
+        ring = np.reshape(ring, (-1, 3))
+        for vertex in range(vertices):
+            minutes = start + vertex * sat.orbital_time_in_minutes / vertices
+            expected = np.array(sgp4(sat.tle_object, minutes)[0]) * 1000
+            worst = max(worst, np.linalg.norm(ring[vertex] - expected))
+        # closed on the first vertex
+        worst = max(worst, np.linalg.norm(ring[-1] - ring[0]))
+    return worst
+
+
+def build(tles, start_time, end_time, time_step, mode, **options):
+    'returns the document built with options and the seconds it took'
+    started = time.perf_counter()
+    document = tles_to_czml(tles, start_time, end_time, silent=True, time_step=time_step,
+                            **dict(mode, **options))
+    return document, time.perf_counter() - started
+
+
+def run(size, hours, time_step, vertex_counts, check_size, out=sys.stdout):
+    'builds the catalog with paths and with rings and returns whether the checks passed'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    tles = synthetic_catalog(size)
+    satellites = read_tles(tles, Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+
+    out.write('{} satellites x {} samples, templated\n'.format(size, len(time_grid)))
+    document, seconds = build(tles, start_time, end_time, time_step, {'templated': True})
+    out.write('  {:<18} {:8.3f} s {:8.1f} MB\n'.format('paths', seconds, len(document) / 1e6))
+    passed = True
+    for vertices in vertex_counts:
+        documents = []
+        for name, mode in MODES:
+            document, seconds = build(tles, start_time, end_time, time_step, mode,
+                                      orbit_rings=True, ring_vertices=vertices)
+            documents.append(document)
+        identical = all(document == documents[0] for document in documents)
+        worst = check_rings(satellites, time_grid, vertices, check_size)
+        checked = identical and worst <= VERTEX_TOLERANCE
+        passed = passed and checked
+        out.write('  {:<18} {:8.3f} s {:8.1f} MB  vertices within {:.2e} m, output {} {}\n'.format(
+            '{} vertex rings'.format(vertices), seconds, len(documents[-1]) / 1e6, worst,
+            'identical' if identical else 'DIFFERS', 'ok' if checked else 'FAILED'))
+    return passed
+
+
+def main(argv=None):
+    'runs the orbit ring benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--vertices', type=int, nargs='+', default=[30, 90, 180],
+                            help='ring vertex counts to compare (default: %(default)s)')
+    arg_parser.add_argument('--check-size', type=int, default=100,
+                            help='satellites whose vertices are checked (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.vertices, args.check_size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+''' times paginated documents against the whole catalog and checks the pages add up to it
+
+Every page must start with the document packet, and the satellite packets of all pages
+in order must be those of the whole document. Exits with status 1 if they are not:
+
+    python -m benchmarks.pages --size 5000 --page-size 500
+'''
+
+import argparse
+import json
+import sys
+import time
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml.tle2czml import PAGE_SIZE, TIME_STEP, count_tles, tles_to_czml
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def run(size, hours, time_step, page_size, out=sys.stdout):
+    'builds the catalog whole and page by page and returns whether the pages matched'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    tles = synthetic_catalog(size)
+    pages = -(-count_tles(tles) // page_size)
+
+    started = time.perf_counter()
+    whole = tles_to_czml(tles, start_time, end_time, silent=True, time_step=time_step,
+                         templated=True)
+    whole_seconds = time.perf_counter() - started
+
+    page_seconds = []
+    packets = []
+    document_packets = True
+    for page in range(pages):
+        started = time.perf_counter()
+        document = tles_to_czml(tles, start_time, end_time, silent=True, time_step=time_step,
+                                templated=True, page=page, page_size=page_size)
+        page_seconds.append(time.perf_counter() - started)
+        page_packets = json.loads(document)
+        document_packets = document_packets and page_packets[0]['id'] == 'document'
+        packets.extend(page_packets[1:])
+
+    out.write('{} satellites, {} pages of {}\n'.format(size, pages, page_size))
+    out.write('  whole document    {:8.3f} s\n'.format(whole_seconds))
+    out.write('  first page        {:8.3f} s\n'.format(page_seconds[0]))
+    out.write('  slowest page      {:8.3f} s\n'.format(max(page_seconds)))
+    out.write('  all pages         {:8.3f} s\n'.format(sum(page_seconds)))
+    matched = document_packets and packets == json.loads(whole)[1:]
+    out.write('  pages {} the whole document\n'.format('add up to' if matched else 'DIFFER from'))
+    return matched
+
+
+def main(argv=None):
+    'runs the pagination benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=5000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                            help='satellites per page (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.page_size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
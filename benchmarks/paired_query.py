@@ -0,0 +1,72 @@
+''' times reading the catalog with line 1 and line 2 paired in SQL, on a SQLite stand-in table
+
+The rows are stored in random order, so pairing them by position would fail; every
+satellite read back must have the elements it was loaded with. Exits with status 1 if
+any satellite differs:
+
+    python -m benchmarks.paired_query --size 20000
+'''
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+
+import spaceObjectsDataAccess
+import tleLoader
+from tests.conftest import ELEMENTS, SCHEMA, Connection
+from tle2czmlMaster.tle2czml.tle2czml import Colors, read_tles
+
+from .catalog import synthetic_catalog
+
+
+def read(conn):
+    'returns the whole catalog read from conn and the seconds it took'
+    started = time.perf_counter()
+    tles = spaceObjectsDataAccess.retrieve_tle_entries(lambda: Connection(conn), limit=None)
+    return tles, time.perf_counter() - started
+
+
+def run(size, seed=0, out=sys.stdout):
+    'stores the catalog in random row order, reads it back and returns whether it matched'
+    tles = synthetic_catalog(size)
+    rows = []
+    for sat in read_tles(tles, Colors()):
+        rows.extend(tleLoader.tle_rows(sat.raw_tle))
+    random.Random(seed).shuffle(rows)
+    conn = sqlite3.connect(':memory:')
+    conn.execute(SCHEMA)
+    conn.executemany(tleLoader.INSERT_QUERY, rows)
+    conn.commit()
+
+    _, unindexed_seconds = read(conn)
+    spaceObjectsDataAccess.create_indexes(conn)
+    read_back, seconds = read(conn)
+    conn.close()
+    out.write('{} satellites, {} rows in random order\n'.format(size, len(rows)))
+    out.write('  paired read without index {:8.3f} s\n'.format(unindexed_seconds))
+    out.write('  paired read with index    {:8.3f} s\n'.format(seconds))
+
+    loaded = sorted(read_tles(tles, Colors()), key=lambda sat: sat.tle_object.satnum)
+    read_sats = read_tles(read_back, Colors())
+    differing = sum(
+        any(getattr(a.tle_object, field) != getattr(b.tle_object, field) for field in ELEMENTS)
+        for a, b in zip(loaded, read_sats))
+    matched = len(read_sats) == size and differing == 0
+    out.write('  {} satellites read back, {} differing {}\n'.format(
+        len(read_sats), differing, 'ok' if matched else 'FAILED'))
+    return matched
+
+
+def main(argv=None):
+    'runs the paired query benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=20000,
+                            help='number of satellites in the table (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
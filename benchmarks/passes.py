@@ -0,0 +1,128 @@
+''' times pass prediction over a ground station and checks it against SGP4
+
+Every refined rise and set must sit on the minimum elevation, and every culmination
+away from the window edges must be higher than a second either side of it, as
+computed by SGP4 itself. The passes of a subset are also compared with a dense scan
+of SGP4 elevations. Exits with status 1 if any check fails:
+
+    python -m benchmarks.passes --size 10000
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from tests.test_passes import ELEVATION_TOLERANCE, Elevations
+from tle2czmlMaster.tle2czml import ephemeris, passes
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_number_of_positions,
+                                              read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+# seconds between the elevations of the dense scan
+DENSE_STEP = 5
+# passes checked against SGP4 at their refined times
+CHECKED_PASSES = 200
+
+
+def check_refinement(found, elevation, min_elevation, end):
+    'returns the largest rise or set elevation error and how many culminations were not peaks'
+    worst = 0.0
+    not_peaks = 0
+    for found_pass in found[:CHECKED_PASSES]:
+        for crossing in (found_pass.rise, found_pass.set):
+            if crossing is not None:
+                worst = max(worst, abs(elevation(found_pass.satellite, crossing)[0] -
+                                       min_elevation))
+        culmination = found_pass.culmination
+        if 1 <= culmination <= end - 1:
+            around = elevation(found_pass.satellite, [culmination - 1, culmination,
+                                                      culmination + 1])
+            # geostationary objects barely move, so allow for noise
+            if around[1] < around[[0, 2]].max() - ELEVATION_TOLERANCE:
+                not_peaks += 1
+    return worst, not_peaks
+
+
+def dense_passes(elevation, satellites, end, min_elevation, time_step):
+    'returns (satellite, rise) of the passes lasting over a time step in a dense SGP4 scan'
+    seconds = np.arange(0, end + 1, DENSE_STEP, dtype=float)
+    found = []
+    for index in satellites:
+        above = np.concatenate(([False], elevation(index, seconds) > min_elevation, [False]))
+        change = np.diff(above.astype(np.int8))
+        starts = np.flatnonzero(change == 1)
+        ends = np.flatnonzero(change == -1)
+        for start, stop in zip(starts, ends):
+            if (stop - start) * DENSE_STEP > time_step and start > 0:
+                found.append((index, seconds[start]))
+    return found
+
+
+def run(size, hours, time_step, latitude, longitude, min_elevation, check_size,
+        out=sys.stdout):
+    'predicts the passes of the catalog, checks them and returns whether the checks passed'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    end = (len(time_grid) - 1) * time_step
+
+    started = time.perf_counter()
+    positions = ephemeris.propagate_catalog(satellites, time_grid)
+    propagate_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    found = passes.predict_passes(positions, time_grid, latitude, longitude, 0.0, min_elevation)
+    predict_seconds = time.perf_counter() - started
+
+    out.write('{} objects x {} samples, station {:g}, {:g}, above {:g} degrees\n'.format(
+        size, len(time_grid), latitude, longitude, min_elevation))
+    out.write('  propagate          {:8.3f} s\n'.format(propagate_seconds))
+    out.write('  elevation + refine {:8.3f} s  {} passes\n'.format(predict_seconds, len(found)))
+
+    elevation = Elevations(satellites, time_grid, latitude, longitude, 0.0)
+    worst, not_peaks = check_refinement(found, elevation, min_elevation, end)
+    refined = worst <= ELEVATION_TOLERANCE and not not_peaks
+    out.write('  rise and set within {:.2e} degrees, {} culminations not peaks {}\n'.format(
+        worst, not_peaks, 'ok' if refined else 'FAILED'))
+
+    subset = range(min(check_size, size))
+    predicted = [(found_pass.satellite, found_pass.rise) for found_pass in found
+                 if found_pass.satellite < len(subset) and found_pass.rise is not None]
+    missed = [(index, rise) for index, rise in dense_passes(elevation, subset, end,
+                                                            min_elevation, time_step)
+              if not any(index == other and abs(rise - other_rise) <= DENSE_STEP
+                         for other, other_rise in predicted)]
+    out.write('  {} object subset: {} passes over a time step long missed {}\n'.format(
+        len(subset), len(missed), 'ok' if not missed else 'FAILED'))
+    return refined and not missed
+
+
+def main(argv=None):
+    'runs the pass prediction benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=10000,
+                            help='number of objects in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the predicted window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=passes.DEFAULT_TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--lat', type=float, default=52.23,
+                            help='station latitude in degrees (default: %(default)s)')
+    arg_parser.add_argument('--lon', type=float, default=21.01,
+                            help='station longitude in degrees (default: %(default)s)')
+    arg_parser.add_argument('--min-elevation', type=float, default=10.0,
+                            help='elevation passes must rise above (default: %(default)s)')
+    arg_parser.add_argument('--check-size', type=int, default=50,
+                            help='objects compared with a dense SGP4 scan (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.lat, args.lon, args.min_elevation,
+                    args.check_size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+''' times each stage of the TLE to CZML pipeline on synthetic catalogs
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline --sizes 100 1000
+    python -m benchmarks.pipeline --json results.json
+    python -m benchmarks.pipeline --sizes 10000 --overview --no-labels
+'''
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml.tle2czml import (TIME_STEP, Colors, TimeGrid, create_czml_file,
+                                              create_path, create_satellite_packet,
+                                              get_future_sat_positions, get_interval,
+                                              get_number_of_positions, read_tles,
+                                              tles_to_czml)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+CATALOG_SIZES = (100, 1000, 10000, 50000)
+STAGES = ('read_tles', 'get_future_sat_positions', 'create_path',
+          'create_satellite_packet', 'CZML.dumps')
+
+
+def time_stages(tles, start_time, end_time, time_step, overview=False, labels=True):
+    'returns the seconds spent in each pipeline stage and the document size'
+    timings = {}
+    availability = get_interval(start_time, end_time)
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+
+    started = time.perf_counter()
+    satellites = read_tles(tles, Colors())
+    timings['read_tles'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for sat in satellites:
+        get_future_sat_positions(sat.tle_object, len(time_grid), start_time, time_step,
+                                 time_grid)
+    timings['get_future_sat_positions'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for sat in satellites:
+        create_path(availability, sat, start_time, end_time)
+    timings['create_path'] = time.perf_counter() - started
+
+    doc = create_czml_file(start_time, end_time)
+    started = time.perf_counter()
+    for sat in satellites:
+        doc.packets.append(create_satellite_packet(sat, start_time, end_time, time_step,
+                                                   time_grid=time_grid, overview=overview,
+                                                   labels=labels))
+    timings['create_satellite_packet'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    output = doc.dumps()
+    timings['CZML.dumps'] = time.perf_counter() - started
+
+    return timings, len(output.encode('utf-8'))
+
+
+def peak_memory(tles, start_time, end_time, time_step, overview=False, labels=True):
+    'returns the peak bytes allocated by a full tles_to_czml call'
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tles_to_czml(tles, start_time=start_time, end_time=end_time,
+                     silent=True, time_step=time_step, overview=overview, labels=labels)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(sizes, hours, time_step, measure_memory=True, overview=False, labels=True,
+        out=sys.stdout):
+    'benchmarks every catalog size and returns the results'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    results = []
+
+    for size in sizes:
+        tles = synthetic_catalog(size)
+        timings, output_bytes = time_stages(tles, start_time, end_time, time_step, overview,
+                                            labels)
+        result = {
+            'satellites': size,
+            'hours': hours,
+            'time_step': time_step,
+            'overview': overview,
+            'labels': labels,
+            'stages': timings,
+            'total_seconds': timings['read_tles'] + timings['create_satellite_packet'] +
+                             timings['CZML.dumps'],
+            'output_bytes': output_bytes,
+        }
+        if measure_memory:
+            result['peak_memory_bytes'] = peak_memory(tles, start_time, end_time, time_step,
+                                                      overview, labels)
+        results.append(result)
+        report(result, out)
+
+    return results
+
+
+def report(result, out=sys.stdout):
+    'prints the timings for one catalog size'
+    out.write('{} satellites, {}h window, {}s step{}{}\n'.format(
+        result['satellites'], result['hours'], result['time_step'],
+        ', overview' if result['overview'] else '', '' if result['labels'] else ', no labels'))
+    for stage in STAGES:
+        seconds = result['stages'][stage]
+        out.write('  {:<26} {:10.3f} s {:12.1f} us/sat\n'.format(
+            stage, seconds, seconds * 1e6 / result['satellites']))
+    out.write('  {:<26} {:10.3f} s\n'.format('end to end', result['total_seconds']))
+    out.write('  {:<26} {:10.2f} MB\n'.format('output size', result['output_bytes'] / 1048576.0))
+    if 'peak_memory_bytes' in result:
+        out.write('  {:<26} {:10.2f} MB\n'.format(
+            'peak memory', result['peak_memory_bytes'] / 1048576.0))
+
+
+def main(argv=None):
+    'runs the pipeline benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=CATALOG_SIZES,
+                            help='catalog sizes to benchmark (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--no-memory', action='store_true',
+                            help='skip the traced peak memory run')
+    arg_parser.add_argument('--overview', action='store_true',
+                            help='draw satellites as points, without billboards or paths')
+    arg_parser.add_argument('--no-labels', action='store_true',
+                            help='leave out the satellite name labels')
+    arg_parser.add_argument('--json', dest='json_path',
+                            help='also write the results to this file')
+    args = arg_parser.parse_args(argv)
+
+    results = run(args.sizes, args.hours, args.step, measure_memory=not args.no_memory,
+                  overview=args.overview, labels=not args.no_labels)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
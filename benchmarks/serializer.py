@@ -0,0 +1,120 @@
+''' checks the generated serializers against data() and times both
+
+Serializes synthetic catalogs in every reference frame, plus a packet using most of
+the czml classes, with data() and with the serializer module. Exits with status 1
+if any output differs:
+
+    python -m benchmarks.serializer --size 2000
+'''
+
+import argparse
+import json
+import sys
+import time
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml import czml, serializer
+from tle2czmlMaster.tle2czml.tle2czml import (REFERENCE_FRAMES, TIME_STEP, Colors, TimeGrid,
+                                              create_converted_positions, create_czml_file,
+                                              create_satellite_packet, get_number_of_positions,
+                                              read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def assorted_packet(start_time):
+    'returns a packet exercising nested, datetime, delegating and custom data() properties'
+    packet = czml.CZMLPacket(id='assorted')
+    packet.availability = '2020-10-19T12:00:00+00:00/2020-10-20T12:00:00+00:00'
+    packet.description = czml.Description('every property kind')
+    packet.position = czml.Position(epoch=start_time, nextTime=60, cartesian=[1, 2, 3],
+                                    referenceFrame='FIXED')
+    packet.point = czml.Point(show=True, color={'rgba': [255, 0, 0, 255]}, pixelSize=4)
+    packet.orientation = czml.Orientation(unitQuaternion=[0, 0, 0, 1])
+    packet.polyline = czml.Polyline(
+        show=True, width=2, followSurface=False,
+        material={'solidColor': {'color': {'rgba': [0, 255, 0, 255]}}},
+        positions=czml.Positions(cartographicDegrees=[0, 0, 0, 10, 10, 0]))
+    packet.ellipse = czml.Ellipse(semiMajorAxis=1000.0, semiMinorAxis=500.0,
+                                  rotation={'number': [0, 0, 60, 1.5], 'epoch': start_time},
+                                  outlineColor=czml.Color(rgbaf=[0.5, 0.5, 0.5, 1.0]))
+    packet.ellipsoid = czml.Ellipsoid(radii=czml.Radii(cartesian=[1, 1, 1]))
+    packet.cone = czml.Cone(epoch=start_time, innerHalfAngle=0.1, outerHalfAngle=0.5)
+    packet.path = czml.Path(show=True, width=czml.Number(3), resolution={'number': 60},
+                            leadTime=10, trailTime=20)
+    return packet
+
+
+def build_document(satellites, start_time, end_time, time_step, reference_frame):
+    'returns a czml document of every satellite plus the assorted packet'
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    if reference_frame == 'INERTIAL':
+        positions = [None] * len(satellites)
+    else:
+        positions = create_converted_positions(satellites, start_time, end_time,
+                                               reference_frame, time_step, time_grid)
+    doc = create_czml_file(start_time, end_time)
+    for sat, position in zip(satellites, positions):
+        doc.packets.append(create_satellite_packet(sat, start_time, end_time, time_step,
+                                                   position, time_grid))
+    doc.packets.append(assorted_packet(start_time))
+    return doc
+
+
+def timed(function, doc, repeat):
+    'returns the result of function(doc) and the fastest of repeat runs in seconds'
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(doc)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def run(size, hours, time_step, repeat=3, out=sys.stdout):
+    'compares the two serializations in every frame and returns whether all matched'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    identical = True
+
+    for reference_frame in REFERENCE_FRAMES:
+        doc = build_document(satellites, start_time, end_time, time_step, reference_frame)
+        expected, data_seconds = timed(lambda doc: list(doc.data()), doc, repeat)
+        generated, serializer_seconds = timed(serializer.document, doc, repeat)
+        expected_json, data_dumps_seconds = timed(lambda doc: json.dumps(list(doc.data())), doc,
+                                                  repeat)
+        generated_json, serializer_dumps_seconds = timed(serializer.dumps, doc, repeat)
+        matched = generated == expected and generated_json == expected_json
+        identical = identical and matched
+
+        out.write('{} packets, {} frame, output {}\n'.format(
+            len(doc.packets), reference_frame, 'identical' if matched else 'DIFFERS'))
+        out.write('  data()            {:8.3f} s   with json.dumps {:8.3f} s\n'.format(
+            data_seconds, data_dumps_seconds))
+        out.write('  serializer        {:8.3f} s   with json.dumps {:8.3f} s\n'.format(
+            serializer_seconds, serializer_dumps_seconds))
+        out.write('  speedup           {:8.2f}x  {:>24.2f}x\n'.format(
+            data_seconds / serializer_seconds, data_dumps_seconds / serializer_dumps_seconds))
+    return identical
+
+
+def main(argv=None):
+    'runs the serializer check and benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='runs timed, the fastest is reported (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.repeat) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
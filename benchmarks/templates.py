@@ -0,0 +1,89 @@
+''' compares rendering packets from templates with building and serializing objects
+
+Samples are propagated once up front, so only packet construction and encoding are
+timed. Exits with status 1 unless every mode writes byte identical documents:
+
+    python -m benchmarks.templates --size 2000
+'''
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+from tle2czmlMaster.tle2czml import compact, czml, serializer, templates
+from tle2czmlMaster.tle2czml.tle2czml import (TIME_STEP, Colors, TimeGrid,
+                                              create_converted_position, create_czml_file,
+                                              create_satellite_packet,
+                                              get_future_sat_positions,
+                                              get_number_of_positions, read_tles)
+
+from .catalog import CATALOG_EPOCH, synthetic_catalog
+
+
+def object_render(model):
+    'returns a renderer building the document from model objects and serializing it'
+    def render(satellites, sample_lists, start_time, end_time, time_step, time_grid):
+        doc = create_czml_file(start_time, end_time, model)
+        for sat, samples in zip(satellites, sample_lists):
+            position = create_converted_position(start_time, samples, 'FIXED', model)
+            position.referenceFrame = 'INERTIAL'
+            doc.packets.append(create_satellite_packet(sat, start_time, end_time, time_step,
+                                                       position, time_grid, model))
+        return serializer.dumps(doc)
+    return render
+
+
+MODES = (('czml objects', object_render(czml)),
+         ('compact objects', object_render(compact)),
+         ('templates', templates.render_satellites))
+
+
+def run(size, hours, time_step, repeat=3, out=sys.stdout):
+    'renders the catalog in every mode and returns whether the documents matched'
+    start_time = CATALOG_EPOCH
+    end_time = start_time + timedelta(hours=hours)
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    sample_lists = [get_future_sat_positions(sat.tle_object, len(time_grid), start_time,
+                                             time_step, time_grid)
+                    for sat in satellites]
+
+    out.write('{} satellites x {} samples\n'.format(size, len(time_grid)))
+    documents = []
+    baseline = None
+    for name, render in MODES:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            document = render(satellites, sample_lists, start_time, end_time, time_step,
+                              time_grid)
+            seconds = time.perf_counter() - started
+            best = seconds if best is None else min(best, seconds)
+        documents.append(document)
+        baseline = baseline or best
+        out.write('  {:<16} {:8.3f} s {:10.1f} us/sat {:6.2f}x\n'.format(
+            name, best, best * 1e6 / size, baseline / best))
+    identical = all(document == documents[0] for document in documents)
+    out.write('  output {}\n'.format('identical' if identical else 'DIFFERS'))
+    return identical
+
+
+def main(argv=None):
+    'runs the template benchmark'
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--size', type=int, default=2000,
+                            help='number of satellites in the catalog (default: %(default)s)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the propagated window (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: %(default)s)')
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='runs timed, the fastest is reported (default: %(default)s)')
+    args = arg_parser.parse_args(argv)
+    return 0 if run(args.size, args.hours, args.step, args.repeat) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+''' bounds how many documents are generated at once and shares the slots between clients
+
+At most MAX_CONCURRENT_BUILDS builds run together and MAX_QUEUED_BUILDS more wait for a
+slot. Waiting clients are served in turn, each one's builds in the order they came, so
+one client asking for many documents cannot starve the others. Builds that would wait
+past MAX_WAIT seconds, or find the queue full, fail with QueueFull instead.
+'''
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION, stage
+
+MAX_CONCURRENT_BUILDS = 2
+MAX_QUEUED_BUILDS = 16
+MAX_WAIT = 30
+
+INSTRUMENTATION.describe('build_queue_running', 'Document builds currently running.')
+INSTRUMENTATION.describe('build_queue_waiting', 'Document builds waiting for a slot.')
+INSTRUMENTATION.describe('build_queue_rejected_total',
+                         'Document builds turned away, by reason: full or timeout.')
+INSTRUMENTATION.describe('build_queue_wait_seconds', 'Seconds builds waited for a slot.')
+
+
+class QueueFull(RuntimeError):
+    'raised for a build that found the queue full or waited too long for a slot'
+
+
+class BuildQueue:
+    '''
+    Build slots, given to waiting clients in turn
+    '''
+
+    def __init__(self, workers=MAX_CONCURRENT_BUILDS, limit=MAX_QUEUED_BUILDS,
+                 max_wait=MAX_WAIT):
+        self.workers = workers
+        self.limit = limit
+        self.max_wait = max_wait
+        self.running = 0
+        self.waiting = 0
+        # the waiting builds of each client, the clients in the order they are served
+        self.queues = OrderedDict()
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, client):
+        'holds a build slot for client while the block runs, waiting for one if need be'
+        started = time.perf_counter()
+        with stage('queue_wait'):
+            self._acquire(client)
+        INSTRUMENTATION.observe_value('build_queue_wait_seconds', time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.running -= 1
+                self._update_gauges()
+                self._condition.notify_all()
+
+    def _acquire(self, client):
+        'takes a slot for client, once the builds ahead of it have theirs'
+        with self._condition:
+            if self.running < self.workers and not self.waiting:
+                self.running += 1
+                self._update_gauges()
+                return
+            if self.waiting >= self.limit:
+                INSTRUMENTATION.increment('build_queue_rejected_total', reason='full')
+                raise QueueFull('{} builds are already waiting'.format(self.waiting))
+            ticket = object()
+            self.queues.setdefault(client, deque()).append(ticket)
+            self.waiting += 1
+            self._update_gauges()
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.running >= self.workers or self._next() is not ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        INSTRUMENTATION.increment('build_queue_rejected_total', reason='timeout')
+                        raise QueueFull('no build slot within {} s'.format(self.max_wait))
+                    self._condition.wait(remaining)
+            except BaseException:
+                self._leave(client, ticket)
+                # the build behind this one may be next now
+                self._condition.notify_all()
+                raise
+            self._leave(client, ticket)
+            # served, the client waits behind the others for its next build
+            if client in self.queues:
+                self.queues.move_to_end(client)
+            self.running += 1
+            self._update_gauges()
+
+    def _next(self):
+        'returns the ticket served next, the lock must be held'
+        return next(iter(self.queues.values()))[0] if self.queues else None
+
+    def _leave(self, client, ticket):
+        'takes ticket off the queue of client, the lock must be held'
+        queue = self.queues[client]
+        queue.remove(ticket)
+        if not queue:
+            del self.queues[client]
+        self.waiting -= 1
+
+    def _update_gauges(self):
+        'reports the running and waiting builds, the lock must be held'
+        INSTRUMENTATION.set_gauge('build_queue_running', self.running)
+        INSTRUMENTATION.set_gauge('build_queue_waiting', self.waiting)
+
+
+BUILDS = BuildQueue()
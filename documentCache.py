@@ -0,0 +1,162 @@
+''' caches generated documents, compressed once, and serves them by Accept-Encoding and ETag
+
+Documents start at the current time, so each cached one starts at the beginning of
+its CACHE_PERIOD instead and is built at most once per period and set of options.
+Its gzip, and when the brotli package is installed brotli, bodies are compressed
+when it is stored. Responses carry an ETag of the content hash, and requests whose
+If-None-Match still matches are answered 304 without touching the document.
+'''
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from flask import Response
+
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION, stage
+
+# seconds the start of cached documents is aligned to, and so how long each is served
+CACHE_PERIOD = 300
+MAX_ENTRIES = 32
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# encodings in order of preference when a client accepts several equally
+ENCODINGS = ('br', 'gzip', 'identity')
+
+INSTRUMENTATION.describe('document_cache_lookups_total',
+                         'Cached document lookups, by result: hit or miss.')
+INSTRUMENTATION.describe('document_not_modified_total',
+                         'Cached document requests answered 304 Not Modified.')
+INSTRUMENTATION.describe('document_cache_entries', 'Documents currently cached.')
+INSTRUMENTATION.describe('document_cache_bytes', 'Bytes of cached bodies, by encoding.')
+
+
+class CachedDocument:
+    '''
+    A generated document with its compressed bodies and the ETag of each
+    '''
+
+    def __init__(self, body, content_type='application/json', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        # sent with every response, 304s included
+        self.headers = headers or {}
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {'identity': body}
+        with stage('compress'):
+            # mtime=0 so the same document always compresses to the same bytes
+            self.bodies['gzip'] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def etag(self, encoding):
+        'returns the ETag of the body in encoding, unquoted'
+        return self.digest if encoding == 'identity' else '{}-{}'.format(self.digest, encoding)
+
+    def matches(self, if_none_match):
+        'returns whether an If-None-Match header names any encoding of this document'
+        if if_none_match.star_tag:
+            return True
+        return any(if_none_match.contains_weak(self.etag(encoding)) for encoding in self.bodies)
+
+    def respond(self, request):
+        'returns the response to request, 304 when its If-None-Match names this document'
+        encoding = request.accept_encodings.best_match(
+            [encoding for encoding in ENCODINGS if encoding in self.bodies], 'identity')
+        if self.matches(request.if_none_match):
+            INSTRUMENTATION.increment('document_not_modified_total')
+            response = Response(status=304)
+        else:
+            response = Response(self.bodies[encoding], content_type=self.content_type)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.headers.update(self.headers)
+        response.set_etag(self.etag(encoding))
+        response.headers['Vary'] = 'Accept-Encoding'
+        # clients may keep the document but must check it is still current before using it
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+class DocumentCache:
+    '''
+    The most recently used documents, keyed by what they were built from
+    '''
+
+    def __init__(self, max_entries=MAX_ENTRIES, period=CACHE_PERIOD):
+        self.max_entries = max_entries
+        self.period = period
+        self.entries = OrderedDict()
+        # one lock per document being built, so concurrent misses build it once
+        self.building = {}
+        self._lock = threading.Lock()
+
+    def window_start(self, now=None):
+        'returns the start of the cache period now, the current time by default, falls in'
+        now = now or datetime.now(timezone.utc)
+        seconds = now.timestamp()
+        return datetime.fromtimestamp(seconds - seconds % self.period, timezone.utc)
+
+    def get(self, key, build):
+        '''returns the document cached for key, calling build() for a CachedDocument when
+        there is none, or None without caching anything when build() returns None'''
+        with self._lock:
+            entry = self._hit(key)
+            if entry is not None:
+                return entry
+            building = self.building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                entry = self._hit(key)
+            if entry is not None:
+                return entry
+            INSTRUMENTATION.increment('document_cache_lookups_total', result='miss')
+            try:
+                entry = build()
+                if entry is None:
+                    return None
+                with self._lock:
+                    self.entries[key] = entry
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+                    self._update_gauges()
+            finally:
+                with self._lock:
+                    self.building.pop(key, None)
+        return entry
+
+    def clear(self):
+        'drops every cached document'
+        with self._lock:
+            self.entries.clear()
+            self._update_gauges()
+
+    def _hit(self, key):
+        'returns the entry for key marked as most recently used, the lock must be held'
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            INSTRUMENTATION.increment('document_cache_lookups_total', result='hit')
+        return entry
+
+    def _update_gauges(self):
+        'reports the number and size of the entries, the lock must be held'
+        INSTRUMENTATION.set_gauge('document_cache_entries', len(self.entries))
+        sizes = {}
+        for entry in self.entries.values():
+            for encoding, body in entry.bodies.items():
+                sizes[encoding] = sizes.get(encoding, 0) + len(body)
+        for encoding in ENCODINGS:
+            INSTRUMENTATION.set_gauge('document_cache_bytes', sizes.get(encoding, 0),
+                                      encoding=encoding)
+
+
+DOCUMENTS = DocumentCache()
@@ -1,134 +1,277 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
 import mariadb
 
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION, stage
+
+INSTRUMENTATION.describe('db_connections_open', 'Database connections currently open.')
+INSTRUMENTATION.describe('db_connection_errors_total', 'Failed attempts to connect to the database.')
+INSTRUMENTATION.describe('db_rows_read_total', 'Rows read from the spaceObjectTle table.')
+INSTRUMENTATION.describe('db_satellites_unpaired', 'Satellites left out of the last catalog '
+                         'read, stored with several line 2 rows.')
+INSTRUMENTATION.describe('db_probes_total', 'Change probes of the spaceObjectTle table, '
+                         'by result: unchanged, changed or error.')
+INSTRUMENTATION.describe('catalog_version', 'Changes to the spaceObjectTle table seen so far.')
+INSTRUMENTATION.describe('catalog_reads_total', 'Catalog reads, by source: cache or database.')
+
+LOGGER = logging.getLogger(__name__)
+
+DATABASE = dict(user="root", password="root", host="34.116.176.206", port=3306,
+                database="spaceJunk")
+
+# returned by retrieve_tle_entries in place of the TLEs when the database is unreachable
+CONNECTION_ERROR = "Error connecting to the database"
 
-def retrieve_tle_entries():
+# seconds a probe is trusted for before the table is probed again
+PROBE_INTERVAL = 30
+# the line 1 Epoch column as a number growing with time, its two digit years from 57 being
+# the 1900s; line 2 rows keep right ascension in their Epoch column
+EPOCH_ORDER = ("CAST(TRIM(Epoch) AS DOUBLE) "
+               "+ CASE WHEN SUBSTR(TRIM(Epoch), 1, 2) < '57' THEN 100000 ELSE 0 END")
+# changes with any insert, delete or element set replaced, even by one epoch within the
+# range already stored, as the sum of the epochs does; runs on SQLite as well
+PROBE_QUERY = ("SELECT COUNT(*), MAX(epoch), ROUND(SUM(epoch), 4) FROM (SELECT {} AS epoch "
+               "FROM spaceObjectTle WHERE LineNumber = 1) line1").format(EPOCH_ORDER)
+HISTORY_PROBE_QUERY = ("SELECT COUNT(*), MIN(EpochTime), MAX(EpochTime) "
+                       "FROM spaceObjectTleHistory")
+
+
+def connect_database():
+    'returns a connection to the database, counting failures'
     try:
-        conn = mariadb.connect(
-            user="root",
-            password="root",
-            host="34.116.176.206",
-            port=3306,
-            database="spaceJunk"
-        )
-    except mariadb.Error as e:
-        return "Error connecting to the database"
+        with stage('db_connect'):
+            return mariadb.connect(**DATABASE)
+    except mariadb.Error:
+        INSTRUMENTATION.increment('db_connection_errors_total')
+        raise
+
+
+class CatalogProbe:
+    '''
+    Tells whether the spaceObjectTle table changed with one aggregate query, run at most
+    once per interval, and counts the changes seen as the catalog version
+    '''
+
+    def __init__(self, connect=connect_database, interval=PROBE_INTERVAL, query=PROBE_QUERY):
+        self.connect = connect
+        self.interval = interval
+        self.query = query
+        self.signature = None
+        self.version = 0
+        self.checked = None
+        self._lock = threading.Lock()
+
+    def probe(self):
+        'returns the result of the probe query, which changes with the catalog'
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            with stage('db_probe'):
+                cursor.execute(self.query)
+                return tuple(cursor.fetchone())
+        finally:
+            conn.close()
+
+    def check(self, force=False):
+        '''returns the catalog version, probing the table first unless it was probed less than
+        interval seconds ago; a failed probe keeps the version, so callers keep what they have'''
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.checked is not None and now - self.checked < self.interval:
+                return self.version
+            self.checked = now
+            try:
+                signature = self.probe()
+            except Exception as error:
+                LOGGER.warning('Probing spaceObjectTle for changes failed: %s', error)
+                INSTRUMENTATION.increment('db_probes_total', result='error')
+                return self.version
+            if signature == self.signature:
+                INSTRUMENTATION.increment('db_probes_total', result='unchanged')
+                return self.version
+            INSTRUMENTATION.increment('db_probes_total', result='changed')
+            self.signature = signature
+            self.version += 1
+            INSTRUMENTATION.set_gauge('catalog_version', self.version)
+            return self.version
+
+
+PROBE = CatalogProbe()
+HISTORY_PROBE = CatalogProbe(query=HISTORY_PROBE_QUERY)
+# the TLEs last read and the catalog version they were read at
+_catalog = (None, None)
+_catalog_lock = threading.Lock()
+
+
+def retrieve_current_tle_entries(probe=PROBE, retrieve=None):
+    '''returns the TLEs as retrieve_tle_entries does, reading the table again only once
+    probe has seen it change'''
+    global _catalog
+    version = probe.check()
+    with _catalog_lock:
+        read_version, tles = _catalog
+        if tles is not None and read_version == version:
+            INSTRUMENTATION.increment('catalog_reads_total', source='cache')
+            return tles
+        INSTRUMENTATION.increment('catalog_reads_total', source='database')
+        tles = (retrieve or retrieve_tle_entries)()
+        if tles != CONNECTION_ERROR:
+            _catalog = (version, tles)
+        return tles
+
+
+# satellites read, the rows read to pair line 1 and line 2 by parity were limited to 100
+CATALOG_LIMIT = 50
+# one row per satellite, the fields of its newest line 1 row followed by those of its line 2
+# row; nothing ties a line 2 row to its element set, so satellites stored with several, as
+# loads did before a newer set replaced the rows of the older one, are left out
+PAIRED_QUERY = ("SELECT line1.NoradCatID, line1.InternationalDesignator, line1.Epoch, "
+                "line1.Motion, line1.MeanMotion, line1.RadPressureCoef, line1.Element, "
+                "line2.InternationalDesignator, line2.Epoch, line2.Motion, line2.MeanMotion, "
+                "line2.RadPressureCoef, line2.Element "
+                "FROM (SELECT NoradCatID, InternationalDesignator, Epoch, Motion, MeanMotion, "
+                "RadPressureCoef, Element, ROW_NUMBER() OVER (PARTITION BY NoradCatID "
+                "ORDER BY {} DESC) AS newness FROM spaceObjectTle WHERE LineNumber = 1) line1 "
+                "JOIN spaceObjectTle line2 "
+                "ON line2.LineNumber = 2 AND line2.NoradCatID = line1.NoradCatID "
+                "WHERE line1.newness = 1 AND line1.NoradCatID NOT IN ("
+                "SELECT NoradCatID FROM spaceObjectTle WHERE LineNumber = 2 "
+                "GROUP BY NoradCatID HAVING COUNT(*) > 1) "
+                "ORDER BY line1.NoradCatID").format(EPOCH_ORDER)
+# the satellites PAIRED_QUERY leaves out, which loading them again pairs
+UNPAIRED_QUERY = ("SELECT NoradCatID FROM spaceObjectTle WHERE LineNumber = 2 "
+                  "GROUP BY NoradCatID HAVING COUNT(*) > 1 ORDER BY NoradCatID")
+# unpaired satellites named in the warning logged about them
+UNPAIRED_LOGGED = 20
+# lets PAIRED_QUERY walk the line 1 rows in order, look up each line 2 row and count the
+# rows of each satellite, and the loader delete the rows of a satellite it stores a newer
+# element set of
+INDEXES = ("CREATE INDEX IF NOT EXISTS spaceObjectTleLine "
+           "ON spaceObjectTle (LineNumber, NoradCatID)",
+           "CREATE INDEX IF NOT EXISTS spaceObjectTleSatellite "
+           "ON spaceObjectTle (NoradCatID, LineNumber)")
+
 
+# every element set loaded, whole, by catalog number and epoch in seconds since 1970
+HISTORY_TABLE = ("CREATE TABLE IF NOT EXISTS spaceObjectTleHistory ("
+                 "NoradCatID INTEGER NOT NULL, EpochTime DOUBLE NOT NULL, "
+                 "Name VARCHAR(24) NOT NULL, Line1 CHAR(69) NOT NULL, Line2 CHAR(69) NOT NULL, "
+                 "PRIMARY KEY (NoradCatID, EpochTime))",
+                 "CREATE INDEX IF NOT EXISTS spaceObjectTleHistoryEpoch "
+                 "ON spaceObjectTleHistory (EpochTime)")
+# days an element set may be from the requested time and still be used
+MAX_EPOCH_GAP = 30
+# the element set of each satellite nearest a time, the earlier one of two as near
+NEAREST_QUERY = ("SELECT Name, Line1, Line2 FROM ("
+                 "SELECT NoradCatID, Name, Line1, Line2, ROW_NUMBER() OVER ("
+                 "PARTITION BY NoradCatID ORDER BY ABS(EpochTime - ?), EpochTime) AS nearness "
+                 "FROM spaceObjectTleHistory WHERE EpochTime BETWEEN ? AND ?) candidates "
+                 "WHERE nearness = 1 ORDER BY NoradCatID")
+
+
+def create_indexes(conn):
+    'creates the indexes the queries rely on, unless they exist'
+    execute_all(conn, INDEXES)
+
+
+def create_history_table(conn):
+    'creates the spaceObjectTleHistory table and its indexes, unless they exist'
+    execute_all(conn, HISTORY_TABLE)
+
+
+def execute_all(conn, statements):
+    'executes statements and commits them'
     cursor = conn.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    conn.commit()
+
+
+def line1_text(norad, designator, epoch, motion, mean_motion, rad_pressure, element):
+    'returns line 1 of a tle from its columns, padded as the table stores them'
+    return ''.join((
+        '1 ', str(norad), '  ', designator, ' ' if len(designator) == 7 else '  ', ' ',
+        epoch, ' ', motion if motion[0] == '-' else ' ' + motion, ' ',
+        ' ', mean_motion, ' ', rad_pressure if rad_pressure[0] == '-' else ' ' + rad_pressure,
+        ' ', '0 ', ' ' if len(element) == 4 else '', element, ' '))
+
+
+def line2_text(norad, inclination, right_ascension, eccentricity, perigee, mean_anomaly,
+               element):
+    'returns line 2 of a tle from its columns, padded as the table stores them'
+    fields = ['2', str(norad),
+              ' ' + inclination if len(inclination) == 7 else inclination,
+              ' ' + right_ascension if len(right_ascension) == 7 else right_ascension,
+              eccentricity]
+    for angle in (perigee, mean_anomaly):
+        fields.append({7: ' ', 6: '  '}.get(len(angle), '') + angle)
+    text = ' '.join(fields) + ' ' + (' ' if len(element) == 16 else '') + element
+    # counted without separators, a line shorter than 62 characters is filled with 5s
+    size = sum(len(field) for field in fields) + len(element)
+    return text + '5' * max(0, 62 - size) + '  '
 
-    strRes=""
-
-    cursor.execute("SELECT LineNumber \
-                    ,NoradCatID \
-                    , InternationalDesignator \
-                    , Epoch \
-                    , Motion \
-                    , MeanMotion \
-                    , RadPressureCoef \
-                    , IF(LineNumber = 1, 0, Element) \
-                    , IF(LineNumber = 1, Element, '') \
-                    FROM spaceObjectTle LIMIT 100")
-    paritateLinie=0
-    for entry in cursor:
-        ind=0
-        paritateLinie+=1
-        lineSize=0
-        if (paritateLinie%2==1):
-            strRes+="A"
-            strRes+=str(paritateLinie)
-            strRes+="\n"
-        for x in entry:
-            if (paritateLinie%2==1):
-                ind+=1
-                if (ind==1):
-                    strRes+=str(paritateLinie%2)
-                elif(ind==2):
-                    strRes+=str(x)
-                    strRes+=" "
-                elif(ind==3):
-                    strRes+=x
-                    if (len(x)==7):
-                        strRes+=" "
-                    else:
-                        strRes+="  "
-                elif(ind==4):
-                    strRes+=x
-                elif(ind==5):
-                    if (x[0]=='-'):
-                        strRes+=x
-                    else:
-                        strRes+=" "
-                        strRes+=x
-                elif(ind==6):
-                    strRes+=" "
-                    strRes+=x
-                elif(ind==7):
-                    if (x[0]=='-'):
-                        strRes+=x
-                    else:
-                        strRes+=" "
-                        strRes+=x
-                elif(ind==8):
-                    strRes+=x
-                elif(ind==9):
-                    if (len(x)==4):
-                        strRes+=" "
-                    strRes+=x
-            else:
-                ind+=1
-                if (ind==1):
-                    strRes+=str(2)
-                    lineSize+=1
-                elif(ind==2):
-                    strRes+=str(x)
-                    lineSize+=len(str(x))
-                elif(ind==3):
-                    if(len(x)==7):
-                        strRes+=" "
-                        lineSize+=1
-                    strRes+=x
-                    lineSize+=len(x)
-                elif(ind==4):
-                    if (len(x)==7):
-                        strRes+=" "
-                        lineSize+=1
-                    strRes+=x
-                    lineSize+=len(x)
-                elif(ind==5):
-                    strRes+=x
-                    lineSize+=len(x)
-                elif(ind==6):
-                    if (len(x)==7):
-                        strRes+=" "
-                        lineSize+=1
-                    elif(len(x)==6):
-                        strRes+="  "
-                        lineSize+=2
-                    strRes+=x
-                    lineSize+=len(x)
-                elif(ind==7):
-                    if (len(x)==7):
-                        strRes+=" "
-                        lineSize+=1
-                    elif(len(x)==6):
-                        strRes+="  "
-                        lineSize+=2
-                    strRes+=x
-                    lineSize+=len(x)
-                elif(ind==8):
-                    if (len(x)==16):
-                        strRes+=" "
-                    strRes+=x
-                    lineSize+=len(x)
-                    while(lineSize<=61):
-                        lineSize+=1
-                        strRes+='5'
-                    print(lineSize)
-                
-            strRes+=' '
-            
-        strRes+='\n'
-
-    print(strRes)
-    conn.close()
-
-    return strRes
+
+def retrieve_tle_entries(connect=connect_database, limit=CATALOG_LIMIT):
+    '''returns the tles of the first limit satellites by catalog number, all of them if
+    limit is None, with their newest line 1 and their line 2 paired in the query; those
+    stored with several line 2 rows are left out and logged'''
+    try:
+        conn = connect()
+    except mariadb.Error as e:
+        return CONNECTION_ERROR
+    INSTRUMENTATION.add_gauge('db_connections_open', 1)
+    try:
+        cursor = conn.cursor()
+        with stage('db_query'):
+            query = PAIRED_QUERY if limit is None else PAIRED_QUERY + " LIMIT {:d}".format(limit)
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            cursor.execute(UNPAIRED_QUERY)
+            unpaired = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+        INSTRUMENTATION.add_gauge('db_connections_open', -1)
+    INSTRUMENTATION.increment('db_rows_read_total', 2 * len(rows))
+    INSTRUMENTATION.set_gauge('db_satellites_unpaired', len(unpaired))
+    if unpaired:
+        LOGGER.warning('Left out %d satellites stored with several line 2 rows, loading them '
+                       'again pairs them: %s', len(unpaired),
+                       ', '.join(str(norad) for norad in unpaired[:UNPAIRED_LOGGED]))
+
+    with stage('db_assemble'):
+        lines = []
+        for index, row in enumerate(rows):
+            # numbered as the line 1 rows were when rows were paired by parity
+            lines.append('A{}'.format(2 * index + 1))
+            lines.append(line1_text(*row[:7]))
+            lines.append(line2_text(row[0], *row[7:]))
+        tles = '\n'.join(lines) + '\n' if lines else ''
+    LOGGER.debug('Reassembled TLEs:\n%s', tles)
+    return tles
+
+
+def retrieve_tles_at(moment, connect=connect_database, max_gap=MAX_EPOCH_GAP,
+                     limit=CATALOG_LIMIT):
+    '''returns the tles, by catalog number, of the first limit satellites with an element set
+    in spaceObjectTleHistory within max_gap days of moment, each the one nearest it'''
+    try:
+        conn = connect()
+    except mariadb.Error as e:
+        return CONNECTION_ERROR
+    INSTRUMENTATION.add_gauge('db_connections_open', 1)
+    seconds = moment.timestamp()
+    gap = timedelta(days=max_gap).total_seconds()
+    try:
+        cursor = conn.cursor()
+        with stage('db_query'):
+            query = NEAREST_QUERY if limit is None else NEAREST_QUERY + " LIMIT {:d}".format(limit)
+            cursor.execute(query, (seconds, seconds - gap, seconds + gap))
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+        INSTRUMENTATION.add_gauge('db_connections_open', -1)
+    INSTRUMENTATION.increment('db_rows_read_total', len(rows))
+    return ''.join('{}\n{}\n{}\n'.format(*row) for row in rows)
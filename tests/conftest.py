@@ -0,0 +1,83 @@
+''' SQLite stand-ins for the database, shared by the tests and the benchmarks '''
+
+import sqlite3
+
+import pytest
+
+SCHEMA = '''CREATE TABLE spaceObjectTle (id INTEGER PRIMARY KEY, LineNumber INTEGER,
+            NoradCatID TEXT, InternationalDesignator TEXT, Epoch TEXT, Motion TEXT,
+            MeanMotion TEXT, RadPressureCoef TEXT, Element TEXT)'''
+# the indexes spaceObjectsDataAccess.create_indexes makes
+INDEXES = ('CREATE INDEX spaceObjectTleLine ON spaceObjectTle (LineNumber, NoradCatID)',
+           'CREATE INDEX spaceObjectTleSatellite ON spaceObjectTle (NoradCatID, LineNumber)')
+# parsed fields a satellite read back must share with the one loaded
+ELEMENTS = ('satnum', 'epoch', 'inclo', 'nodeo', 'ecco', 'argpo', 'mo', 'no_kozai', 'bstar',
+            'ndot')
+
+
+def stand_in():
+    'returns a connection to an empty, in memory spaceObjectTle table and its indexes'
+    conn = sqlite3.connect(':memory:')
+    for statement in (SCHEMA,) + INDEXES:
+        conn.execute(statement)
+    return conn
+
+
+class Connection:
+    '''
+    Lends a connection to functions which close the connections they make
+    '''
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database():
+    'returns a connection to an empty stand-in spaceObjectTle table'
+    conn = stand_in()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def history_database():
+    'returns a connection to an empty stand-in spaceObjectTleHistory table'
+    access = pytest.importorskip('spaceObjectsDataAccess')
+    conn = sqlite3.connect(':memory:')
+    access.create_history_table(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def connect(database):
+    'returns a function lending the stand-in spaceObjectTle table as a new connection'
+    return lambda: Connection(database)
+
+
+@pytest.fixture
+def elements():
+    'returns a function giving the ELEMENTS of each satellite in a tle string'
+    from tle2czmlMaster.tle2czml.tle2czml import Colors, read_tles
+
+    return lambda tles: [tuple(getattr(sat.tle_object, field) for field in ELEMENTS)
+                         for sat in read_tles(tles, Colors())]
+
+
+@pytest.fixture
+def connect_history(history_database):
+    'returns a function lending the stand-in spaceObjectTleHistory table as a new connection'
+    return lambda: Connection(history_database)
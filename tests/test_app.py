@@ -0,0 +1,211 @@
+''' checks the routes of the Flask app against a catalog standing in for the database '''
+
+import json
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import synthetic_catalog
+from tle2czmlMaster.tle2czml import chebyshev
+
+pytest.importorskip('flask_cors')
+pytest.importorskip('mariadb')
+
+import app  # noqa: E402
+import documentCache  # noqa: E402
+import spaceObjectsDataAccess  # noqa: E402
+from tle2czmlMaster.tle2czml import cost  # noqa: E402
+
+CATALOG_SIZE = 20
+
+
+@pytest.fixture
+def client():
+    'returns a test client of the app'
+    return app.app.test_client()
+
+
+@pytest.fixture
+def unreachable(monkeypatch):
+    'makes every catalog read fail as it does when the database cannot be reached'
+    monkeypatch.setattr(app, 'catalog_at',
+                        lambda moment: spaceObjectsDataAccess.CONNECTION_ERROR)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    '''serves a catalog of CATALOG_SIZE satellites as the current one, and returns it, with no
+    document cached before or after the test'''
+    tles = synthetic_catalog(CATALOG_SIZE, epoch=documentCache.DOCUMENTS.window_start())
+    monkeypatch.setattr(app, 'catalog_at', lambda moment: tles)
+    monkeypatch.setattr(spaceObjectsDataAccess.PROBE, 'check', lambda: 1)
+    documentCache.DOCUMENTS.clear()
+    yield tles
+    documentCache.DOCUMENTS.clear()
+
+
+def test_conjunctions_without_database(client, unreachable):
+    'a database outage is a 503, not an empty list of conjunctions'
+    response = client.get('/conjunctions')
+    assert response.status_code == 503
+    assert response.get_data(as_text=True) == spaceObjectsDataAccess.CONNECTION_ERROR
+
+
+def test_passes_without_database(client, unreachable):
+    'a database outage is a 503, not a station without passes'
+    response = client.get('/passes?lat=52.23&lon=21.01')
+    assert response.status_code == 503
+    assert response.get_data(as_text=True) == spaceObjectsDataAccess.CONNECTION_ERROR
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    '''serves a catalog of 3 satellites at the start of the current ephemeris window, and
+    returns the windows /positions fitted, each taking a moment so requests overlap'''
+    start_time = app.ephemeris_window_start()
+    monkeypatch.setattr(app, 'catalog_at', lambda moment: synthetic_catalog(3, epoch=start_time))
+    monkeypatch.setattr(spaceObjectsDataAccess.PROBE, 'check', lambda: 1)
+    monkeypatch.setattr(app, 'EPHEMERIS', {})
+    fitted = []
+    compress_tles = chebyshev.compress_tles
+
+    def fit(tles, start_time, end_time):
+        fitted.append((start_time, end_time))
+        time.sleep(0.2)
+        return compress_tles(tles, start_time, end_time)
+    monkeypatch.setattr(chebyshev, 'compress_tles', fit)
+    return fitted
+
+
+def positions_at(client, moment):
+    'returns the response of /positions at moment'
+    return client.get('/positions?time=' + moment.isoformat().replace('+00:00', 'Z'))
+
+
+def test_positions_fitted_once_per_day(client, fits):
+    'every time in the day is answered from the ephemeris fitted over the whole of it'
+    start_time = app.ephemeris_window_start()
+    for offset in (timedelta(minutes=1), timedelta(hours=23), timedelta(0)):
+        response = positions_at(client, start_time + offset)
+        assert response.status_code == 200
+        assert len(response.get_json()) == 3
+    assert fits == [(start_time, start_time + timedelta(hours=24))]
+    assert positions_at(client, start_time - timedelta(minutes=1)).status_code == 400
+
+
+def test_positions_fitted_once_for_concurrent_requests(client, fits):
+    'requests arriving while the ephemeris is fitted wait for it instead of fitting it again'
+    start_time = app.ephemeris_window_start()
+    statuses = []
+
+    def request():
+        statuses.append(positions_at(app.app.test_client(), start_time).status_code)
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * 4
+    assert len(fits) == 1
+
+
+def test_over_budget_degraded_to_fit(client, catalog, monkeypatch):
+    'a document over the budget is sampled coarser until it fits, and says so'
+    monkeypatch.setitem(app.app.config, 'CZML_BUDGET',
+                        cost.Budget(max_samples=2000, max_bytes=10**9))
+    response = client.get('/getData')
+    assert response.status_code == 200
+    assert response.headers['X-Degraded'].startswith('step=')
+
+
+def test_over_budget_refused_when_not_degraded(client, catalog, monkeypatch):
+    'with degrade=0, or nothing fitting, the document is refused with the budget it broke'
+    monkeypatch.setitem(app.app.config, 'CZML_BUDGET',
+                        cost.Budget(max_samples=2000, max_bytes=10**9))
+    response = client.get('/getData?degrade=0')
+    assert response.status_code == 422
+    assert 'over the budget of 2000 samples' in response.get_data(as_text=True)
+
+    monkeypatch.setitem(app.app.config, 'CZML_BUDGET', cost.Budget(max_samples=10,
+                                                                   max_bytes=10**9))
+    assert client.get('/getData').status_code == 422
+
+
+def test_duplicates_collapsed_before_counting(client, catalog, monkeypatch):
+    'satellites repeating a catalog number are left out of the counts and the document'
+    repeats = ''.join(catalog.splitlines(True)[:3 * 5])
+    monkeypatch.setattr(app, 'catalog_at', lambda moment: catalog + repeats)
+    response = client.get('/getData?page_size=15')
+    assert response.status_code == 200
+    assert response.headers['X-Duplicates-Collapsed'] == '5'
+    assert response.headers['X-Satellite-Count'] == str(CATALOG_SIZE)
+    assert response.headers['X-Page-Count'] == '2'
+    ids = [packet['id'] for packet in json.loads(response.get_data())[1:]]
+    assert len(set(ids)) == len(ids) == CATALOG_SIZE
+
+
+def satellite_ids(response):
+    'returns the ids of the satellite packets of a document response'
+    return [packet['id'] for packet in json.loads(response.get_data())[1:]]
+
+
+def test_pages_counted_and_concatenated(client, catalog):
+    'every page counts the pages and satellites of the catalog, and together they are its document'
+    whole = client.get('/getData')
+    pages = [client.get('/getData?page={}&page_size=8'.format(page)) for page in range(3)]
+    for response in [whole] + pages:
+        assert response.status_code == 200
+        assert response.headers['X-Satellite-Count'] == str(CATALOG_SIZE)
+    assert whole.headers['X-Page-Count'] == '1'
+    assert [page.headers['X-Page-Count'] for page in pages] == ['3'] * 3
+    assert [packet for page in pages for packet in json.loads(page.get_data())[1:]] == (
+        json.loads(whole.get_data())[1:])
+    assert len({page.headers['ETag'] for page in pages}) == 3
+
+
+@pytest.mark.parametrize('norad, selected', [('3-5', [2, 3, 4]), ('19-A0001', [18, 19, 0]),
+                                             ('A0001-A0001', [0]), ('a0000-z9999', [0]),
+                                             ('21-99999', [])])
+def test_norad_range(client, catalog, monkeypatch, norad, selected):
+    'norad selects an inclusive range of catalog numbers, alpha 5 numbers among them'
+    lines = catalog.splitlines(True)
+    lines[1:3] = [line[:2] + 'A0001' + line[7:] for line in lines[1:3]]
+    monkeypatch.setattr(app, 'catalog_at', lambda moment: ''.join(lines))
+    ids = satellite_ids(client.get('/getData'))
+    response = client.get('/getData?norad=' + norad)
+    assert response.status_code == 200
+    assert response.headers['X-Satellite-Count'] == str(CATALOG_SIZE)
+    assert sorted(satellite_ids(response)) == sorted(ids[index] for index in selected)
+
+
+@pytest.mark.parametrize('norad', ['5', '5-', '-5', '5-3', '3-5-7', 'A01-5', 'I0001-J0000',
+                                   'first-last'])
+def test_malformed_norad_range(client, catalog, norad):
+    'anything but two catalog numbers, the first no greater than the second, is a 400'
+    response = client.get('/getData?norad=' + norad)
+    assert response.status_code == 400
+    assert 'norad' in response.get_data(as_text=True)
+
+
+def test_metrics_exposition(client, unreachable):
+    'requests are timed in Server-Timing and counted, by route and status, at /metrics'
+    response = client.get('/conjunctions')
+    assert response.headers['Server-Timing'].split(', ')[-1].startswith('total;dur=')
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert metrics.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+    lines = metrics.get_data(as_text=True).splitlines()
+    assert '# TYPE http_requests_total counter' in lines
+    assert any(line.startswith('http_requests_total{method="GET",route="/conjunctions",'
+                               'status="503"} ') for line in lines)
+    assert 'http_requests_in_progress 1' in lines
+    buckets = [line for line in lines if line.startswith(
+        'http_request_duration_seconds_bucket{route="/conjunctions",')]
+    assert buckets[-1].startswith('http_request_duration_seconds_bucket{route="/conjunctions",'
+                                  'le="+Inf"} ')
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert 'http_request_duration_seconds_count{{route="/conjunctions"}} {}'.format(
+        counts[-1]) in lines
@@ -0,0 +1,89 @@
+''' checks the build queue sharing slots between clients '''
+
+import threading
+import time
+
+import pytest
+
+import buildQueue
+
+
+class Holder:
+    '''
+    Holds the only slot of a queue until released
+    '''
+
+    def __init__(self, queue):
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=self.hold, args=(queue,))
+        self.thread.start()
+        wait_for(lambda: queue.running == 1)
+
+    def hold(self, queue):
+        with queue.slot('holder'):
+            self.release.wait()
+
+    def stop(self):
+        self.release.set()
+        self.thread.join()
+
+
+def wait_for(condition):
+    'waits until condition() holds, for at most a few seconds'
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_waiting_clients_served_in_turn():
+    'a client asking for several builds does not hold up one asking after it'
+    queue = buildQueue.BuildQueue(workers=1)
+    holder = Holder(queue)
+    served = []
+
+    def build(client):
+        with queue.slot(client):
+            served.append(client)
+    threads = []
+    for client in ('many', 'many', 'many', 'late'):
+        threads.append(threading.Thread(target=build, args=(client,)))
+        threads[-1].start()
+        wait_for(lambda: queue.waiting == len(threads))
+    holder.stop()
+    for thread in threads:
+        thread.join()
+    assert served == ['many', 'late', 'many', 'many']
+
+
+def test_full_queue_turns_builds_away():
+    'a build finding limit builds waiting fails at once'
+    queue = buildQueue.BuildQueue(workers=1, limit=1)
+    holder = Holder(queue)
+
+    def build():
+        with queue.slot('first'):
+            pass
+    waiter = threading.Thread(target=build)
+    waiter.start()
+    wait_for(lambda: queue.waiting == 1)
+    try:
+        with pytest.raises(buildQueue.QueueFull):
+            with queue.slot('second'):
+                pass
+    finally:
+        holder.stop()
+        waiter.join()
+
+
+def test_build_waiting_too_long_turned_away():
+    'a build without a slot within max_wait fails and leaves the queue'
+    queue = buildQueue.BuildQueue(workers=1, max_wait=0.05)
+    holder = Holder(queue)
+    try:
+        with pytest.raises(buildQueue.QueueFull):
+            with queue.slot('client'):
+                pass
+        assert queue.waiting == 0
+    finally:
+        holder.stop()
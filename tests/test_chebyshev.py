@@ -0,0 +1,27 @@
+''' checks the Chebyshev compressed ephemerides '''
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml import chebyshev, ephemeris
+from tle2czmlMaster.tle2czml.tle2czml import Colors, TimeGrid, read_tles
+
+
+@pytest.mark.parametrize('end_time', [CATALOG_EPOCH, CATALOG_EPOCH - timedelta(hours=1)])
+def test_empty_window_is_refused(end_time):
+    'a window ending as or before it starts has nothing to fit'
+    with pytest.raises(ValueError):
+        chebyshev.compress_tles(synthetic_catalog(2), CATALOG_EPOCH, end_time)
+
+
+def test_positions_within_tolerance():
+    'positions looked up are within the tolerance of propagating the satellites there'
+    tles = synthetic_catalog(5)
+    compressed = chebyshev.compress_tles(tles, CATALOG_EPOCH, CATALOG_EPOCH + timedelta(hours=2),
+                                         tolerance=10)
+    moment = CATALOG_EPOCH + timedelta(minutes=47)
+    truth = ephemeris.propagate_catalog(read_tles(tles, Colors()), TimeGrid(moment, 1))[:, 0]
+    assert np.linalg.norm(compressed.position_at(moment) - truth, axis=1).max() <= 10
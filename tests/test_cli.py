@@ -0,0 +1,83 @@
+''' checks the tle2czml command converting a directory of TLE files '''
+
+import gzip
+import re
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml import cli
+from tle2czmlMaster.tle2czml.tle2czml import tles_to_czml
+
+HOURS = 2
+START = CATALOG_EPOCH.isoformat()
+
+
+def document(tles):
+    'returns the document tle2czml writes for tles over HOURS from the catalog epoch'
+    return tles_to_czml(tles, CATALOG_EPOCH, CATALOG_EPOCH + timedelta(hours=HOURS),
+                        silent=True)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    '''returns a directory of two TLE files, the second repeating 2 of its satellites, and a
+    file it skips, with the catalogs of the TLE files'''
+    directory = tmp_path / 'tles'
+    directory.mkdir()
+    first = synthetic_catalog(3)
+    second = synthetic_catalog(4, seed=1)
+    (directory / 'first.tle').write_text(first)
+    (directory / 'second.txt').write_text(second + ''.join(second.splitlines(True)[:6]))
+    (directory / 'notes.md').write_text('not a TLE file\n')
+    return directory, {'first': first, 'second': second}
+
+
+@pytest.mark.parametrize('output_format, read', [
+    ('czml', lambda path: path.read_text()),
+    ('czml.gz', lambda path: gzip.decompress(path.read_bytes()).decode()),
+])
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_documents_written_and_reported(tmp_path, inputs, capsys, output_format, read, jobs):
+    '''each TLE file is converted to a document of its own, reported with its satellites and
+    duplicates collapsed, then the batch totalled'''
+    directory, catalogs = inputs
+    output_dir = tmp_path / 'out'
+    assert cli.main([str(directory), '-o', str(output_dir), '--start', START,
+                     '--hours', str(HOURS), '--format', output_format, '-j', jobs]) == 0
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        'first.' + output_format, 'second.' + output_format]
+    for stem, tles in catalogs.items():
+        assert read(output_dir / (stem + '.' + output_format)) == document(tles)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    for line, (name, satellites, note) in zip(lines, [('first.tle', 3, ''),
+                                                      ('second.txt', 4, ', 2 duplicates '
+                                                                        'collapsed')]):
+        path = output_dir / (name.split('.')[0] + '.' + output_format)
+        assert re.fullmatch(r'{} -> {}: {} satellites in [\d.]+s \([\d.]+ sat/s, {:.1f} KB\){}'
+                            .format(re.escape(str(directory / name)), re.escape(str(path)),
+                                    satellites, path.stat().st_size / 1024.0,
+                                    re.escape(note)), line)
+    assert re.fullmatch(r'2 files, 7 satellites in [\d.]+s \([\d.]+ files/s, [\d.]+ sat/s, '
+                        r'[\d.]+ MB\), 2 duplicates collapsed', lines[2])
+
+
+def test_written_next_to_input_by_default(tmp_path, capsys):
+    'without --output-dir the document is written next to its TLE file'
+    tle_file = tmp_path / 'catalog.tle'
+    tle_file.write_text(synthetic_catalog(2))
+    assert cli.main([str(tle_file), '--start', START, '--end',
+                     (CATALOG_EPOCH + timedelta(hours=HOURS)).isoformat()]) == 0
+    assert (tmp_path / 'catalog.czml').read_text() == document(synthetic_catalog(2))
+    assert capsys.readouterr().out.splitlines()[0].endswith(' KB)')
+
+
+def test_nothing_to_convert(tmp_path, capsys):
+    'a directory without TLE files, or a step that is not positive, is an error'
+    assert cli.main([str(tmp_path)]) == 1
+    assert 'no input files found' in capsys.readouterr().err
+    assert cli.main([str(tmp_path), '--step', '0']) == 2
+    assert '--step must be a positive number of seconds' in capsys.readouterr().err
@@ -0,0 +1,129 @@
+''' checks conjunction screening against testing every pair of a few dozen objects '''
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from sgp4.propagation import sgp4
+
+from benchmarks.catalog import CATALOG_EPOCH, make_tle, synthetic_catalog
+from tle2czmlMaster.tle2czml import conjunctions, ephemeris
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_number_of_positions,
+                                              read_tles)
+
+HOURS = 2
+TIME_STEP = 60
+THRESHOLD = 10000.0
+# seconds between the samples the closest approach of every pair is searched on
+DENSE_STEP = 1
+# seconds either side of a refined approach searched, and the spacing of the search
+FINE_WINDOW = 5.0
+FINE_STEP = 0.01
+# metres the refined miss distance may differ from the fine search
+DISTANCE_TOLERANCE = 1.0
+
+
+def brute_force_screen(positions, threshold):
+    'returns the set of (first, second, step) candidates found by testing every pair'
+    sag = conjunctions.sags(positions)
+    first, second = np.triu_indices(positions.shape[0], 1)
+    reach = threshold + sag[first] + sag[second]
+    found = set()
+    for step in range(positions.shape[1] - 1):
+        keep = conjunctions.chords_within(positions[:, step], positions[:, step + 1], first,
+                                          second, reach)
+        found.update(zip(first[keep].tolist(), second[keep].tolist(), [step] * int(keep.sum())))
+    return found
+
+
+def dense_miss_distance(satellites, time_grid, conjunction):
+    'returns the smallest distance in metres SGP4 gives near the refined approach'
+    offsets = conjunction.time + np.arange(-FINE_WINDOW, FINE_WINDOW, FINE_STEP)
+    tracks = []
+    for index in (conjunction.primary, conjunction.secondary):
+        tle = satellites[index].tle_object
+        start = time_grid.minutes_since_epoch(tle)[0]
+        tracks.append(np.array([sgp4(tle, start + offset / 60.0)[0] for offset in offsets]))
+    return np.linalg.norm(tracks[0] - tracks[1], axis=1).min() * 1000
+
+
+def crossing_catalog(size, pairs=4):
+    '''returns a catalog of size random objects followed by pairs of objects crossing the
+    same ascending node a little apart, each pair further apart than the one before'''
+    tles = synthetic_catalog(size)
+    for pair in range(pairs):
+        for second in range(2):
+            tles += '\n'.join(make_tle(
+                size + 2 * pair + second + 1, 'CROSSING-{}-{}'.format(pair, second),
+                CATALOG_EPOCH, 30.0 + 10 * pair + 2 * second, 40.0 * pair, 0.001, 0.0,
+                350.0 - 0.05 * pair * second, 15.5)) + '\n'
+    return tles
+
+
+def propagated(satellites, time_step):
+    'returns the grid and positions of satellites over HOURS from the catalog epoch'
+    time_grid = TimeGrid(CATALOG_EPOCH, get_number_of_positions(
+        CATALOG_EPOCH, CATALOG_EPOCH + timedelta(hours=HOURS), time_step), time_step)
+    return time_grid, ephemeris.propagate_catalog(satellites, time_grid)
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    'returns the satellites of a crossing catalog of 38 objects, their grid and positions'
+    satellites = read_tles(crossing_catalog(30), Colors())
+    return (satellites,) + propagated(satellites, TIME_STEP)
+
+
+@pytest.mark.parametrize('threshold', [THRESHOLD, 500000.0])
+def test_grid_screens_the_pairs_every_pair_does(catalog, threshold):
+    'the grid passes on exactly the candidates testing every pair of objects does'
+    positions = catalog[2]
+    found = set(zip(*(column.tolist() for column in conjunctions.screen(positions, threshold))))
+    assert found == brute_force_screen(positions, threshold)
+    assert found
+
+
+def test_every_pair_within_threshold_found(catalog):
+    '''each pair of objects coming within the threshold on a dense search is found, at the
+    distance of that search, and no other'''
+    satellites, time_grid, positions = catalog
+    found = conjunctions.find_conjunctions(positions, TIME_STEP, THRESHOLD)
+    dense = propagated(satellites, DENSE_STEP)[1]
+    first, second = np.triu_indices(len(satellites), 1)
+    closest = {(a, b): np.linalg.norm(dense[a] - dense[b], axis=1).min()
+               for a, b in zip(first.tolist(), second.tolist())}
+
+    pairs = {(conjunction.primary, conjunction.secondary) for conjunction in found}
+    assert pairs == {pair for pair, distance in closest.items() if distance < THRESHOLD}
+    assert len(pairs) == 2
+    for pair in pairs:
+        # the dense samples pass the closest approach by up to half a step
+        nearest = min(conjunction.distance for conjunction in found
+                      if (conjunction.primary, conjunction.secondary) == pair)
+        assert closest[pair] - 200 <= nearest <= closest[pair] + DISTANCE_TOLERANCE
+    for conjunction in found:
+        assert conjunction.primary < conjunction.secondary
+        assert conjunction.distance < THRESHOLD
+        assert abs(conjunction.distance - dense_miss_distance(satellites, time_grid,
+                                                              conjunction)) <= DISTANCE_TOLERANCE
+    assert [conjunction.distance for conjunction in found] == sorted(
+        conjunction.distance for conjunction in found)
+
+
+def test_repeated_object_not_in_conjunction_with_itself():
+    'an object given twice is screened once, so it never comes close to itself'
+    tles = crossing_catalog(5, pairs=1)
+    end_time = CATALOG_EPOCH + timedelta(hours=HOURS)
+    found = conjunctions.screen_tles(tles, CATALOG_EPOCH, end_time, THRESHOLD, TIME_STEP)
+    repeated = ''.join(tles.splitlines(True)[-6:-3])
+    assert conjunctions.screen_tles(tles + repeated, CATALOG_EPOCH, end_time, THRESHOLD,
+                                    TIME_STEP) == found
+    assert {(found_at['primary'], found_at['secondary']) for found_at in found} == {
+        ('CROSSING-0-0', 'CROSSING-0-1')}
+
+
+def test_nothing_within_threshold():
+    'objects never coming within the threshold give no conjunctions'
+    positions = np.zeros((3, 5, 3))
+    positions[:, :, 0] = [[0.0], [THRESHOLD * 2], [THRESHOLD * 4]]
+    assert conjunctions.find_conjunctions(positions, TIME_STEP, THRESHOLD) == []
@@ -0,0 +1,53 @@
+''' checks fitting documents to their budget '''
+
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH
+from tle2czmlMaster.tle2czml import cost
+
+END_TIME = CATALOG_EPOCH + timedelta(hours=24)
+SATELLITES = 100
+OPTIONS = {'ground_tracks': True, 'labels': True}
+
+
+def budget_for(time_step, **options):
+    'returns a budget just large enough for the document sampled every time_step seconds'
+    estimated = cost.estimate(SATELLITES, CATALOG_EPOCH, END_TIME, time_step, **options)
+    return cost.Budget(estimated.position_samples(), estimated.size)
+
+
+def test_within_budget_unchanged():
+    'a document within its budget is built as asked'
+    assert cost.fit(SATELLITES, CATALOG_EPOCH, END_TIME, 300, OPTIONS,
+                    budget_for(300, **OPTIONS)) == (300, OPTIONS, [])
+
+
+def test_degraded_to_coarser_step():
+    'a document over its budget is sampled coarser, by doubling the step'
+    assert cost.fit(SATELLITES, CATALOG_EPOCH, END_TIME, 300, OPTIONS,
+                    budget_for(1200, **OPTIONS)) == (1200, OPTIONS, ['step=1200'])
+
+
+def test_degraded_to_overview():
+    'once no step up to the coarsest fits, satellites are drawn as points at the finest that does'
+    overview = dict(OPTIONS, overview=True, labels=False, ground_tracks=False,
+                    footprint_half_angle=None, orbit_rings=False)
+    # 1200 s is the coarsest step doubling 300 s reaches within MAX_DEGRADED_STEP
+    assert cost.fit(SATELLITES, CATALOG_EPOCH, END_TIME, 300, OPTIONS,
+                    budget_for(1200, **overview)) == (1200, overview, ['step=1200', 'overview'])
+
+
+def test_rejected_without_degrading():
+    'a document over its budget is refused when it may not be degraded'
+    with pytest.raises(cost.OverBudget) as raised:
+        cost.fit(SATELLITES, CATALOG_EPOCH, END_TIME, 300, OPTIONS, budget_for(1200, **OPTIONS),
+                 degrade=False)
+    assert raised.value.budget.max_samples == budget_for(1200, **OPTIONS).max_samples
+
+
+def test_rejected_when_nothing_fits():
+    'a budget too small for any degraded document refuses it'
+    with pytest.raises(cost.OverBudget):
+        cost.fit(SATELLITES, CATALOG_EPOCH, END_TIME, 300, OPTIONS, cost.Budget(10, 10**9))
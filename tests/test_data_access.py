@@ -0,0 +1,193 @@
+''' checks the spaceObjectTle queries against SQLite stand-in tables '''
+
+import sqlite3
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip('mariadb')
+
+import spaceObjectsDataAccess  # noqa: E402
+import tleLoader  # noqa: E402
+from benchmarks.catalog import (CATALOG_EPOCH, make_tle, synthetic_catalog,  # noqa: E402
+                                tle_epoch)
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION  # noqa: E402
+
+
+@pytest.fixture
+def table(database):
+    'returns a stand-in spaceObjectTle table holding a catalog of 3 satellites'
+    tleLoader.load_tles(synthetic_catalog(3), database)
+    return database
+
+
+def set_epoch(conn, norad, epoch):
+    'replaces the epoch of the line 1 row of a satellite in place'
+    conn.execute('UPDATE spaceObjectTle SET Epoch = ? WHERE LineNumber = 1 AND NoradCatID = ?',
+                 (epoch, norad))
+    conn.commit()
+
+
+def test_probe_sees_inserts_and_deletes(table, connect):
+    'the version changes with a satellite inserted or deleted, and only then'
+    probe = spaceObjectsDataAccess.CatalogProbe(connect, interval=0)
+    version = probe.check()
+    assert probe.check() == version
+    tleLoader.load_tles(''.join(synthetic_catalog(4).splitlines(True)[-3:]), table)
+    assert probe.check() == version + 1
+    assert probe.check() == version + 1
+    table.execute("DELETE FROM spaceObjectTle WHERE NoradCatID = '00004'")
+    table.commit()
+    assert probe.check() == version + 2
+
+
+def test_probe_within_interval_and_failing_keeps_version(table, connect):
+    'the table is probed again only after the interval, and a failed probe changes nothing'
+    attempts = []
+
+    def counted():
+        attempts.append(True)
+        if len(attempts) > 2:
+            raise sqlite3.OperationalError('unable to open database file')
+        return connect()
+    probe = spaceObjectsDataAccess.CatalogProbe(counted, interval=3600)
+    assert probe.check() == 1
+    set_epoch(table, '00001', '99365.00000000')
+    assert probe.check() == 1
+    assert len(attempts) == 1
+    assert probe.check(force=True) == 2
+    assert probe.check(force=True) == 2
+    assert len(attempts) == 3
+
+
+def test_catalog_read_once_per_version(table, connect, monkeypatch):
+    'the catalog is read again only once the probe has seen the table change'
+    monkeypatch.setattr(spaceObjectsDataAccess, '_catalog', (None, None))
+    probe = spaceObjectsDataAccess.CatalogProbe(connect, interval=0)
+    reads = []
+
+    def read():
+        reads.append(probe.version)
+        return spaceObjectsDataAccess.retrieve_tle_entries(connect, limit=None)
+    first = spaceObjectsDataAccess.retrieve_current_tle_entries(probe, read)
+    assert spaceObjectsDataAccess.retrieve_current_tle_entries(probe, read) is first
+    table.execute("DELETE FROM spaceObjectTle WHERE NoradCatID = '00003'")
+    table.commit()
+    assert spaceObjectsDataAccess.retrieve_current_tle_entries(probe, read).count('\n') == 6
+    assert reads == [1, 2]
+
+
+def test_probe_sees_element_set_replaced_in_place(table, connect):
+    'a set replaced within the range of epochs stored keeps count, minimum and maximum'
+    probe = spaceObjectsDataAccess.CatalogProbe(connect, interval=0)
+    epochs = sorted(row[0] for row in table.execute(
+        'SELECT Epoch FROM spaceObjectTle WHERE LineNumber = 1'))
+    middle = table.execute("SELECT NoradCatID FROM spaceObjectTle "
+                           "WHERE LineNumber = 1 AND Epoch = ?", (epochs[1],)).fetchone()[0]
+    version = probe.check()
+    set_epoch(table, middle, '{:.8f}'.format((float(epochs[0]) + float(epochs[1])) / 2))
+    assert probe.check() == version + 1
+
+
+def test_probe_orders_epochs_across_the_century(table, connect):
+    'the newest epoch probed is one from 2020, not the one from 1999 sorting after it as text'
+    probe = spaceObjectsDataAccess.CatalogProbe(connect, interval=0)
+    set_epoch(table, '00001', '99365.00000000')
+    probe.check()
+    assert probe.signature[1] > 120000
+
+
+def add_older_element_set(conn, lines=slice(0, 3)):
+    '''stores the lines of an older element set of satellite 1 next to its own, as loads used
+    to'''
+    older = synthetic_catalog(1, epoch=CATALOG_EPOCH - timedelta(days=3)).splitlines()
+    conn.executemany(tleLoader.INSERT_QUERY, tleLoader.tle_rows(older)[lines])
+    conn.commit()
+
+
+def unpaired():
+    'returns the satellites the last catalog read left out'
+    return INSTRUMENTATION.snapshot()['gauges']['db_satellites_unpaired']
+
+
+def test_paired_query_refuses_ambiguous_line_2(table, connect, elements, caplog):
+    'a satellite stored twice is left out, logged and counted, the others are read'
+    add_older_element_set(table)
+    loaded = elements(synthetic_catalog(3))
+    tles = spaceObjectsDataAccess.retrieve_tle_entries(connect, limit=None)
+    assert elements(tles) == loaded[1:]
+    assert unpaired() == 1
+    assert 'Left out 1 satellites stored with several line 2 rows' in caplog.text
+    assert '00001' in caplog.text
+
+    # the next load leaves one element set of every satellite
+    tleLoader.load_tles(synthetic_catalog(3), table)
+    tles = spaceObjectsDataAccess.retrieve_tle_entries(connect, limit=None)
+    assert elements(tles) == loaded
+    assert unpaired() == 0
+
+
+def test_paired_query_takes_newest_line_1(table, connect, elements):
+    'of several line 1 rows, the newest is paired with the only line 2 row'
+    add_older_element_set(table, slice(0, 1))
+    tles = spaceObjectsDataAccess.retrieve_tle_entries(connect, limit=None)
+    assert elements(tles) == elements(synthetic_catalog(3))
+
+
+def test_paired_query_limits_satellites(table, connect, elements):
+    'the limit counts satellites, not joined rows'
+    add_older_element_set(table)
+    tles = spaceObjectsDataAccess.retrieve_tle_entries(connect, limit=1)
+    assert elements(tles) == elements(synthetic_catalog(3))[1:2]
+
+
+def history_tle(norad, days):
+    'returns a TLE of satellite norad with its epoch days after the catalog epoch'
+    return '\n'.join(make_tle(norad, 'SAT-{}'.format(norad), CATALOG_EPOCH + timedelta(days=days),
+                               51.6, 3.0 * days, 0.001, 90.0, 0.0, 15.5)) + '\n'
+
+
+def nearest_epochs(connect, days, max_gap=spaceObjectsDataAccess.MAX_EPOCH_GAP, limit=None):
+    'returns the (catalog number, epoch) of each satellite chosen days after the catalog epoch'
+    tles = spaceObjectsDataAccess.retrieve_tles_at(
+        CATALOG_EPOCH + timedelta(days=days), connect, max_gap, limit)
+    lines = tles.splitlines()
+    return [(int(line[2:7]), line[18:32]) for line in lines[1::3]]
+
+
+def epoch_of(days):
+    'returns the TLE epoch days after the catalog epoch'
+    return tle_epoch(CATALOG_EPOCH + timedelta(days=days))
+
+
+@pytest.fixture
+def history(history_database, connect_history):
+    '''returns a function connecting to a stand-in history of satellites 1 and 2 at 0 and 4
+    days after the catalog epoch, and of satellite 3 at 100 days'''
+    tles = history_tle(1, 0) + history_tle(1, 4) + history_tle(2, 0) + history_tle(2, 4)
+    tleLoader.load_tles(tles + history_tle(3, 100), history_database, history=True)
+    return connect_history
+
+
+def test_history_chooses_nearest_element_set(history):
+    'each satellite gets the element set nearest the time asked'
+    assert nearest_epochs(history, 1) == [(1, epoch_of(0)), (2, epoch_of(0))]
+    assert nearest_epochs(history, 3) == [(1, epoch_of(4)), (2, epoch_of(4))]
+    assert nearest_epochs(history, 99) == [(3, epoch_of(100))]
+
+
+def test_history_tie_goes_to_earlier_element_set(history):
+    'halfway between two sets, the earlier one is chosen'
+    assert nearest_epochs(history, 2) == [(1, epoch_of(0)), (2, epoch_of(0))]
+
+
+def test_history_leaves_out_sets_beyond_the_gap(history):
+    'satellites without a set within max_gap days of the time are left out'
+    assert nearest_epochs(history, 9, max_gap=5) == [(1, epoch_of(4)), (2, epoch_of(4))]
+    assert nearest_epochs(history, 9.5, max_gap=5) == []
+    assert nearest_epochs(history, 70) == [(3, epoch_of(100))]
+
+
+def test_history_limits_satellites(history):
+    'the limit counts satellites, not the element sets considered'
+    assert nearest_epochs(history, 1, limit=1) == [(1, epoch_of(0))]
@@ -0,0 +1,129 @@
+''' checks satellites repeating a NORAD catalog number are collapsed, and repeated tle lines
+propagated once '''
+
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, deduplicate_tles, norad_id,
+                                              read_tles, sample_satellites, tles_to_czml)
+
+HOURS = 2
+OLDER = CATALOG_EPOCH - timedelta(days=2)
+
+
+def entries(tles):
+    'returns the three lines of each satellite of a tle string'
+    lines = tles.splitlines()
+    return [lines[index:index + 3] for index in range(0, len(lines), 3)]
+
+
+def joined(*raw_tles):
+    'returns the tle string of the three lines of each satellite'
+    return ''.join('\n'.join(raw_tle) + '\n' for raw_tle in raw_tles)
+
+
+def renumbered(raw_tle, field):
+    'returns the lines of a tle with the catalog number field, 5 characters, given instead'
+    return [raw_tle[0]] + [line[:2] + field + line[7:] for line in raw_tle[1:]]
+
+
+def counter(name):
+    'returns the value of the counter name, 0 before it is first incremented'
+    return INSTRUMENTATION.snapshot()['counters'].get(name, 0)
+
+
+def document(tles, deduplicate=True):
+    'returns the templated document of tles over HOURS from the catalog epoch'
+    return tles_to_czml(tles, CATALOG_EPOCH, CATALOG_EPOCH + timedelta(hours=HOURS),
+                        silent=True, templated=True, deduplicate=deduplicate)
+
+
+def test_newest_epoch_kept_where_first_seen():
+    'each satellite keeps its newest set, in the place its first set was given'
+    newer, older = entries(synthetic_catalog(3)), entries(synthetic_catalog(3, epoch=OLDER))
+    tles, collapsed = deduplicate_tles(joined(older[1], newer[0], newer[1], older[0], newer[2],
+                                              older[2]))
+    assert collapsed == 3
+    assert tles == joined(newer[1], newer[0], newer[2])
+
+
+def test_epochs_ordered_across_the_century():
+    'a set from 2020 is newer than one from 1999 although its two digit year is smaller'
+    newer = entries(synthetic_catalog(1))[0]
+    older = newer[:]
+    older[1] = newer[1][:18] + '99365.00000000' + newer[1][32:]
+    assert deduplicate_tles(joined(newer, older)) == (joined(newer), 1)
+    assert deduplicate_tles(joined(older, newer)) == (joined(newer), 1)
+
+
+def test_alpha5_numbers_collapsed_apart_from_5_digit_ones():
+    'A0001 is satellite 100001: collapsed with itself, not with satellite 00001'
+    newer, older = entries(synthetic_catalog(1))[0], entries(synthetic_catalog(1, epoch=OLDER))[0]
+    alpha5 = renumbered(newer, 'A0001')
+    assert norad_id(alpha5) == 100001
+    tles, collapsed = deduplicate_tles(joined(renumbered(older, 'A0001'), newer, alpha5))
+    assert collapsed == 1
+    assert tles == joined(alpha5, newer)
+
+
+def test_unreadable_tles_kept():
+    'a tle whose catalog number cannot be read is kept as it is, apart from the others'
+    raw_tle = entries(synthetic_catalog(1))[0]
+    unreadable = renumbered(raw_tle, '?????')
+    tles = joined(raw_tle, unreadable, unreadable, raw_tle)
+    assert deduplicate_tles(tles) == (joined(raw_tle, unreadable, unreadable), 1)
+
+
+@pytest.mark.parametrize('tles', [synthetic_catalog(5), synthetic_catalog(5).replace('\n', '\r\n'),
+                                  '', synthetic_catalog(2) + 'trailing line\n'])
+def test_without_duplicates_returned_as_given(tles):
+    'tles repeating no catalog number are returned as they are, not reassembled'
+    result, collapsed = deduplicate_tles(tles)
+    assert result is tles
+    assert collapsed == 0
+
+
+def test_document_without_duplicates_unchanged():
+    'deduplicating a catalog without duplicates leaves its document byte for byte the same'
+    tles = synthetic_catalog(5)
+    assert document(tles) == document(tles, deduplicate=False)
+
+
+def test_document_of_repeated_catalog_is_the_catalog_alone():
+    '''a document of a catalog given with older and repeated sets is that of the catalog, and
+    the sets collapsed are counted'''
+    tles = synthetic_catalog(5)
+    given = synthetic_catalog(5, epoch=OLDER) + tles + joined(*entries(tles)[:2])
+    collapsed = counter('tle2czml_satellites_collapsed_total')
+    assert document(given) == document(tles)
+    assert counter('tle2czml_satellites_collapsed_total') - collapsed == 7
+
+
+def test_identical_lines_share_samples():
+    'satellites repeating the same lines, under any name, are propagated once'
+    raw_tles = entries(synthetic_catalog(3))
+    renamed = ['RENAMED'] + raw_tles[0][1:]
+    satellites = read_tles(joined(*raw_tles, renamed, raw_tles[1]), Colors())
+    time_grid = TimeGrid(CATALOG_EPOCH, 10)
+    shared = counter('tle2czml_propagations_shared_total')
+    samples = sample_satellites(satellites, time_grid)
+    assert counter('tle2czml_propagations_shared_total') - shared == 2
+    assert samples[3] is samples[0] and samples[4] is samples[1]
+    assert len({id(sample) for sample in samples}) == 3
+    alone = sample_satellites(read_tles(joined(raw_tles[0]), Colors()), time_grid)
+    assert samples[0] == alone[0]
+
+
+def test_memo_shared_between_calls():
+    'samples memoized by one call are shared with satellites given to the next'
+    satellites = read_tles(synthetic_catalog(2), Colors())
+    time_grid = TimeGrid(CATALOG_EPOCH, 10)
+    memo = {}
+    first = sample_satellites(satellites, time_grid, memo)
+    shared = counter('tle2czml_propagations_shared_total')
+    again = sample_satellites(satellites[::-1], time_grid, memo)
+    assert counter('tle2czml_propagations_shared_total') - shared == 2
+    assert again[0] is first[1] and again[1] is first[0]
@@ -0,0 +1,152 @@
+''' checks cached documents are served by Accept-Encoding and ETag, and built once '''
+
+import gzip
+import threading
+
+import pytest
+from flask import Flask
+
+import documentCache
+
+DOCUMENT = '[{"id": "document"}, {"id": "satellite"}]'
+APP = Flask(__name__)
+
+
+def respond(entry, **headers):
+    'returns the response of entry to a request with headers'
+    with APP.test_request_context(headers=headers) as context:
+        return entry.respond(context.request)
+
+
+@pytest.fixture
+def entry():
+    'returns a cached DOCUMENT with a header sent along with it'
+    return documentCache.CachedDocument(DOCUMENT, headers={'X-Satellite-Count': '1'})
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, identity', 'identity'),
+    ('gzip, identity;q=0.5', 'gzip'),
+    ('deflate', 'identity'),
+    ('', 'identity'),
+])
+def test_encoding_chosen_by_quality(entry, accept, encoding):
+    'the body sent is the encoding the client prefers, and decodes to the document'
+    response = respond(entry, **{'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding', 'identity') == encoding
+    body = response.get_data()
+    assert (gzip.decompress(body) if encoding == 'gzip' else body) == DOCUMENT.encode()
+    assert response.get_etag() == (entry.etag(encoding), False)
+
+
+def test_brotli_preferred_when_accepted_equally(entry):
+    'of encodings accepted equally, br is sent before gzip'
+    brotli = pytest.importorskip('brotli')
+    response = respond(entry, **{'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == DOCUMENT.encode()
+    response = respond(entry, **{'Accept-Encoding': 'gzip, br;q=0.5'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('encoding', sorted(documentCache.CachedDocument(DOCUMENT).bodies))
+def test_etag_of_any_encoding_not_modified(entry, encoding):
+    'a request naming the ETag of any encoding is answered 304 without a body'
+    response = respond(entry, **{'Accept-Encoding': 'gzip',
+                                 'If-None-Match': '"other", "{}"'.format(entry.etag(encoding))})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.get_etag() == (entry.etag('gzip'), False)
+    assert response.headers['X-Satellite-Count'] == '1'
+
+
+def test_other_etag_sends_document(entry):
+    'a request naming an ETag of another document gets this one'
+    other = documentCache.CachedDocument(DOCUMENT + ' ')
+    response = respond(entry, **{'If-None-Match': '"{}"'.format(other.etag('identity'))})
+    assert response.status_code == 200
+    assert response.get_data() == DOCUMENT.encode()
+
+
+@pytest.mark.parametrize('headers', [{}, {'If-None-Match': '*'}])
+def test_caching_headers(entry, headers):
+    'responses, 304s included, vary by encoding and must be revalidated before use'
+    response = respond(entry, **headers)
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['X-Satellite-Count'] == '1'
+
+
+def test_etag_stable_across_builds(entry):
+    'the same document cached again gets the same ETags'
+    again = documentCache.CachedDocument(DOCUMENT)
+    assert [again.etag(encoding) for encoding in again.bodies] == [
+        entry.etag(encoding) for encoding in entry.bodies]
+    assert again.bodies == entry.bodies
+
+
+def test_hit_does_not_build(entry):
+    'a document is built on the first lookup only, and a None build is not cached'
+    cache = documentCache.DocumentCache()
+    builds = []
+
+    def build():
+        builds.append(True)
+        return entry
+    assert cache.get('key', build) is entry
+    assert cache.get('key', build) is entry
+    assert len(builds) == 1
+    assert cache.get('missing', lambda: None) is None
+    assert list(cache.entries) == ['key']
+
+
+def test_concurrent_misses_build_once(entry):
+    'requests missing the same document while it is built wait for it instead of building'
+    cache = documentCache.DocumentCache()
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(True)
+        started.set()
+        release.wait(5)
+        return entry
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('key', build)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert results == [entry] * len(threads)
+    assert cache.building == {}
+
+
+def test_failed_build_is_retried(entry):
+    'a build raising leaves nothing cached, and the next lookup builds again'
+    cache = documentCache.DocumentCache()
+
+    def fail():
+        raise RuntimeError('database unreachable')
+    with pytest.raises(RuntimeError):
+        cache.get('key', fail)
+    assert cache.building == {}
+    assert cache.get('key', lambda: entry) is entry
+
+
+def test_least_recently_used_evicted(entry):
+    'past max_entries the document looked up least recently is dropped'
+    cache = documentCache.DocumentCache(max_entries=2)
+    cache.get('first', lambda: entry)
+    cache.get('second', lambda: entry)
+    cache.get('first', lambda: None)
+    cache.get('third', lambda: entry)
+    assert list(cache.entries) == ['first', 'third']
+    cache.clear()
+    assert not cache.entries
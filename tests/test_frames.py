@@ -0,0 +1,91 @@
+''' checks the vectorized TEME conversions against a scalar reference '''
+
+import math
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml import frames
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_future_sat_positions,
+                                              get_number_of_positions, read_tles)
+
+# the vectorized conversion is within about 3e-12 degrees and 1.2e-7 m of the reference
+ANGLE_TOLERANCE_DEGREES = 1e-9
+HEIGHT_TOLERANCE_METRES = 1e-3
+ECEF_TOLERANCE_METRES = 1e-6
+
+
+def teme_to_ecef_reference(position, julian_date_ut1):
+    'scalar reference rotation of one TEME position into the earth fixed frame'
+    tut1 = (julian_date_ut1 - frames.JULIAN_DATE_J2000) / 36525.0
+    seconds = (-6.2e-6 * tut1 ** 3 + 0.093104 * tut1 ** 2 +
+               (876600.0 * 3600.0 + 8640184.812866) * tut1 + 67310.54841)
+    angle = math.fmod(math.radians(seconds / 240.0), frames.TWO_PI)
+    return (math.cos(angle) * position[0] + math.sin(angle) * position[1],
+            math.cos(angle) * position[1] - math.sin(angle) * position[0],
+            position[2])
+
+
+def teme_to_geodetic_reference(position, julian_date_ut1):
+    '''scalar reference conversion of one TEME position in metres, iterating the latitude to
+    convergence; returns (longitude, latitude) in degrees and height in metres'''
+    x, y, z = teme_to_ecef_reference(position, julian_date_ut1)
+    p = math.hypot(x, y)
+    latitude = math.atan2(z, p * (1 - frames.WGS84_E2))
+    for _ in range(100):
+        radius = frames.WGS84_A / math.sqrt(1 - frames.WGS84_E2 * math.sin(latitude) ** 2)
+        height = p / math.cos(latitude) - radius
+        next_latitude = math.atan2(z, p * (1 - frames.WGS84_E2 * radius / (radius + height)))
+        converged = abs(next_latitude - latitude) < 1e-14
+        latitude = next_latitude
+        if converged:
+            break
+
+    radius = frames.WGS84_A / math.sqrt(1 - frames.WGS84_E2 * math.sin(latitude) ** 2)
+    height = p / math.cos(latitude) - radius
+    return math.degrees(math.atan2(y, x)), math.degrees(latitude), height
+
+
+def catalog_samples(size, hours):
+    'returns the TEME samples of a synthetic catalog and the julian dates they were taken at'
+    satellites = read_tles(synthetic_catalog(size), Colors())
+    end_time = CATALOG_EPOCH + timedelta(hours=hours)
+    time_grid = TimeGrid(CATALOG_EPOCH, get_number_of_positions(CATALOG_EPOCH, end_time))
+    samples = np.reshape(
+        [get_future_sat_positions(sat.tle_object, len(time_grid), CATALOG_EPOCH,
+                                  time_grid=time_grid)
+         for sat in satellites], (len(satellites), len(time_grid), 4))
+    return samples, time_grid.julian_dates
+
+
+@pytest.fixture(scope='module')
+def samples():
+    'returns the samples of 20 satellites over 6 hours and their julian dates'
+    return catalog_samples(20, 6)
+
+
+def test_teme_to_ecef_matches_reference(samples):
+    'the vectorized rotation agrees with rotating each sample on its own'
+    positions, julian_dates = samples
+    ecef = frames.teme_to_ecef(positions[..., 1:], frames.gmst(julian_dates))
+    reference = np.array([[teme_to_ecef_reference(position, julian_date)
+                           for position, julian_date in zip(sat[:, 1:], julian_dates)]
+                          for sat in positions])
+    assert np.abs(ecef - reference).max() <= ECEF_TOLERANCE_METRES
+
+
+def test_cartographic_matches_reference(samples):
+    'the vectorized geodetic conversion agrees with iterating each sample to convergence'
+    positions, julian_dates = samples
+    converted = frames.teme_samples_to_cartographic(positions, julian_dates)
+    reference = np.array([[teme_to_geodetic_reference(position, julian_date)
+                           for position, julian_date in zip(sat[:, 1:], julian_dates)]
+                          for sat in positions])
+    # unwrapped longitudes are compared modulo a turn
+    longitude_error = (converted[..., 1] - reference[..., 0] + 180.0) % 360.0 - 180.0
+    assert np.abs(longitude_error).max() <= ANGLE_TOLERANCE_DEGREES
+    assert np.abs(converted[..., 2] - reference[..., 1]).max() <= ANGLE_TOLERANCE_DEGREES
+    assert np.abs(converted[..., 3] - reference[..., 2]).max() <= HEIGHT_TOLERANCE_METRES
+    assert np.array_equal(converted[..., 0], positions[..., 0])
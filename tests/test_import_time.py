@@ -0,0 +1,11 @@
+''' keeps the dependencies only rarely used inputs need out of the package import
+
+The import time budget depends on the machine and is enforced by benchmarks.import_time.
+'''
+
+from benchmarks import import_time
+
+
+def test_lazy_dependencies_not_imported():
+    'dependencies only rarely used inputs need are not loaded by importing the package'
+    assert import_time.eagerly_imported() == []
@@ -0,0 +1,90 @@
+''' checks the Prometheus exposition and Server-Timing header of the instrumentation '''
+
+import pytest
+
+from tle2czmlMaster.tle2czml import instrumentation
+
+BUCKETS = (0.1, 1.0, float('inf'))
+
+
+@pytest.fixture
+def metrics():
+    'returns an instrumentation with buckets BUCKETS and no series'
+    return instrumentation.Instrumentation(BUCKETS)
+
+
+def test_help_and_type_lines(metrics):
+    'each metric has its HELP, when described, and TYPE line once, ahead of its series'
+    metrics.describe('requests_total', 'Requests handled.')
+    metrics.increment('requests_total', status=200)
+    metrics.increment('requests_total', 2, status=503)
+    metrics.set_gauge('queue_length', 3)
+    assert metrics.render_prometheus() == (
+        '# HELP requests_total Requests handled.\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{status="200"} 1\n'
+        'requests_total{status="503"} 2\n'
+        '# TYPE queue_length gauge\n'
+        'queue_length 3\n')
+
+
+def test_label_values_escaped(metrics):
+    'backslashes, quotes and newlines in label values are escaped, and labels sorted'
+    metrics.increment('requests_total', route='/a"b\\c\nd', method='GET')
+    assert metrics.render_prometheus().splitlines()[-1] == (
+        'requests_total{method="GET",route="/a\\"b\\\\c\\nd"} 1')
+
+
+def test_histogram_buckets_cumulative(metrics):
+    'every bucket counts the values up to its bound, the last +Inf, followed by sum and count'
+    metrics.describe('duration_seconds', 'Durations.')
+    for value in (0.25, 0.5, 4.0, 0.0625):
+        metrics.observe_value('duration_seconds', value, route='/getData')
+    assert metrics.render_prometheus() == (
+        '# HELP duration_seconds Durations.\n'
+        '# TYPE duration_seconds histogram\n'
+        'duration_seconds_bucket{route="/getData",le="0.1"} 1\n'
+        'duration_seconds_bucket{route="/getData",le="1"} 3\n'
+        'duration_seconds_bucket{route="/getData",le="+Inf"} 4\n'
+        'duration_seconds_sum{route="/getData"} 4.8125\n'
+        'duration_seconds_count{route="/getData"} 4\n')
+
+
+def test_values_formatted(metrics):
+    'whole floats are written without a fraction and the others as they are'
+    metrics.set_gauge('whole', 2.0)
+    metrics.set_gauge('fraction', 0.125)
+    metrics.add_gauge('fraction', -1)
+    lines = metrics.render_prometheus().splitlines()
+    assert 'whole 2' in lines
+    assert 'fraction -0.875' in lines
+
+
+def test_stages_observed_and_collected(metrics):
+    'stages are counted in the stage histogram and summed for the collecting context'
+    with instrumentation.collect() as timings:
+        for _ in range(2):
+            with metrics.stage('parse'):
+                pass
+    assert list(timings) == ['parse']
+    assert instrumentation.collected() is None
+    histogram = metrics.snapshot()['histograms'][
+        'tle2czml_stage_duration_seconds{stage="parse"}']
+    assert histogram['count'] == 2
+    assert histogram['sum'] == pytest.approx(timings['parse'])
+
+
+def test_disabled_records_nothing(metrics):
+    'with the instrumentation disabled, nothing is rendered'
+    metrics.enabled = False
+    with metrics.stage('parse'):
+        metrics.increment('requests_total')
+        metrics.observe_value('duration_seconds', 1.0)
+    assert metrics.render_prometheus() == '\n'
+
+
+def test_server_timing_header():
+    'durations in seconds are written in milliseconds, in the order they were collected'
+    assert instrumentation.server_timing_header({'parse': 0.01234, 'total': 0.5}) == (
+        'parse;dur=12.3, total;dur=500.0')
+    assert instrumentation.server_timing_header({}) == ''
@@ -0,0 +1,84 @@
+''' checks tleLoader against a SQLite stand-in spaceObjectTle table '''
+
+from datetime import timedelta
+
+import pytest
+
+import tleLoader
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+
+SIZE = 3
+NEWER = CATALOG_EPOCH + timedelta(days=3)
+
+
+@pytest.fixture
+def conn(database):
+    'returns a stand-in spaceObjectTle table holding a catalog of SIZE satellites'
+    tleLoader.load_tles(synthetic_catalog(SIZE), database)
+    return database
+
+
+def stored(conn):
+    'returns the (LineNumber, NoradCatID, Epoch) of every row, in order'
+    return conn.execute('SELECT LineNumber, NoradCatID, Epoch FROM spaceObjectTle '
+                        'ORDER BY NoradCatID, LineNumber').fetchall()
+
+
+def test_newer_element_set_replaces_rows(conn):
+    'each satellite keeps one line 1 and one line 2 row, those of its newest set'
+    report = tleLoader.load_tles(synthetic_catalog(SIZE, epoch=NEWER), conn)
+    assert (report.inserted, report.replaced, report.stored) == (SIZE, SIZE, 0)
+    rows = stored(conn)
+    assert [row[:2] for row in rows] == [(line, '{:05d}'.format(norad))
+                                         for norad in range(1, SIZE + 1) for line in (1, 2)]
+    newer = synthetic_catalog(SIZE, epoch=NEWER).splitlines()[1::3]
+    assert [row[2] for row in rows if row[0] == 1] == [line[18:32] for line in newer]
+
+
+def test_older_element_set_is_skipped(conn):
+    'a set no newer than the one stored changes nothing'
+    before = stored(conn)
+    older = synthetic_catalog(SIZE, epoch=CATALOG_EPOCH - timedelta(days=3))
+    report = tleLoader.load_tles(older + synthetic_catalog(SIZE), conn)
+    assert (report.inserted, report.stored, report.repeated) == (0, SIZE, SIZE)
+    assert stored(conn) == before
+
+
+def test_several_element_sets_are_rewritten(conn):
+    'sets stored next to each other by earlier loads leave one pair per satellite'
+    older = synthetic_catalog(1, epoch=CATALOG_EPOCH - timedelta(days=3)).splitlines()
+    conn.executemany(tleLoader.INSERT_QUERY, tleLoader.tle_rows(older))
+    report = tleLoader.load_tles(synthetic_catalog(SIZE), conn)
+    assert (report.inserted, report.replaced, report.stored) == (1, 1, SIZE - 1)
+    assert len(stored(conn)) == 2 * SIZE
+    assert older[1][18:32] not in [row[2] for row in stored(conn)]
+
+
+def test_history_keeps_every_element_set(history_database):
+    '''with history, every set is stored whole by catalog number and epoch, once however
+    often it is loaded'''
+    older = synthetic_catalog(SIZE, epoch=CATALOG_EPOCH - timedelta(days=3))
+    tles = synthetic_catalog(SIZE) + older
+    report = tleLoader.load_tles(tles + older, history_database, history=True)
+    assert (report.inserted, report.repeated, report.stored) == (2 * SIZE, SIZE, 0)
+    again = tleLoader.load_tles(tles, history_database, history=True)
+    assert (again.inserted, again.stored) == (0, 2 * SIZE)
+
+    rows = history_database.execute('SELECT NoradCatID, EpochTime, Name, Line1, Line2 '
+                                    'FROM spaceObjectTleHistory').fetchall()
+    lines = tles.splitlines()
+    assert sorted(rows) == sorted(
+        (int(line1[2:7]), tleLoader.tle_epoch_time(line1), name.strip(), line1, line2)
+        for name, line1, line2 in zip(lines[0::3], lines[1::3], lines[2::3]))
+
+
+def test_main_loads_history(tmp_path, history_database, connect_history, monkeypatch, capsys):
+    'tleLoader --history adds the TLE files to spaceObjectTleHistory and reports each'
+    access = pytest.importorskip('spaceObjectsDataAccess')
+    monkeypatch.setattr(access, 'connect_database', connect_history)
+    tle_file = tmp_path / 'catalog.tle'
+    tle_file.write_text(synthetic_catalog(SIZE))
+    assert tleLoader.main([str(tle_file), '--history']) == 0
+    assert '{}: {} TLEs read, {} inserted'.format(tle_file, SIZE, SIZE) in capsys.readouterr().out
+    assert history_database.execute(
+        'SELECT COUNT(*) FROM spaceObjectTleHistory').fetchone()[0] == SIZE
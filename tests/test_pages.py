@@ -0,0 +1,92 @@
+''' checks documents split into pages and NORAD catalog number ranges add up to the whole '''
+
+import json
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml.tle2czml import (catalog_number, count_tles, select_satellites,
+                                              tles_to_czml)
+
+SIZE = 7
+HOURS = 2
+
+
+def with_alpha5(tles, fields):
+    'returns tles with the satellites from the first on numbered by the 5 character fields'
+    lines = tles.splitlines()
+    for index, field in enumerate(fields):
+        for line in (3 * index + 1, 3 * index + 2):
+            lines[line] = lines[line][:2] + field + lines[line][7:]
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture(params=[False, True], ids=['model', 'templated'])
+def packets(request):
+    'returns a function giving the packets of a document of the catalog with options'
+    def build(tles, **options):
+        return json.loads(tles_to_czml(tles, CATALOG_EPOCH,
+                                       CATALOG_EPOCH + timedelta(hours=HOURS), silent=True,
+                                       templated=request.param, **options))
+    return build
+
+
+@pytest.mark.parametrize('page_size', [1, 3, SIZE, SIZE + 1])
+def test_pages_add_up_to_the_whole_document(packets, page_size):
+    '''each page starts with the document packet and their satellites, in order, are those of
+    the whole document, colors included'''
+    tles = synthetic_catalog(SIZE)
+    whole = packets(tles)
+    pages = [packets(tles, page=page, page_size=page_size)
+             for page in range(-(-SIZE // page_size))]
+    assert all(page[0] == whole[0] for page in pages)
+    assert [packet for page in pages for packet in page[1:]] == whole[1:]
+
+
+def test_page_past_the_end_is_empty(packets):
+    'a page after the last holds the document packet alone'
+    tles = synthetic_catalog(SIZE)
+    assert packets(tles, page=2, page_size=SIZE) == packets(tles)[:1]
+
+
+def test_norad_range_selects_satellites(packets):
+    'a range of catalog numbers, inclusive and alpha 5 numbers decoded, selects those satellites'
+    tles = with_alpha5(synthetic_catalog(SIZE), ['A0001', 'B0001'])
+    whole = packets(tles)
+    assert packets(tles, norad_ids=(3, 5)) == [whole[0]] + whole[3:6]
+    assert packets(tles, norad_ids=(100000, 100001)) == whole[:2]
+    assert packets(tles, norad_ids=(6, 110001)) == [whole[0]] + whole[1:3] + whole[6:]
+    assert packets(tles, norad_ids=(8, 99999)) == whole[:1]
+
+
+def test_page_and_range_combined(packets):
+    'with both, the satellites of the page within the range are selected'
+    tles = synthetic_catalog(SIZE)
+    whole = packets(tles)
+    assert packets(tles, page=1, page_size=3, norad_ids=(5, 7)) == [whole[0]] + whole[5:7]
+
+
+def test_selected_satellites_counted_without_parsing():
+    'count_tles counts the satellites a page or range selects'
+    tles = with_alpha5(synthetic_catalog(SIZE), ['A0001'])
+    assert count_tles(tles) == SIZE
+    assert count_tles(tles, select_satellites(2, 3)) == 1
+    assert count_tles(tles, select_satellites(norad_ids=(2, 100001))) == SIZE
+    assert count_tles(tles, select_satellites(0, 3, (3, 100001))) == 2
+
+
+@pytest.mark.parametrize('field, number', [('25544', 25544), ('00005', 5), ('5', 5),
+                                           ('A0000', 100000), ('a0001', 100001),
+                                           ('H9999', 179999), ('J0000', 180000),
+                                           ('Z9999', 339999)])
+def test_catalog_number(field, number):
+    'five digit and alpha 5 catalog numbers are decoded, I and O skipped as they look like digits'
+    assert catalog_number(field) == number
+
+
+@pytest.mark.parametrize('field', ['', 'A', 'A01', 'A-001', 'I0001', 'O0001', '1.5', '2A'])
+def test_malformed_catalog_number(field):
+    'anything else is a ValueError'
+    with pytest.raises(ValueError):
+        catalog_number(field)
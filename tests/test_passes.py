@@ -0,0 +1,161 @@
+''' checks pass prediction against a dense scan of elevations '''
+
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from sgp4.propagation import sgp4
+
+from benchmarks.catalog import CATALOG_EPOCH, make_tle, synthetic_catalog
+from tle2czmlMaster.tle2czml import ephemeris, frames, passes
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, TimeGrid, get_number_of_positions,
+                                              read_tles)
+
+HOURS = 12
+TIME_STEP = 60
+LATITUDE = 52.23
+LONGITUDE = 21.01
+MIN_ELEVATION = 10.0
+# degrees a refined rise or set may be off the minimum elevation, or a culmination low
+ELEVATION_TOLERANCE = 1e-3
+# seconds between the elevations of the dense scan
+DENSE_STEP = 2
+
+
+class Elevations:
+    '''
+    Elevations seen from a station computed sample by sample with SGP4
+    '''
+
+    def __init__(self, satellites, time_grid, latitude, longitude, altitude):
+        self.satellites = satellites
+        self.time_grid = time_grid
+        self.station, self.up = passes.station_frame(latitude, longitude, altitude)
+
+    def __call__(self, index, seconds):
+        'returns the elevation in degrees of satellite index, seconds into the grid'
+        tle = self.satellites[index].tle_object
+        seconds = np.atleast_1d(seconds)
+        start = self.time_grid.minutes_since_epoch(tle)[0]
+        teme = np.array([sgp4(tle, start + offset / 60.0)[0] for offset in seconds]) * 1000
+        julian_dates = self.time_grid.julian_dates[0] + seconds / frames.SECONDS_IN_DAY
+        ecef = frames.teme_to_ecef(teme, frames.gmst(julian_dates))
+        return np.degrees(np.arcsin(passes.sine_elevations(ecef, self.station, self.up)))
+
+
+def time_grid(time_step, start_time=CATALOG_EPOCH, hours=HOURS):
+    'returns the grid of samples time_step seconds apart over hours from start_time'
+    return TimeGrid(start_time, get_number_of_positions(
+        start_time, start_time + timedelta(hours=hours), time_step), time_step)
+
+
+def dense_passes(satellites):
+    '''returns (satellite, rise, culmination, set, max elevation) of the passes of a scan
+    DENSE_STEP seconds apart that rise and set within it, times to the nearest sample'''
+    grid = time_grid(DENSE_STEP)
+    ecef = frames.teme_to_ecef(ephemeris.propagate_catalog(satellites, grid),
+                               frames.gmst(grid.julian_dates))
+    station, up = passes.station_frame(LATITUDE, LONGITUDE, 0.0)
+    elevations = np.degrees(np.arcsin(passes.sine_elevations(ecef, station, up)))
+    found = []
+    for index, row in enumerate(elevations):
+        above = np.concatenate(([False], row > MIN_ELEVATION, [False]))
+        change = np.diff(above.astype(np.int8))
+        for start, stop in zip(np.flatnonzero(change == 1), np.flatnonzero(change == -1)):
+            if start > 0 and stop < len(row):
+                highest = start + np.argmax(row[start:stop])
+                found.append((index, start * DENSE_STEP, highest * DENSE_STEP,
+                              stop * DENSE_STEP, row[highest]))
+    return found
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    'returns the satellites of a catalog of 20, their grid and positions'
+    satellites = read_tles(synthetic_catalog(20), Colors())
+    grid = time_grid(TIME_STEP)
+    return satellites, grid, ephemeris.propagate_catalog(satellites, grid)
+
+
+def test_passes_match_dense_scan(catalog):
+    '''every pass of the scan is found, its rise and set within a scan step and its
+    culmination no lower than the scan's highest sample'''
+    satellites, grid, positions = catalog
+    found = passes.predict_passes(positions, grid, LATITUDE, LONGITUDE, 0.0, MIN_ELEVATION)
+    dense = dense_passes(satellites)
+    assert len(dense) >= 5
+    whole = [found_pass for found_pass in found
+             if found_pass.rise is not None and found_pass.set is not None]
+    # passes shorter than the time step may fall between samples and be missed
+    assert len(whole) <= len(dense)
+    assert len(whole) >= len([scanned for scanned in dense
+                              if scanned[3] - scanned[1] > TIME_STEP])
+    for index, rise, culmination, set_time, highest in dense:
+        if set_time - rise <= TIME_STEP:
+            continue
+        matched = [found_pass for found_pass in whole if found_pass.satellite == index and
+                   abs(found_pass.rise - rise) <= DENSE_STEP]
+        assert len(matched) == 1
+        found_pass = matched[0]
+        assert found_pass.rise < found_pass.culmination < found_pass.set
+        assert abs(found_pass.set - set_time) <= DENSE_STEP
+        assert abs(found_pass.culmination - culmination) <= DENSE_STEP
+        assert highest - ELEVATION_TOLERANCE <= found_pass.max_elevation <= highest + 0.01
+
+
+def test_refined_times_against_sgp4(catalog):
+    '''rise and set sit on the minimum elevation, and culminations away from the window edges
+    are no lower than a second either side, as computed by SGP4 itself'''
+    satellites, grid, positions = catalog
+    found = passes.predict_passes(positions, grid, LATITUDE, LONGITUDE, 0.0, MIN_ELEVATION)
+    elevation = Elevations(satellites, grid, LATITUDE, LONGITUDE, 0.0)
+    end = (len(grid) - 1) * TIME_STEP
+    for found_pass in found:
+        for crossing in (found_pass.rise, found_pass.set):
+            if crossing is not None:
+                assert abs(elevation(found_pass.satellite, crossing)[0] - MIN_ELEVATION) <= (
+                    ELEVATION_TOLERANCE)
+        culmination = found_pass.culmination
+        around = elevation(found_pass.satellite, [culmination - 1, culmination, culmination + 1])
+        assert abs(around[1] - found_pass.max_elevation) <= ELEVATION_TOLERANCE
+        # a pass under way when the window opens or closes may peak at the edge
+        if 1 <= culmination <= end - 1:
+            # geostationary objects barely move, so allow for noise
+            assert around[1] >= around[[0, 2]].max() - ELEVATION_TOLERANCE
+    assert [found_pass.rise or -1 for found_pass in found] == sorted(
+        found_pass.rise or -1 for found_pass in found)
+
+
+def test_pass_under_way_at_window_edges(catalog):
+    'a pass already risen when the window opens has no rise, one not yet set no set'
+    satellites, grid, positions = catalog
+    found = passes.predict_passes(positions, grid, LATITUDE, LONGITUDE, 0.0, MIN_ELEVATION)
+    whole = next(found_pass for found_pass in found if found_pass.rise is not None and
+                 found_pass.set is not None and found_pass.set - found_pass.rise > 4 * TIME_STEP)
+    middle = round((whole.rise + whole.set) / 2)
+    later = time_grid(TIME_STEP, CATALOG_EPOCH + timedelta(seconds=middle), 1)
+    earlier = time_grid(TIME_STEP, CATALOG_EPOCH + timedelta(seconds=middle - 3600), 1)
+    for window, offset in ((later, middle), (earlier, middle - 3600)):
+        satellite = [satellites[whole.satellite]]
+        edge = passes.predict_passes(ephemeris.propagate_catalog(satellite, window), window,
+                                     LATITUDE, LONGITUDE, 0.0, MIN_ELEVATION)
+        assert len(edge) == 1
+        if window is later:
+            assert edge[0].rise is None
+            assert abs(edge[0].set + offset - whole.set) <= 1e-3
+        else:
+            assert edge[0].set is None
+            assert abs(edge[0].rise + offset - whole.rise) <= 1e-3
+
+
+def test_satellite_never_rising():
+    'an equatorial orbit is never seen from a station at 52 degrees north'
+    tles = '\n'.join(make_tle(1, 'EQUATORIAL', CATALOG_EPOCH, 0.0, 0.0, 0.001, 0.0, 0.0,
+                              15.2)) + '\n'
+    satellites = read_tles(tles, Colors())
+    grid = time_grid(TIME_STEP)
+    positions = ephemeris.propagate_catalog(satellites, grid)
+    assert passes.predict_passes(positions, grid, LATITUDE, LONGITUDE, 0.0, 0.0) == []
+    assert passes.predict_tles(tles, CATALOG_EPOCH, LATITUDE, LONGITUDE,
+                               end_time=CATALOG_EPOCH + timedelta(hours=HOURS)) == []
+    assert passes.predict_passes(positions[:0], grid, LATITUDE, LONGITUDE) == []
@@ -0,0 +1,61 @@
+''' checks the generated serializers write what data() does '''
+
+import json
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from benchmarks.serializer import assorted_packet, build_document
+from tle2czmlMaster.tle2czml import compact, czml, serializer
+from tle2czmlMaster.tle2czml.tle2czml import (REFERENCE_FRAMES, TIME_STEP, Colors,
+                                              read_tles, tles_to_czml)
+
+END_TIME = CATALOG_EPOCH + timedelta(hours=6)
+
+
+@pytest.fixture(scope='module')
+def satellites():
+    'returns a small synthetic catalog'
+    return read_tles(synthetic_catalog(20), Colors())
+
+
+@pytest.mark.parametrize('reference_frame', REFERENCE_FRAMES)
+def test_document_matches_data(satellites, reference_frame):
+    'the generated serializers return the packets data() does, in every reference frame'
+    doc = build_document(satellites, CATALOG_EPOCH, END_TIME, TIME_STEP, reference_frame)
+    assert serializer.document(doc) == list(doc.data())
+
+
+@pytest.mark.parametrize('reference_frame', REFERENCE_FRAMES)
+def test_dumps_matches_data(satellites, reference_frame):
+    'dumps writes the JSON of data()'
+    doc = build_document(satellites, CATALOG_EPOCH, END_TIME, TIME_STEP, reference_frame)
+    assert json.loads(serializer.dumps(doc)) == json.loads(json.dumps(list(doc.data())))
+
+
+def test_assorted_packet_matches_data():
+    'nested, datetime, delegating and hand written data() properties serialize the same'
+    packet = assorted_packet(CATALOG_EPOCH)
+    assert serializer.serialize(packet) == packet.data()
+
+
+def test_lone_number_collapses():
+    'a Number holding only a constant serializes to the constant, as its data() does'
+    number = czml.Number(3)
+    assert serializer.serialize(number) == number.data()
+
+
+@pytest.mark.parametrize('options', [{'compact': True}, {'templated': True}])
+def test_documents_agree_across_models(options):
+    'the compact and templated models write the document the czml objects do'
+    tles = synthetic_catalog(10)
+    expected = tles_to_czml(tles, CATALOG_EPOCH, END_TIME, silent=True)
+    assert tles_to_czml(tles, CATALOG_EPOCH, END_TIME, silent=True, **options) == expected
+
+
+def test_compact_model_keeps_its_data():
+    'the compact model is not given a generated serializer'
+    position = compact.Position()
+    position.cartesian = [0, 1, 2, 3]
+    assert serializer.serialize(position) == position.data()
@@ -0,0 +1,36 @@
+''' checks templated documents against the object model '''
+
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import CATALOG_EPOCH, synthetic_catalog
+from tle2czmlMaster.tle2czml import templates
+from tle2czmlMaster.tle2czml import tle2czml as pipeline
+
+END_TIME = CATALOG_EPOCH + timedelta(hours=6)
+
+
+def test_template_does_not_propagate(monkeypatch):
+    'building a template leaves the propagation to the satellites rendered from it'
+    sat = pipeline.read_tles(synthetic_catalog(1), pipeline.Colors())[0]
+    time_grid = pipeline.TimeGrid(CATALOG_EPOCH, 10)
+
+    def propagate(*args, **kwargs):
+        raise AssertionError('the template propagated its stand in')
+    monkeypatch.setattr(pipeline, 'get_future_sat_positions', propagate)
+    template = templates.satellite_template(sat, CATALOG_EPOCH, END_TIME, 300, time_grid,
+                                            'INERTIAL')
+    assert 'samples' in template.fields
+
+
+@pytest.mark.parametrize('options', [
+    {}, {'reference_frame': 'FIXED'}, {'overview': True, 'labels': False},
+    {'ground_tracks': True, 'footprint_half_angle': 30.0}, {'orbit_rings': True}])
+def test_templated_matches_objects(options):
+    'templated documents are byte for byte those of the object model'
+    tles = synthetic_catalog(10)
+    expected = pipeline.tles_to_czml(tles, CATALOG_EPOCH, END_TIME, silent=True, **options)
+    assert pipeline.tles_to_czml(tles, CATALOG_EPOCH, END_TIME, silent=True, templated=True,
+                                 **options) == expected
+
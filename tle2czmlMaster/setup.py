@@ -20,13 +20,16 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     install_requires=[
+        'numpy>=1.13',
         'pygeoif>=0.7',
         'python-dateutil>=2.6.1',
-        'pytz>=2018.3',
         'sgp4>=1.4',
         'six>=1.11.0',
         'wheel>=0.24.0',
     ],
+    entry_points={
+        'console_scripts': ['tle2czml=tle2czml.cli:main'],
+    },
     include_package_data=True,
     zip_safe=False
 )
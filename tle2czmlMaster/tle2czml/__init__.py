@@ -2,4 +2,4 @@
 
 from .czml import (CZML, Billboard, CZMLPacket, Description, Label, Path,
                    Position)
-from .tle2czml import create_czml, tles_to_czml
+from .tle2czml import create_czml, deduplicate_tles, tles_to_czml
@@ -0,0 +1,283 @@
+''' compresses the ephemerides of whole catalogs into piecewise Chebyshev polynomials
+
+Each satellite's window is split into segments about an orbit long. SGP4 is sampled at
+the Chebyshev nodes of every segment, the samples are turned into the coefficients of the
+polynomial through them, and the coefficients too small to matter for the tolerance are
+chopped off. The fit is then checked against SGP4 between the nodes and segments missing
+the tolerance are split in two and fitted again. An Ephemeris keeps only the coefficients
+and where each segment starts, and evaluates them at any time, so samples at any step can
+be rebuilt from it without propagating again.
+'''
+
+import io
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.polynomial import chebyshev
+from sgp4.earth_gravity import wgs72
+
+try:
+    from sgp4.api import WGS72, Satrec
+except ImportError:
+    Satrec = None
+
+from sgp4.propagation import sgp4
+
+from .instrumentation import stage
+from .tle2czml import (SECONDS_IN_DAY, Colors, TimeGrid, deduplicate_tles, read_tles,
+                       report_collapsed)
+
+# metres the polynomials may be away from SGP4
+DEFAULT_TOLERANCE = 1.0
+# Chebyshev nodes each segment is fitted through, one more than the highest degree kept
+NODES = 32
+# orbits in a segment before any is split, and the shortest segment, in seconds, split to;
+# longer segments through more nodes save little and slow down every lookup
+SEGMENT_ORBITS = 1.0
+MIN_SEGMENT = 60.0
+
+
+class Ephemeris:
+    '''
+    Piecewise Chebyshev polynomials through the TEME positions, in metres, of satellites
+    over a window of duration seconds from start_time
+    '''
+
+    def __init__(self, names, start_time, duration, segment_offsets, starts, counts,
+                 coefficients, tolerance=DEFAULT_TOLERANCE):
+        self.names = list(names)
+        self.start_time = start_time
+        self.duration = float(duration)
+        self.tolerance = tolerance
+        # the furthest the fit was found from SGP4, when it was fitted rather than loaded
+        self.largest_error = None
+        # the segments of satellite i are segment_offsets[i] up to segment_offsets[i + 1]
+        self.segment_offsets = np.asarray(segment_offsets, dtype=np.int64)
+        # seconds from start_time each segment starts, and the coefficients it keeps
+        self.starts = np.asarray(starts, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.uint8)
+        # every segment's coefficients one after the other, shaped (coefficients, 3)
+        self.coefficients = np.asarray(coefficients, dtype=float).reshape(-1, 3)
+
+        self.satellite_of = np.repeat(np.arange(len(self.names)), np.diff(self.segment_offsets))
+        last = np.zeros(len(self.starts), dtype=bool)
+        last[self.segment_offsets[1:][np.diff(self.segment_offsets) > 0] - 1] = True
+        self.ends = np.where(last, self.duration, np.append(self.starts[1:], self.duration))
+        self._padded = None
+        # sorted over the whole catalog, satellite by satellite, for searchsorted
+        self._span = self.duration + 1
+        self._keys = self.starts + self.satellite_of * self._span
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        'returns the bytes the coefficients and segments take'
+        return (self.segment_offsets.nbytes + self.starts.nbytes + self.counts.nbytes +
+                self.coefficients.nbytes)
+
+    def positions(self, seconds):
+        '''returns the positions of every satellite seconds from start_time, shaped
+        (sats, times, 3), nan outside the window and where SGP4 could not propagate'''
+        seconds = np.asarray(seconds, dtype=float).reshape(-1)
+        shape = (len(self.names), len(seconds))
+        if not len(self.starts):
+            return np.full(shape + (3,), np.nan)
+        inside = (seconds >= 0) & (seconds <= self.duration)
+        clipped = np.clip(seconds, 0, self.duration)
+        queries = np.arange(len(self.names))[:, None] * self._span + clipped[None, :]
+        segments = np.clip(np.searchsorted(self._keys, queries, 'right') - 1, 0, None)
+        starts = self.starts[segments]
+        x = 2 * (clipped - starts) / (self.ends[segments] - starts) - 1
+        values = self.evaluate(segments, x)
+        values[~np.broadcast_to(inside, shape)] = np.nan
+        return values
+
+    def evaluate(self, segments, x):
+        'returns the polynomials of segments at x, within [-1, 1], by Clenshaw\'s recurrence'
+        if self._padded is None:
+            # the coefficients of every segment padded with zeros to the longest one's
+            degrees = np.arange(int(self.counts.max()))
+            self._padded = np.zeros((len(self.counts), len(degrees), 3))
+            self._padded[degrees[None, :] < self.counts[:, None]] = self.coefficients
+        x = x[..., None]
+        previous = np.zeros(x.shape[:-1] + (3,))
+        before = np.zeros_like(previous)
+        for degree in range(int(self.counts[segments].max()) - 1, 0, -1):
+            previous, before = (2 * x * previous - before + self._padded[segments, degree],
+                                previous)
+        return x * previous - before + self._padded[segments, 0]
+
+    def position_at(self, moment):
+        'returns the position of every satellite at the datetime moment, shaped (sats, 3)'
+        return self.positions([(moment - self.start_time).total_seconds()])[:, 0]
+
+    def sample(self, time_grid):
+        'returns the positions of every satellite on time_grid, as propagate_catalog does'
+        offset = (time_grid.start_time - self.start_time).total_seconds()
+        return self.positions(offset + np.asarray(time_grid.offsets, dtype=float))
+
+    def sample_lists(self, time_grid):
+        'returns the samples of every satellite on time_grid as get_future_sat_positions does'
+        positions = self.sample(time_grid)
+        samples = np.empty(positions.shape[:2] + (4,))
+        samples[..., 0] = time_grid.offsets
+        samples[..., 1:] = positions
+        return samples.reshape(len(self.names), -1).tolist()
+
+    def dumps(self):
+        'returns the ephemeris as bytes loads reads back'
+        buffer = io.BytesIO()
+        np.savez(buffer, names=np.array(self.names, dtype=str),
+                 start_time=np.array(self.start_time.isoformat()),
+                 duration=np.array(self.duration), tolerance=np.array(self.tolerance),
+                 segment_offsets=self.segment_offsets, starts=self.starts, counts=self.counts,
+                 coefficients=self.coefficients)
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, data):
+        'returns the ephemeris dumps wrote to data'
+        arrays = np.load(io.BytesIO(data), allow_pickle=False)
+        return cls(arrays['names'].tolist(),
+                   datetime.fromisoformat(str(arrays['start_time'])),
+                   float(arrays['duration']), arrays['segment_offsets'], arrays['starts'],
+                   arrays['counts'], arrays['coefficients'], float(arrays['tolerance']))
+
+
+def chebyshev_nodes(count):
+    'returns the Chebyshev points of the first kind on [-1, 1], from -1 up'
+    return -np.cos(np.pi * (np.arange(count) + 0.5) / count)
+
+
+def fit_matrix(count):
+    'returns the matrix taking values at chebyshev_nodes(count) to Chebyshev coefficients'
+    matrix = chebyshev.chebvander(chebyshev_nodes(count), count - 1).T * 2 / count
+    matrix[0] /= 2
+    return matrix
+
+
+def check_points(count):
+    'returns the ends of [-1, 1] and the points halfway between chebyshev_nodes(count)'
+    nodes = chebyshev_nodes(count)
+    return np.concatenate(([-1.0], (nodes[1:] + nodes[:-1]) / 2, [1.0]))
+
+
+def propagate_seconds(sat, start_grid, seconds):
+    'returns the TEME positions in metres of sat at seconds from the grid start, nan on errors'
+    if Satrec is not None:
+        record = Satrec.twoline2rv(sat.raw_tle[1], sat.raw_tle[2], WGS72)
+        jd = np.full(len(seconds), float(start_grid.start_jd))
+        errors, kilometres, _ = record.sgp4_array(jd, start_grid.start_fr + seconds / SECONDS_IN_DAY)
+        kilometres[errors != 0] = np.nan
+        return kilometres * 1000
+    start = start_grid.minutes_since_epoch(sat.tle_object)[0]
+    positions = np.empty((len(seconds), 3))
+    for index, offset in enumerate(seconds):
+        kilometres = sgp4(sat.tle_object, start + offset / 60.0)[0]
+        positions[index] = np.nan if sat.tle_object.error else kilometres
+    return positions * 1000
+
+
+def fit_satellite(sat, start_grid, duration, tolerance, nodes, segment_orbits, min_segment):
+    '''returns the starts of the segments fitted to sat, their chopped coefficients and the
+    largest error found between the nodes'''
+    x_nodes = chebyshev_nodes(nodes)
+    x_checks = check_points(nodes)
+    matrix = fit_matrix(nodes)
+    check_terms = chebyshev.chebvander(x_checks, nodes - 1)
+    length = min(duration, sat.orbital_time_in_minutes * 60 * segment_orbits) or duration
+    bounds = np.linspace(0, duration, max(1, math.ceil(duration / length)) + 1)
+    pending = list(zip(bounds[:-1], bounds[1:]))
+    fitted = []
+    largest = 0.0
+    while pending:
+        starts = np.array([start for start, _ in pending])
+        lengths = np.array([end - start for start, end in pending])
+        points = np.concatenate((x_nodes, x_checks))
+        seconds = starts[:, None] + (points[None, :] + 1) / 2 * lengths[:, None]
+        values = propagate_seconds(sat, start_grid, seconds.reshape(-1)).reshape(
+            len(pending), len(points), 3)
+        at_nodes, truth = values[:, :nodes], values[:, nodes:]
+        coefficients = np.einsum('kn,snd->skd', matrix, at_nodes)
+
+        # the highest coefficients whose sum stays within half the tolerance are dropped
+        magnitudes = np.abs(coefficients).max(axis=2)
+        tails = np.cumsum(magnitudes[:, ::-1], axis=1)[:, ::-1]
+        counts = np.maximum((tails > tolerance / 2).sum(axis=1), 1)
+        kept = np.arange(nodes)[None, :] < counts[:, None]
+        approximated = np.einsum('ck,skd->scd', check_terms, coefficients * kept[..., None])
+        errors = np.linalg.norm(approximated - truth, axis=2).max(axis=1)
+        # SGP4 still returns positions once an orbit has decayed
+        valid = np.isfinite(values).all(axis=2) & (
+            np.linalg.norm(values, axis=2) >= wgs72.radiusearthkm * 1000)
+        lost = ~valid.all(axis=1)
+
+        pending_next = []
+        for index, (start, end) in enumerate(pending):
+            splittable = end - start >= 2 * min_segment
+            # valid[index, nodes] is the segment's start, from which a lost one is lost whole
+            if lost[index] and not (valid[index, nodes] and splittable):
+                fitted.append((start, None))
+            elif (lost[index] or errors[index] > tolerance) and splittable:
+                middle = (start + end) / 2
+                pending_next.extend(((start, middle), (middle, end)))
+            else:
+                largest = max(largest, errors[index])
+                fitted.append((start, coefficients[index, :counts[index]]))
+        pending = pending_next
+    fitted.sort(key=lambda segment: segment[0])
+    # every position from the first one lost on is nan, as ephemeris.drop_decayed leaves them
+    for index, (start, kept) in enumerate(fitted):
+        if kept is None:
+            fitted[index:] = [(start, np.full((1, 3), np.nan))]
+            break
+    return [start for start, _ in fitted], [kept for _, kept in fitted], largest
+
+
+def compress(satellites, start_time, end_time, tolerance=DEFAULT_TOLERANCE, nodes=NODES,
+             segment_orbits=SEGMENT_ORBITS, min_segment=MIN_SEGMENT):
+    '''
+    returns the Ephemeris of satellites from start_time to end_time, within tolerance metres
+    of SGP4 wherever segments of min_segment seconds can be; its largest_error is the
+    furthest it was found from SGP4 between the nodes
+    '''
+    if not 2 <= nodes <= 255:
+        raise ValueError('nodes must be within [2, 255]')
+    duration = (end_time - start_time).total_seconds()
+    if duration <= 0:
+        raise ValueError('end_time must be after start_time')
+    start_grid = TimeGrid(start_time, 1)
+    segment_offsets = [0]
+    starts = []
+    counts = []
+    coefficients = []
+    largest = 0.0
+    for sat in satellites:
+        sat_starts, sat_coefficients, error = fit_satellite(
+            sat, start_grid, duration, tolerance, nodes, segment_orbits, min_segment)
+        largest = max(largest, error)
+        starts.extend(sat_starts)
+        counts.extend(len(kept) for kept in sat_coefficients)
+        coefficients.extend(sat_coefficients)
+        segment_offsets.append(len(starts))
+    ephemeris = Ephemeris([sat.sat_name for sat in satellites], start_grid.start_time,
+                          duration, segment_offsets, starts, counts,
+                          np.concatenate(coefficients) if coefficients else np.empty((0, 3)),
+                          tolerance)
+    ephemeris.largest_error = largest
+    return ephemeris
+
+
+def compress_tles(tles, start_time, end_time=None, tolerance=DEFAULT_TOLERANCE):
+    'returns the Ephemeris of the objects of a TLE string, over 24 hours unless end_time is given'
+    if end_time is None:
+        end_time = start_time + timedelta(hours=24)
+    with stage('parse'):
+        tles, collapsed = deduplicate_tles(tles)
+        report_collapsed(collapsed)
+        satellites = read_tles(tles, Colors())
+    with stage('propagate'):
+        return compress(satellites, start_time, end_time, tolerance)
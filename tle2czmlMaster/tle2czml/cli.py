@@ -0,0 +1,181 @@
+''' command line entry point for converting many TLE files to CZML in parallel '''
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from .tle2czml import (REFERENCE_FRAMES, TIME_STEP, deduplicate_tles, report_collapsed,
+                       tles_to_czml)
+
+OUTPUT_FORMATS = ('czml', 'czml.gz')
+DEFAULT_PATTERNS = ('.tle', '.txt')
+
+
+def parse_time(value):
+    'parses an ISO 8601 string, assuming UTC when no offset is given'
+    # only needed for --start and --end, so not imported with the module
+    from dateutil import parser
+    parsed = parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def find_inputs(paths, extensions=DEFAULT_PATTERNS):
+    'expands directories into the TLE files they contain'
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if os.path.isfile(full_path) and name.lower().endswith(extensions):
+                    inputs.append(full_path)
+        else:
+            inputs.append(path)
+    return inputs
+
+
+def output_path_for(input_path, output_dir, output_format):
+    'returns the path the converted document is written to'
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    directory = output_dir if output_dir else os.path.dirname(input_path)
+    return os.path.join(directory, stem + '.' + output_format)
+
+
+def convert_file(input_path, output_path, start_time, end_time, time_step, output_format,
+                 reference_frame='INERTIAL'):
+    'converts a single TLE file and returns its timing figures'
+    started = time.perf_counter()
+    with open(input_path, 'r') as tle_src:
+        tles = tle_src.read()
+
+    tles, collapsed = deduplicate_tles(tles)
+    report_collapsed(collapsed, silent=True)
+    doc = tles_to_czml(tles, start_time=start_time, end_time=end_time,
+                       silent=True, time_step=time_step, reference_frame=reference_frame,
+                       deduplicate=False)
+
+    if output_format == 'czml.gz':
+        with gzip.open(output_path, 'wt') as file:
+            file.write(doc)
+    else:
+        with open(output_path, 'w') as file:
+            file.write(doc)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        'satellites': len(tles.splitlines()) // 3,
+        'collapsed': collapsed,
+        'seconds': time.perf_counter() - started,
+        'bytes': os.path.getsize(output_path),
+    }
+
+
+def _convert_job(job):
+    'unpacks a job tuple, process pools can only map over a single argument'
+    return convert_file(*job)
+
+
+def report_file(stats, out=None):
+    'prints timing and throughput for a converted file, to stdout unless out is given'
+    out = out or sys.stdout
+    rate = stats['satellites'] / stats['seconds'] if stats['seconds'] else 0.0
+    out.write('{} -> {}: {} satellites in {:.2f}s ({:.1f} sat/s, {:.1f} KB){}\n'.format(
+        stats['input'], stats['output'], stats['satellites'], stats['seconds'],
+        rate, stats['bytes'] / 1024.0, collapsed_note(stats)))
+
+
+def collapsed_note(stats):
+    'returns the note on the duplicates stats counts as collapsed, empty when there were none'
+    if not stats.get('collapsed'):
+        return ''
+    return ', {} duplicates collapsed'.format(stats['collapsed'])
+
+
+def report_total(results, wall_seconds, out=None):
+    'prints totals for the whole batch, to stdout unless out is given'
+    out = out or sys.stdout
+    satellites = sum(stats['satellites'] for stats in results)
+    written = sum(stats['bytes'] for stats in results)
+    collapsed = sum(stats.get('collapsed', 0) for stats in results)
+    wall_seconds = wall_seconds or float('inf')
+    out.write('{} files, {} satellites in {:.2f}s ({:.2f} files/s, {:.1f} sat/s, {:.1f} MB){}\n'.format(
+        len(results), satellites, wall_seconds, len(results) / wall_seconds,
+        satellites / wall_seconds, written / (1024.0 * 1024.0),
+        collapsed_note({'collapsed': collapsed})))
+
+
+def build_parser():
+    'returns the argument parser for the tle2czml command'
+    arg_parser = argparse.ArgumentParser(
+        prog='tle2czml',
+        description='Convert files of two line elements to CZML documents.')
+    arg_parser.add_argument('inputs', nargs='+',
+                            help='TLE files or directories containing .tle/.txt files')
+    arg_parser.add_argument('-o', '--output-dir',
+                            help='directory to write documents to (default: next to each input)')
+    arg_parser.add_argument('--start', type=parse_time,
+                            help='start of the visualised window, ISO 8601 (default: now, UTC)')
+    arg_parser.add_argument('--end', type=parse_time,
+                            help='end of the visualised window, ISO 8601 (default: start + --hours)')
+    arg_parser.add_argument('--hours', type=float, default=24.0,
+                            help='length of the window when --end is not given (default: 24)')
+    arg_parser.add_argument('--step', type=int, default=TIME_STEP,
+                            help='seconds between position samples (default: {})'.format(TIME_STEP))
+    arg_parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS,
+                            default='czml', help='output format (default: czml)')
+    arg_parser.add_argument('--frame', choices=REFERENCE_FRAMES, default='INERTIAL',
+                            help='frame positions are written in, FIXED and CARTOGRAPHIC are '
+                                 'converted from TEME before writing (default: INERTIAL)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                            help='number of worker processes (default: number of CPUs)')
+    return arg_parser
+
+
+def main(argv=None):
+    'runs the tle2czml command'
+    args = build_parser().parse_args(argv)
+
+    if args.step <= 0:
+        sys.stderr.write('tle2czml: --step must be a positive number of seconds\n')
+        return 2
+
+    start_time = args.start if args.start else datetime.now(timezone.utc)
+    end_time = args.end if args.end else start_time + timedelta(hours=args.hours)
+
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        sys.stderr.write('tle2czml: no input files found\n')
+        return 1
+
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    jobs = [(path, output_path_for(path, args.output_dir, args.output_format),
+             start_time, end_time, args.step, args.output_format, args.frame)
+            for path in inputs]
+
+    started = time.perf_counter()
+    results = []
+    if args.jobs and args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            for stats in executor.map(_convert_job, jobs):
+                report_file(stats)
+                results.append(stats)
+    else:
+        for job in jobs:
+            stats = _convert_job(job)
+            report_file(stats)
+            results.append(stats)
+
+    report_total(results, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
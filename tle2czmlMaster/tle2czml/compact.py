@@ -0,0 +1,257 @@
+''' slotted, allocation light versions of the CZML packets tle2czml writes
+
+Every class lists its properties once, on the class, and keeps values ready to
+serialize: positions as one flat list of floats rather than an object per sample,
+colors, materials and intervals as the dicts and lists they were given. data()
+returns the same structure as the matching class in the czml module for the
+values tle2czml assigns, but inputs are not parsed or validated beyond that.
+'''
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from datetime import date, datetime
+
+
+def isoformat(value):
+    'returns dates as ISO 8601 strings and any other value unchanged'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def coordinates(values):
+    'returns [X, Y, Z] or [Time, X, Y, Z, ...] samples as a flat list of floats'
+    if values is None:
+        return None
+    if len(values) != 3 and len(values) % 4:
+        raise ValueError('expected [X, Y, Z] or [Time, X, Y, Z, ...], got {} values'.format(
+            len(values)))
+    try:
+        return [float(value) for value in values]
+    except (TypeError, ValueError):
+        # time tags given as dates or ISO 8601 strings
+        return [isoformat(value) if index % 4 == 0 and len(values) != 3 else float(value)
+                for index, value in enumerate(values)]
+
+
+class _CompactObject(object):
+    'base of the slotted objects, properties are written in _properties order when set'
+
+    __slots__ = ()
+    _properties = ()
+
+    def __init__(self, **kwargs):
+        for name in self._properties:
+            setattr(self, name, None)
+        for name, value in kwargs.items():
+            if name not in self._properties:
+                raise ValueError('unknown property {} for {}'.format(
+                    name, type(self).__name__))
+            setattr(self, name, value)
+
+    def __str__(self):
+        return json.dumps(self.data())
+
+    def dumps(self):
+        return json.dumps(self.data())
+
+    def data(self):
+        d = {}
+        for name in self._properties:
+            value = getattr(self, name)
+            if value is not None:
+                d[name] = value.data() if isinstance(value, _CompactObject) else value
+        return d
+
+
+class Clock(_CompactObject):
+    'the clock settings for the entire data set, only valid on the document packet'
+
+    _properties = ('currentTime', 'multiplier', 'interval', 'range', 'step')
+    __slots__ = _properties
+
+
+class Description(_CompactObject):
+    'a description, written as its string like czml.Description'
+
+    __slots__ = ('string', 'reference')
+    _properties = __slots__
+
+    def __init__(self, string=None, reference=None):
+        self.string = string
+        self.reference = reference
+
+    def data(self):
+        return self.string
+
+
+class Billboard(_CompactObject):
+    'a billboard, or viewport aligned image'
+
+    _properties = ('show', 'image', 'scale')
+    __slots__ = _properties
+
+
+class Label(_CompactObject):
+    'a string of text positioned by the packet position'
+
+    _properties = ('show', 'text', 'horizontalOrigin', 'scale', 'pixelOffset', 'fillColor',
+                   'font', 'outlineColor', 'outlineWidth')
+    # style and verticalOrigin are accepted but, like czml.Label, not written
+    __slots__ = _properties + ('style', 'verticalOrigin')
+
+    def __init__(self, **kwargs):
+        self.style = None
+        self.verticalOrigin = None
+        super(Label, self).__init__(**kwargs)
+
+    def data(self):
+        d = {}
+        if self.show:
+            d['show'] = True
+        elif self.show == False:
+            d['show'] = False
+        for name in self._properties[1:]:
+            value = getattr(self, name)
+            if value:
+                d[name] = value
+        return d
+
+
+class Point(_CompactObject):
+    'a point, or viewport aligned circle, positioned by the packet position'
+
+    _properties = ('show', 'color', 'pixelSize', 'outlineColor', 'outlineWidth')
+    __slots__ = _properties
+
+    def data(self):
+        d = {}
+        if self.show:
+            d['show'] = True
+        elif self.show == False:
+            d['show'] = False
+        for name in self._properties[1:]:
+            value = getattr(self, name)
+            if value:
+                d[name] = value
+        return d
+
+
+class Path(_CompactObject):
+    'a path, the polyline traced by the motion of the packet position'
+
+    _properties = ('show', 'width', 'leadTime', 'trailTime', 'resolution', 'material',
+                   'position')
+    __slots__ = _properties
+
+
+class Polyline(_CompactObject):
+    'a line through positions given as a dict of flat lists, such as a ground track'
+
+    _properties = ('show', 'followSurface', 'width', 'material', 'positions')
+    __slots__ = _properties
+
+
+class Ellipse(_CompactObject):
+    'an ellipse on the surface of the earth, centred below the packet position'
+
+    _properties = ('show', 'fill', 'outline', 'height', 'rotation', 'stRotation',
+                   'granularity', 'extrudedHeight', 'semiMajorAxis', 'semiMinorAxis',
+                   'numberOfVerticalLines', 'outlineColor', 'material', 'position')
+    __slots__ = _properties
+
+
+class Position(_CompactObject):
+    'the position of the object, samples are stored as one flat list of floats'
+
+    _properties = ('epoch', 'nextTime', 'previousTime', 'cartesian', 'cartographicRadians',
+                   'cartographicDegrees', 'interpolationAlgorithm', 'interpolationDegree',
+                   'referenceFrame')
+    __slots__ = ('epoch', 'nextTime', 'previousTime', '_cartesian', '_cartographicRadians',
+                 '_cartographicDegrees', 'interpolationAlgorithm', 'interpolationDegree',
+                 'referenceFrame')
+
+    @property
+    def cartesian(self):
+        'samples as [X, Y, Z] or [Time, X, Y, Z, ...] in metres'
+        return self._cartesian
+
+    @cartesian.setter
+    def cartesian(self, values):
+        self._cartesian = coordinates(values)
+
+    @property
+    def cartographicRadians(self):
+        'samples as [Longitude, Latitude, Height] or time tagged, in radians and metres'
+        return self._cartographicRadians
+
+    @cartographicRadians.setter
+    def cartographicRadians(self, values):
+        self._cartographicRadians = coordinates(values)
+
+    @property
+    def cartographicDegrees(self):
+        'samples as [Longitude, Latitude, Height] or time tagged, in degrees and metres'
+        return self._cartographicDegrees
+
+    @cartographicDegrees.setter
+    def cartographicDegrees(self, values):
+        self._cartographicDegrees = coordinates(values)
+
+    def data(self):
+        d = super(Position, self).data()
+        for name in ('epoch', 'nextTime', 'previousTime'):
+            if name in d:
+                d[name] = isoformat(d[name])
+        return d
+
+
+class CZMLPacket(_CompactObject):
+    'the graphical properties of a single object in the scene'
+
+    _properties = ('id', 'description', 'version', 'availability', 'billboard', 'clock',
+                   'position', 'label', 'point', 'positions', 'polyline', 'polygon', 'path',
+                   'orientation', 'ellipse', 'ellipsoid', 'cone', 'pyramid')
+    __slots__ = ('id', 'description', 'version', 'availability', 'billboard', '_clock',
+                 'position', 'label', 'point', 'positions', 'polyline', 'polygon', 'path',
+                 'orientation', 'ellipse', 'ellipsoid', 'cone', 'pyramid')
+
+    @property
+    def clock(self):
+        'the clock settings, only valid on the document packet'
+        return self._clock
+
+    @clock.setter
+    def clock(self, clock):
+        if isinstance(clock, dict):
+            clock = Clock(**clock)
+        self._clock = clock
+
+
+class CZML(object):
+    'a CZML document, a list of packets serialized as a JSON array'
+
+    __slots__ = ('packets',)
+
+    def __init__(self, packets=None):
+        self.packets = []
+        for packet in packets or ():
+            self.append(packet)
+
+    def __str__(self):
+        return self.dumps()
+
+    def data(self):
+        for packet in self.packets:
+            yield packet.data()
+
+    def dumps(self):
+        return json.dumps(list(self.data()))
+
+    def append(self, packet):
+        if not isinstance(packet, CZMLPacket):
+            raise ValueError
+        self.packets.append(packet)
@@ -0,0 +1,257 @@
+''' screens propagated positions for close approaches between catalog objects
+
+Between two samples every object moves close to the chord joining them, off it by no
+more than an eighth of its second difference. Chord midpoints are hashed into a
+uniform grid whose cells are as wide as the farthest two arcs of the step can be
+apart and still come within the threshold, so only objects in neighbouring cells are
+compared instead of every pair. Pairs whose chords pass within the threshold plus
+both sags are refined on the degree 5 Lagrange interpolation Cesium draws the same
+samples with, which gives the time of closest approach and the miss distance.
+'''
+
+import itertools
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+
+from . import ephemeris
+from .instrumentation import INSTRUMENTATION, increment, stage
+from .tle2czml import (Colors, TimeGrid, deduplicate_tles, get_number_of_positions,
+                       read_tles, report_collapsed)
+
+DEFAULT_THRESHOLD = 10000.0
+DEFAULT_TIME_STEP = 60
+# points each candidate step is evaluated at before the parabolic refinement
+REFINEMENT_POINTS = 33
+# candidates refined at once, bounding the interpolation arrays to a few tens of MB
+REFINEMENT_CHUNK_SIZE = 20000
+# the second difference only estimates the curvature between samples, so allow for more
+SAG_MARGIN = 2.0
+# objects reaching further than this many times the median between samples skip the grid
+WIDE_EXTENT_FACTOR = 4.0
+
+# the cell itself and half of its 26 neighbours, so each pair of cells is visited once
+NEIGHBOUR_CELLS = [(0, 0, 0)] + [offset for offset in itertools.product((-1, 0, 1), repeat=3)
+                                 if offset > (0, 0, 0)]
+
+INSTRUMENTATION.describe('conjunction_candidates_total',
+                         'Object pairs passed from conjunction screening to refinement.')
+
+Conjunction = namedtuple('Conjunction', 'primary secondary time distance relative_speed')
+
+
+def grid_pairs(points, cell_size):
+    'returns index arrays (first, second), first < second, of points in the same or adjacent cells'
+    cells = np.floor(points / cell_size).astype(np.int64)
+    # shift so every cell and its neighbours have non negative coordinates inside span
+    cells -= cells.min(axis=0) - 1
+    span = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    firsts = []
+    seconds = []
+    for dx, dy, dz in NEIGHBOUR_CELLS:
+        # queried in sorted order, which searchsorted answers much faster
+        neighbours = sorted_keys + (dx * span[1] + dy) * span[2] + dz
+        low = np.searchsorted(sorted_keys, neighbours, 'left')
+        counts = np.searchsorted(sorted_keys, neighbours, 'right') - low
+        total = counts.sum()
+        if not total:
+            continue
+        first = np.repeat(order, counts)
+        second = order[np.arange(total) + np.repeat(low - np.cumsum(counts) + counts, counts)]
+        if (dx, dy, dz) == (0, 0, 0):
+            keep = first < second
+            first = first[keep]
+            second = second[keep]
+        firsts.append(first)
+        seconds.append(second)
+    if not firsts:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def sags(positions):
+    'returns how far each object strays from the chords between its samples, in metres'
+    second_differences = positions[:, 2:] - 2 * positions[:, 1:-1] + positions[:, :-2]
+    curvature = np.linalg.norm(second_differences, axis=-1)
+    # objects without a finite second difference are never screened
+    curvature = np.where(np.isfinite(curvature), curvature, 0)
+    return SAG_MARGIN * curvature.max(axis=1, initial=0) / 8
+
+
+def chords_within(start, end, first, second, reach):
+    'returns whether the chords of each pair from start to end pass within reach of each other'
+    # both objects move along their chords over the same step, so the relative motion is linear
+    relative = start[first] - start[second]
+    change = end[first] - end[second] - relative
+    squared_change = np.einsum('ij,ij->i', change, change)
+    fraction = np.clip(-np.einsum('ij,ij->i', relative, change) /
+                       np.where(squared_change > 0, squared_change, 1), 0, 1)
+    return np.linalg.norm(relative + fraction[:, None] * change, axis=1) < reach
+
+
+def wide_pairs(wide, count):
+    'returns index arrays (first, second), first < second, pairing each wide index with all'
+    first = np.repeat(wide, count)
+    second = np.tile(np.arange(count), len(wide))
+    is_wide = np.zeros(count, dtype=bool)
+    is_wide[wide] = True
+    # pairs of two wide indices are kept once
+    keep = (second != first) & (~is_wide[second] | (second > first))
+    first = first[keep]
+    second = second[keep]
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def step_pairs(midpoints, extents, threshold):
+    '''returns index arrays (first, second) of the objects whose arcs, within extents of
+    their midpoints, may come within threshold of each other
+    '''
+    # a few objects moving or curving far more than the rest, such as orbits SGP4 has
+    # propagated too far from their epoch, would blow up the cells for everyone
+    wide = extents > WIDE_EXTENT_FACTOR * np.median(extents)
+    narrow = np.flatnonzero(~wide)
+    first, second = grid_pairs(midpoints[narrow], threshold + 2 * extents[narrow].max())
+    first = narrow[first]
+    second = narrow[second]
+    if wide.any():
+        extra_first, extra_second = wide_pairs(np.flatnonzero(wide), len(midpoints))
+        first = np.concatenate((first, extra_first))
+        second = np.concatenate((second, extra_second))
+    return first, second
+
+
+def screen(positions, threshold):
+    '''returns (first, second, step) index arrays of the pairs that may come within threshold
+    metres between samples step and step + 1
+    '''
+    sag = sags(positions)
+    candidates = ([], [], [])
+    for step in range(positions.shape[1] - 1):
+        start = positions[:, step]
+        end = positions[:, step + 1]
+        valid = np.flatnonzero(np.isfinite(start).all(axis=1) & np.isfinite(end).all(axis=1))
+        if len(valid) < 2:
+            continue
+        midpoints = (start[valid] + end[valid]) / 2
+        extents = np.linalg.norm(end[valid] - start[valid], axis=1) / 2 + sag[valid]
+        first, second = step_pairs(midpoints, extents, threshold)
+
+        # arcs whose midpoints are too far apart cannot meet
+        apart = np.linalg.norm(midpoints[first] - midpoints[second], axis=1)
+        keep = apart < threshold + extents[first] + extents[second]
+        first = valid[first[keep]]
+        second = valid[second[keep]]
+
+        keep = chords_within(start, end, first, second, threshold + sag[first] + sag[second])
+        candidates[0].append(first[keep])
+        candidates[1].append(second[keep])
+        candidates[2].append(np.full(np.count_nonzero(keep), step))
+
+    if not candidates[0]:
+        return tuple(np.empty(0, np.int64) for _ in candidates)
+    return tuple(np.concatenate(column) for column in candidates)
+
+
+def refine(positions, first, second, step, time_step):
+    '''interpolates each candidate's relative position over its step
+
+    Returns the closest approach time in seconds from the first sample, the miss distance
+    in metres and the relative speed in metres per second, one per candidate.
+    '''
+    primary, offset = ephemeris.sample_windows(positions, first, step)
+    relative = primary - ephemeris.sample_windows(positions, second, step)[0]
+
+    fractions = np.linspace(0, 1, REFINEMENT_POINTS)
+    coarse = ephemeris.interpolate(relative, offset[:, None] + fractions)
+    squared = np.einsum('cfk,cfk->cf', coarse, coarse)
+    nearest = np.clip(np.argmin(squared, axis=1), 1, REFINEMENT_POINTS - 2)
+
+    # vertex of the parabola through the nearest coarse point and its neighbours
+    rows = np.arange(len(first))
+    before = squared[rows, nearest - 1]
+    at = squared[rows, nearest]
+    after = squared[rows, nearest + 1]
+    curvature = before - 2 * at + after
+    shift = np.where(curvature > 0, (before - after) / (2 * np.where(curvature > 0, curvature, 1)),
+                     0)
+    spacing = fractions[1]
+    fraction = np.clip(fractions[nearest] + np.clip(shift, -1, 1) * spacing, 0, 1)
+
+    # distance and a central difference of the relative position at the refined time
+    epsilon = 1e-4
+    points = offset[:, None] + fraction[:, None] + np.array([-epsilon, 0.0, epsilon])
+    values = ephemeris.interpolate(relative, points)
+    distance = np.linalg.norm(values[:, 1], axis=1)
+    relative_speed = np.linalg.norm(values[:, 2] - values[:, 0], axis=1) / (2 * epsilon * time_step)
+    return (step + fraction) * time_step, distance, relative_speed
+
+
+def find_conjunctions(positions, time_step, threshold=DEFAULT_THRESHOLD):
+    '''returns the close approaches under threshold metres in positions, sampled every
+    time_step seconds and shaped (sats, times, 3), closest first
+    '''
+    positions = np.asarray(positions, dtype=float)
+    with stage('screen'):
+        first, second, step = screen(positions, threshold)
+    increment('conjunction_candidates_total', len(first))
+
+    with stage('refine'):
+        found = []
+        for chunk in range(0, len(first), REFINEMENT_CHUNK_SIZE):
+            part = slice(chunk, chunk + REFINEMENT_CHUNK_SIZE)
+            time, distance, speed = refine(positions, first[part], second[part], step[part],
+                                           time_step)
+            close = distance < threshold
+            found.append((first[part][close], second[part][close], time[close], distance[close],
+                          speed[close]))
+        if not found:
+            return []
+        first, second, time, distance, speed = (np.concatenate(column) for column in zip(*found))
+
+        # an approach near a sample is found from the steps either side, keep the closer one
+        order = np.lexsort((time, second, first))
+        first, second, time, distance, speed = (column[order] for column in
+                                                (first, second, time, distance, speed))
+        new_event = np.ones(len(first), dtype=bool)
+        new_event[1:] = ((first[1:] != first[:-1]) | (second[1:] != second[:-1]) |
+                         (time[1:] - time[:-1] > time_step))
+        event = np.cumsum(new_event)
+        order = np.lexsort((distance, event))
+        closest = order[np.r_[True, event[order][1:] != event[order][:-1]]]
+        closest = closest[np.argsort(distance[closest], kind='stable')]
+
+    return [Conjunction(int(first[index]), int(second[index]), float(time[index]),
+                        float(distance[index]), float(speed[index]))
+            for index in closest]
+
+
+def screen_tles(tles, start_time, end_time=None, threshold=DEFAULT_THRESHOLD,
+                time_step=DEFAULT_TIME_STEP):
+    '''returns the conjunctions between the objects of a TLE string as JSON ready dicts
+
+    The window defaults to 24 hours; threshold is in metres, time_step in seconds.
+    '''
+    if end_time is None:
+        end_time = start_time + timedelta(hours=24)
+    with stage('parse'):
+        tles, collapsed = deduplicate_tles(tles)
+        report_collapsed(collapsed)
+        satellites = read_tles(tles, Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    with stage('propagate'):
+        positions = ephemeris.propagate_catalog(satellites, time_grid)
+
+    return [{'primary': satellites[conjunction.primary].sat_name,
+             'secondary': satellites[conjunction.secondary].sat_name,
+             'time': (time_grid.start_time + timedelta(seconds=conjunction.time)).isoformat(),
+             'distance': conjunction.distance,
+             'relativeSpeed': conjunction.relative_speed}
+            for conjunction in find_conjunctions(positions, time_step, threshold)]
@@ -0,0 +1,128 @@
+''' estimates what a document costs to generate before any of it is generated
+
+Generation time grows with the position samples propagated, satellites times samples
+each, and the document with those samples and what each satellite packet draws. The
+byte counts are fitted to templated documents of synthetic catalogs and estimate their
+size within about 2 percent, as benchmarks.admission measures. A document over a Budget
+can be fitted to it by sampling coarser and drawing less.
+'''
+
+from datetime import timedelta
+
+from .tle2czml import ORBIT_RING_VERTICES, TIME_STEP, get_number_of_positions
+
+# bytes of the document packet
+DOCUMENT_BYTES = 235
+# bytes of every satellite packet, and of each position sample in it
+PACKET_BYTES = 317
+SAMPLE_BYTES = 69
+# bytes of a path, which has lead and trail times for every orbit in the window
+PATH_BYTES = 1539
+PATH_BYTES_PER_HOUR = 190
+# bytes of the billboard and description overview mode leaves out
+DETAIL_BYTES = 3202
+LABEL_BYTES = 186
+# bytes per position sample of a ground track and of a footprint
+TRACK_SAMPLE_BYTES = 45
+FOOTPRINT_SAMPLE_BYTES = 58
+# bytes of an orbit ring, and of each of its vertices
+RING_BYTES = 1662
+RING_VERTEX_BYTES = 59
+# the coarsest step, in seconds, a document over budget is sampled at
+MAX_DEGRADED_STEP = 1800
+
+
+class Cost:
+    '''
+    What a document takes: satellites, position samples of each and estimated bytes
+    '''
+
+    def __init__(self, satellites, samples, size):
+        self.satellites = satellites
+        self.samples = samples
+        self.size = size
+
+    def position_samples(self):
+        'returns the position samples propagated for the document'
+        return self.satellites * self.samples
+
+
+class Budget:
+    '''
+    The most position samples and bytes one document may take
+    '''
+
+    def __init__(self, max_samples, max_bytes):
+        self.max_samples = max_samples
+        self.max_bytes = max_bytes
+
+    def allows(self, cost):
+        'returns whether cost is within the budget'
+        return cost.position_samples() <= self.max_samples and cost.size <= self.max_bytes
+
+
+class OverBudget(ValueError):
+    'raised for a document that cannot be brought within its budget'
+
+    def __init__(self, cost, budget):
+        super().__init__(
+            'the document would take {} position samples and about {:.1f} MB, over the budget '
+            'of {} samples and {:.1f} MB; ask for a page, fewer satellites or a shorter '
+            'window'.format(cost.position_samples(), cost.size / 1e6, budget.max_samples,
+                            budget.max_bytes / 1e6))
+        self.cost = cost
+        self.budget = budget
+
+
+def estimate(satellites, start_time, end_time, time_step=TIME_STEP, ground_tracks=False,
+             footprint_half_angle=None, overview=False, labels=True, orbit_rings=False,
+             ring_vertices=ORBIT_RING_VERTICES, **options):
+    '''returns the Cost of a document of satellites built with the tles_to_czml options given,
+    the others, such as reference_frame, barely change it'''
+    samples = get_number_of_positions(start_time, end_time, time_step)
+    per_satellite = PACKET_BYTES + samples * SAMPLE_BYTES
+    if not overview:
+        per_satellite += DETAIL_BYTES
+    if orbit_rings:
+        per_satellite += RING_BYTES + (ring_vertices + 1) * RING_VERTEX_BYTES
+    elif not overview:
+        hours = (end_time - start_time) / timedelta(hours=1)
+        per_satellite += PATH_BYTES + hours * PATH_BYTES_PER_HOUR
+    if labels:
+        per_satellite += LABEL_BYTES
+    if ground_tracks:
+        per_satellite += samples * TRACK_SAMPLE_BYTES
+    if footprint_half_angle is not None:
+        per_satellite += samples * FOOTPRINT_SAMPLE_BYTES
+    return Cost(satellites, samples, int(DOCUMENT_BYTES + satellites * per_satellite))
+
+
+def fit(satellites, start_time, end_time, time_step, options, budget, degrade=True,
+        max_step=MAX_DEGRADED_STEP):
+    '''returns the time step and tles_to_czml options bringing a document within budget, and
+    the changes made to them: if degrade the step is doubled up to max_step, and if that is
+    not enough satellites are drawn as points without labels, coverage or rings at the finest
+    step that fits; raises OverBudget if nothing does'''
+    changes = []
+    cost = estimate(satellites, start_time, end_time, time_step, **options)
+    if budget.allows(cost):
+        return time_step, options, changes
+    if not degrade:
+        raise OverBudget(cost, budget)
+    overview = dict(options, overview=True, labels=False, ground_tracks=False,
+                    footprint_half_angle=None, orbit_rings=False)
+    for drawn in (options, overview):
+        degraded_step = time_step
+        cost = estimate(satellites, start_time, end_time, degraded_step, **drawn)
+        while not budget.allows(cost) and degraded_step * 2 <= max_step:
+            degraded_step *= 2
+            cost = estimate(satellites, start_time, end_time, degraded_step, **drawn)
+        if budget.allows(cost):
+            break
+    else:
+        raise OverBudget(cost, budget)
+    if degraded_step != time_step:
+        changes.append('step={}'.format(degraded_step))
+    if drawn is overview:
+        changes.append('overview')
+    return degraded_step, drawn, changes
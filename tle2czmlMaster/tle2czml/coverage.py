@@ -0,0 +1,69 @@
+''' vectorized ground tracks and sensor footprints of a propagated catalog
+
+Both come from one conversion of every satellite's samples to geodetic coordinates:
+the ground track is the sub satellite point at each sample, and the footprint is
+the circle on the ground seen by a nadir pointing sensor of a given half angle,
+clipped to the horizon, whose radius follows the satellite's height.
+'''
+
+import math
+
+import numpy as np
+
+from . import frames
+
+# radius of the sphere footprints are computed on, the WGS 84 mean radius
+EARTH_RADIUS = 6371008.8
+
+
+def ground_tracks(positions, julian_dates):
+    '''returns the sub satellite points of TEME positions (sats, times, 3) as
+    [longitude, latitude, 0] degrees, and each sample's height in metres
+    '''
+    longitude, latitude, height = frames.ecef_to_geodetic(
+        frames.teme_to_ecef(positions, frames.gmst(julian_dates)))
+    tracks = np.zeros(positions.shape)
+    tracks[..., 0] = np.degrees(longitude)
+    tracks[..., 1] = np.degrees(latitude)
+    return tracks, height
+
+
+def footprint_radii(heights, half_angle):
+    '''returns the ground radius in metres seen by a nadir sensor of half_angle degrees
+    from each height, as far as the horizon for wide sensors
+    '''
+    # angular radius of the earth seen from the satellite
+    earth_angle = np.arcsin(EARTH_RADIUS / (EARTH_RADIUS + np.maximum(heights, 0)))
+    sensor_angle = math.radians(half_angle)
+    # angle at the ground point between the sensor edge ray and the local vertical
+    nadir_to_edge = np.arccos(np.minimum(math.sin(sensor_angle) / np.sin(earth_angle), 1))
+    central_angle = np.where(sensor_angle >= earth_angle, math.pi / 2 - earth_angle,
+                             math.pi / 2 - sensor_angle - nadir_to_edge)
+    return EARTH_RADIUS * central_angle
+
+
+def coverage(positions, time_grid, half_angle=None):
+    '''returns each satellite's flat ground track vertices and, with a sensor half_angle,
+    its time tagged footprint radii [Time, radius, ...], as lists
+
+    Samples SGP4 could not propagate are left out; a satellite with fewer than two
+    left has no ground track, and one with none no footprint.
+    '''
+    tracks, heights = ground_tracks(positions, time_grid.julian_dates)
+    finite = np.isfinite(heights)
+    n_sats, n_times = heights.shape
+    track_lists = tracks.reshape(n_sats, n_times * 3).tolist()
+    if half_angle is None:
+        radius_lists = [None] * len(positions)
+    else:
+        radii = np.empty(heights.shape + (2,))
+        radii[..., 0] = time_grid.offsets
+        radii[..., 1] = footprint_radii(heights, half_angle)
+        radius_lists = radii.reshape(n_sats, n_times * 2).tolist()
+
+    for index in np.flatnonzero(~finite.all(axis=1)):
+        kept = np.flatnonzero(finite[index])
+        track_lists[index] = tracks[index, kept].ravel().tolist() if len(kept) > 1 else None
+        if half_angle is not None:
+            radius_lists[index] = radii[index, kept].ravel().tolist() if len(kept) else None
+    return track_lists, radius_lists
@@ -33,11 +33,6 @@ except ImportError:
 
 from datetime import date, datetime
 
-import dateutil.parser
-from pygeoif import geometry
-from pygeoif.geometry import as_shape as asShape
-from pytz import utc
-
 try:
     long
 except NameError:
@@ -54,6 +49,16 @@ except NameError:
 # or otherwise from Pygeoif
 
 
+# edit: dateutil and pygeoif are imported on first use, most documents never parse
+# date strings or take geometry inputs and both are slow to import
+def parse_datetime(value):
+    import dateutil.parser
+    return dateutil.parser.parse(value)
+
+
+def asShape(geom):
+    from pygeoif.geometry import as_shape
+    return as_shape(geom)
 
 
 def grouper(iterable, n, fillvalue=None):
@@ -73,6 +78,9 @@ def class_property(cls, name, doc=None):
         if val is not None:
             return val.data()
 
+    # edit: lets the serializer module read the hidden attribute without the getter
+    getter.hidden_attribute = '_' + name
+
     def setter(self, val):
         hidden_attribute = '_' + name
         if isinstance(val, cls):
@@ -106,6 +114,10 @@ def datetime_property(name, allow_offset=False, doc=None):
         elif allow_offset and isinstance(val, (int, long, float)):
             return val
 
+    # edit: lets the serializer module read the hidden attribute without the getter
+    getter.hidden_attribute = reserved_name
+    getter.allow_offset = allow_offset
+
     def setter(self, dt):
         if dt is None:
             setattr(self, reserved_name, None)
@@ -118,9 +130,9 @@ def datetime_property(name, allow_offset=False, doc=None):
                 try:
                     dt = float(dt)
                 except ValueError:
-                    dt = dateutil.parser.parse(dt)
+                    dt = parse_datetime(dt)
             else:
-                dt = dateutil.parser.parse(dt)
+                dt = parse_datetime(dt)
             setattr(self, reserved_name, dt)
         else:
             raise ValueError
@@ -247,8 +259,8 @@ class _Coordinate(object):
     """ [Longitude, Latitude, Height] or [X, Y, Z] or
     [Time, Longitude, Latitude, Height] or [Time, X, Y, Z]
     """
-    x = y = z = 0
-    t = None
+    # edit: slotted, a document holds one coordinate per position sample
+    __slots__ = ('x', 'y', 'z', 't')
 
     def __init__(self, x, y=None, z=0, t=None):
         self.x = float(x)
@@ -264,7 +276,7 @@ class _Coordinate(object):
             try:
                 self.t = float(t)
             except ValueError:
-                self.t = dateutil.parser.parse(t)
+                self.t = parse_datetime(t)
         else:
             raise ValueError
 
@@ -292,10 +304,12 @@ class _Coordinates(object):
                 self.coords = []
                 for coord in grouper(coords, 2):
                     geom = asShape(coord[1])
+                    from pygeoif import geometry
                     assert(isinstance(geom, geometry.Point))
                     self.coords.append(_Coordinate(*geom.coords[0], t=coord[0]))
         else:
             geom = asShape(coords)
+            from pygeoif import geometry
             if isinstance(geom, geometry.Point):
                 self.coords = [_Coordinate(*geom.coords[0])]
 
@@ -318,9 +332,10 @@ class _Coordinates(object):
 class Number(_DateTimeAware):
     """Represents numbers"""
     number = None
+    # edit: properties are listed once on the class instead of extended per instance
+    _properties = _DateTimeAware._properties + ('number',)
 
     def __init__(self, number=number, **kwargs):
-        self._properties += ('number',)
         super(Number, self).__init__(number=number, **kwargs)
 
     def data(self):
@@ -354,11 +369,9 @@ class Position(_DateTimeAware):
     interpolationAlgorithm = None
     interpolationDegree = None
 
-    def __init__(self, **kwargs):
-        self._properties += ('cartesian', 'cartographicRadians',
-                             'cartographicDegrees', 'interpolationAlgorithm',
-                             'interpolationDegree', 'referenceFrame')
-        super(Position, self).__init__(**kwargs)
+    _properties = _DateTimeAware._properties + (
+        'cartesian', 'cartographicRadians', 'cartographicDegrees', 'interpolationAlgorithm',
+        'interpolationDegree', 'referenceFrame')  # edit
 
     @property
     def cartesian(self):
@@ -434,10 +447,7 @@ class Radii(_DateTimeAware):
     # the default reference frame is "FIXED".
     referenceFrame = None
     _cartesian = None
-
-    def __init__(self, **kwargs):
-        self._properties += ('cartesian', 'referenceFrame')
-        super(_DateTimeAware, self).__init__(**kwargs)
+    _properties = _DateTimeAware._properties + ('cartesian', 'referenceFrame')  # edit
 
     @property
     def cartesian(self):
@@ -480,7 +490,7 @@ class _Color(object):
             try:
                 self.t = float(t)
             except ValueError:
-                self.t = dateutil.parser.parse(t)
+                self.t = parse_datetime(t)
         else:
             raise ValueError
 
@@ -537,10 +547,7 @@ class Color(_DateTimeAware):
 
     _rgba = None
     _rgbaf = None
-
-    def __init__(self, **kwargs):
-        self._properties += ('rgba', 'rgbaf')
-        super(_DateTimeAware, self).__init__(**kwargs)
+    _properties = _DateTimeAware._properties + ('rgba', 'rgbaf')  # edit
 
     @property
     def rgba(self):
@@ -626,7 +633,7 @@ class Scale(_DateTimeAware):
                         try:
                             t = float(t)
                         except ValueError:
-                            t = dateutil.parser.parse(t)
+                            t = parse_datetime(t)
                     else:
                         raise ValueError
                     self._number.append((t, v))
@@ -695,6 +702,7 @@ class _Positions(object):
             self.coords = coords
         else:
             geom = asShape(coords)
+            from pygeoif import geometry
             if isinstance(geom, geometry.Polygon):
                 geom = geom.exterior
             if isinstance(geom, (geometry.LineString, geometry.LinearRing)):
@@ -798,6 +806,7 @@ class Positions(_CZMLBaseObject):
         self.cartographicDegrees = data.get('cartographicDegrees', None)
         self.cartographicRadians = data.get('cartographicRadians', None)
         self.cartesian = data.get('cartesian', None)
+        self.referenceFrame = data.get('referenceFrame', None)  # edit
 
 
     def data(self):
@@ -808,6 +817,8 @@ class Positions(_CZMLBaseObject):
             d['cartographicRadians'] = self.cartographicRadians.data()
         if self.cartesian:
             d['cartesian'] = self.cartesian.data()
+        if self.referenceFrame:  # edit
+            d['referenceFrame'] = self.referenceFrame
         return d
 
 
@@ -827,11 +838,8 @@ class Orientation(_DateTimeAware):
     axes = None
     interpolationAlgorithm = None
     interpolationDegree = None
-
-    def __init__(self, **kwargs):
-        self._properties += ('axes', 'unitQuaternion',
-                             'interpolationAlgorithm', 'interpolationDegree')
-        super(Orientation, self).__init__(**kwargs)
+    _properties = _DateTimeAware._properties + (
+        'axes', 'unitQuaternion', 'interpolationAlgorithm', 'interpolationDegree')  # edit
 
 
 class Point(_CZMLBaseObject):
@@ -1238,17 +1246,16 @@ class Cone(_DateTimeAware, _CZMLBaseObject):
     outerMaterial = material_property('outerMaterial')
     silhouetteMaterial = material_property('silhouetteMaterial')
 
+    _properties = _DateTimeAware._properties + (
+        'show', 'innerHalfAngle', 'outerHalfAngle', 'radius', 'minimumClockAngle',
+        'maximumClockAngle', 'showIntersection', 'intersectionColor', 'capMaterial',
+        'innerMaterial', 'outerMaterial', 'silhouetteMaterial')  # edit
+
     def __init__(self, epoch=None, nextTime=None, previousTime=None, **kwargs):
 
         _DateTimeAware.__init__(self, epoch=epoch,
                                 nextTime=nextTime,
                                 previousTime=previousTime)
-
-        self._properties += ('show', 'innerHalfAngle', 'outerHalfAngle', 'radius',
-                             'minimumClockAngle', 'maximumClockAngle',
-                             'showIntersection', 'intersectionColor',
-                             'capMaterial', 'innerMaterial', 'outerMaterial',
-                             'silhouetteMaterial')
         for param in kwargs:
             if param in self._properties:
                 setattr(self, param, kwargs[param])
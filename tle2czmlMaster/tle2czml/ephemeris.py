@@ -0,0 +1,124 @@
+''' propagates whole catalogs into arrays and interpolates between their samples
+
+The samples of every satellite on a shared TimeGrid are held in one numpy array of
+TEME metres, so catalog wide questions such as close approaches and passes over a
+ground station can be answered with vectorized passes instead of per satellite
+loops. With sgp4 2.0 or later the catalog is propagated by its C extension in one
+call per chunk, otherwise satellite by satellite through get_future_sat_positions.
+'''
+
+import numpy as np
+from sgp4.earth_gravity import wgs72
+
+try:
+    from sgp4.api import WGS72, Satrec, SatrecArray
+except ImportError:
+    SatrecArray = None
+
+from sgp4.propagation import sgp4
+
+from .tle2czml import SECONDS_IN_DAY, get_future_sat_positions
+
+# the Lagrange degree Cesium interpolates the CZML positions with
+INTERPOLATION_DEGREE = 5
+# satellites propagated per call of the C extension, bounding the velocities it also returns
+PROPAGATION_CHUNK_SIZE = 1024
+
+
+def propagate_catalog(satellites, time_grid):
+    '''returns the TEME positions in metres of every satellite on the grid, shaped (sats, times, 3)
+
+    Samples SGP4 could not propagate, and every sample from the first one below the
+    earth's surface on, are nan.
+    '''
+    if SatrecArray is not None:
+        positions = propagate_accelerated(satellites, time_grid)
+    else:
+        positions = np.empty((len(satellites), len(time_grid), 3))
+        for index, sat in enumerate(satellites):
+            samples = get_future_sat_positions(sat.tle_object, len(time_grid),
+                                               time_grid.start_time, time_grid.time_step,
+                                               time_grid)
+            positions[index] = np.reshape(samples, (len(time_grid), 4))[:, 1:]
+    return drop_decayed(positions)
+
+
+def propagate_orbits(satellites, time_grid, vertices):
+    '''returns one orbit of every satellite from the start of the grid, as TEME metres shaped
+    (sats, vertices, 3) spread evenly over each satellite's period, nan like propagate_catalog
+    '''
+    # fraction of an orbit at each vertex
+    phases = np.arange(vertices) / vertices
+    positions = np.empty((len(satellites), vertices, 3))
+    if SatrecArray is not None:
+        jd = np.full(vertices, float(time_grid.start_jd))
+        for index, sat in enumerate(satellites):
+            record = Satrec.twoline2rv(sat.raw_tle[1], sat.raw_tle[2], WGS72)
+            fr = time_grid.start_fr + phases * sat.orbital_time_in_minutes * 60 / SECONDS_IN_DAY
+            errors, kilometres, _ = record.sgp4_array(jd, fr)
+            kilometres[errors != 0] = np.nan
+            positions[index] = kilometres * 1000
+    else:
+        for index, sat in enumerate(satellites):
+            start = time_grid.minutes_since_epoch(sat.tle_object)[0]
+            for vertex, phase in enumerate(phases):
+                kilometres = sgp4(sat.tle_object, start + phase * sat.orbital_time_in_minutes)[0]
+                positions[index, vertex] = np.nan if sat.tle_object.error else kilometres
+            positions[index] *= 1000
+    return drop_decayed(positions)
+
+
+def drop_decayed(positions):
+    'returns positions with every sample from the first one below the earth\'s surface nan'
+    # SGP4 still returns positions once an orbit has decayed
+    decayed = np.logical_or.accumulate(
+        np.linalg.norm(positions, axis=-1) < wgs72.radiusearthkm * 1000, axis=1)
+    positions[decayed] = np.nan
+    return positions
+
+
+def propagate_accelerated(satellites, time_grid):
+    'returns propagate_catalog positions computed by the sgp4 C extension'
+    jd = np.array(time_grid.jd)
+    fr = np.array(time_grid.fr)
+    positions = np.empty((len(satellites), len(time_grid), 3))
+    for first in range(0, len(satellites), PROPAGATION_CHUNK_SIZE):
+        chunk = satellites[first:first + PROPAGATION_CHUNK_SIZE]
+        records = SatrecArray([Satrec.twoline2rv(sat.raw_tle[1], sat.raw_tle[2], WGS72)
+                               for sat in chunk])
+        errors, kilometres, _ = records.sgp4(jd, fr)
+        kilometres[errors != 0] = np.nan
+        positions[first:first + len(chunk)] = kilometres * 1000
+    return positions
+
+
+def lagrange_weights(nodes, points):
+    'returns the Lagrange basis over nodes 0 .. nodes - 1 evaluated at points, (..., nodes)'
+    points = np.asarray(points, dtype=float)
+    weights = np.ones(points.shape + (nodes,))
+    for node in range(nodes):
+        for other in range(nodes):
+            if other != node:
+                weights[..., node] *= (points - other) / (node - other)
+    return weights
+
+
+def sample_windows(samples, rows, steps):
+    '''returns the samples of each row around its step and the step's index in the window
+
+    samples has shape (rows, times, ...); the windows hold INTERPOLATION_DEGREE + 1
+    samples, centred on the interval from step to step + 1 where the samples allow.
+    '''
+    n_times = samples.shape[1]
+    nodes = min(INTERPOLATION_DEGREE + 1, n_times)
+    window_start = np.clip(steps - (nodes // 2 - 1), 0, n_times - nodes)
+    window = window_start[:, None] + np.arange(nodes)
+    return samples[rows[:, None], window], steps - window_start
+
+
+def interpolate(windows, points):
+    'returns the windows interpolated at points, sample indices within each window (rows, ...)'
+    weights = lagrange_weights(windows.shape[1], points)
+    if weights.ndim == 2:
+        return np.einsum('rn,rn...->r...', weights, windows)
+    return np.einsum('rpn,rn...->rp...', weights, windows)
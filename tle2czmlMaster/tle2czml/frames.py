@@ -0,0 +1,118 @@
+''' vectorized conversion of SGP4 TEME positions to earth fixed and geodetic coordinates '''
+
+import math
+from datetime import timezone
+
+import numpy as np
+
+# WGS 84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1 - WGS84_E2)
+
+JULIAN_DATE_J2000 = 2451545.0
+JULIAN_DATE_UNIX_EPOCH = 2440587.5
+SECONDS_IN_DAY = 86400.0
+TWO_PI = 2 * math.pi
+
+# fixed point iterations after Bowring's starting latitude, enough for sub millimetre heights
+GEODETIC_ITERATIONS = 3
+
+
+def julian_date(time):
+    'returns the julian date of a datetime, naive datetimes are taken to be UTC'
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return JULIAN_DATE_UNIX_EPOCH + time.timestamp() / SECONDS_IN_DAY
+
+
+def gmst(julian_dates):
+    'returns greenwich mean sidereal time in radians (IAU 1982) for an array of UT1 julian dates'
+    tut1 = (np.asarray(julian_dates, dtype=float) - JULIAN_DATE_J2000) / 36525.0
+    seconds = (-6.2e-6 * tut1 ** 3 + 0.093104 * tut1 ** 2 +
+               (876600.0 * 3600.0 + 8640184.812866) * tut1 + 67310.54841)
+    return np.mod(np.radians(seconds / 240.0), TWO_PI)
+
+
+def teme_to_ecef(positions, gmst_angles):
+    '''rotates TEME positions into the earth fixed frame
+
+    positions has shape (..., n_times, 3), gmst_angles shape (n_times,); polar motion is ignored.
+    '''
+    cos_g = np.cos(gmst_angles)
+    sin_g = np.sin(gmst_angles)
+    x = positions[..., 0]
+    y = positions[..., 1]
+    ecef = np.empty_like(positions)
+    ecef[..., 0] = cos_g * x + sin_g * y
+    ecef[..., 1] = cos_g * y - sin_g * x
+    ecef[..., 2] = positions[..., 2]
+    return ecef
+
+
+def ecef_to_geodetic(ecef):
+    'returns WGS 84 (longitude, latitude) in radians and height in metres for ecef metres'
+    x = ecef[..., 0]
+    y = ecef[..., 1]
+    z = ecef[..., 2]
+    p = np.hypot(x, y)
+    longitude = np.arctan2(y, x)
+
+    # Bowring's parametric latitude gives a starting point close enough to converge quickly
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    latitude = np.arctan2(z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+                          p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3)
+    for _ in range(GEODETIC_ITERATIONS):
+        sin_lat = np.sin(latitude)
+        radius = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+        latitude = np.arctan2(z + WGS84_E2 * radius * sin_lat, p)
+
+    sin_lat = np.sin(latitude)
+    cos_lat = np.cos(latitude)
+    radius = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    # the cos form loses precision near the poles, the sin form near the equator
+    height = np.where(np.abs(cos_lat) > 0.1,
+                      p / np.where(cos_lat == 0, 1, cos_lat) - radius,
+                      z / np.where(sin_lat == 0, 1, sin_lat) - radius * (1 - WGS84_E2))
+    return longitude, latitude, height
+
+
+def geodetic_to_ecef(longitude, latitude, height):
+    'returns the ecef metres of WGS 84 longitude and latitude in radians and height in metres'
+    sin_lat = np.sin(latitude)
+    cos_lat = np.cos(latitude)
+    radius = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    return np.stack([(radius + height) * cos_lat * np.cos(longitude),
+                     (radius + height) * cos_lat * np.sin(longitude),
+                     (radius * (1 - WGS84_E2) + height) * sin_lat], axis=-1)
+
+
+def teme_samples_to_fixed(samples, julian_dates):
+    '''converts time tagged TEME samples [t, x, y, z] of shape (n_sats, n_times, 4)
+
+    Returns samples of the same shape with earth fixed cartesian metres.
+    '''
+    converted = np.array(samples, dtype=float)
+    converted[..., 1:] = teme_to_ecef(converted[..., 1:], gmst(julian_dates))
+    return converted
+
+
+def teme_samples_to_cartographic(samples, julian_dates):
+    '''converts time tagged TEME samples [t, x, y, z] of shape (n_sats, n_times, 4)
+
+    Returns samples of the same shape as [t, longitude, latitude, height] in degrees and
+    metres. Longitudes are unwrapped along the time axis so interpolating clients do not
+    sweep round the globe where an orbit crosses the antimeridian.
+    '''
+    samples = np.asarray(samples, dtype=float)
+    ecef = teme_to_ecef(samples[..., 1:], gmst(julian_dates))
+    longitude, latitude, height = ecef_to_geodetic(ecef)
+    converted = np.empty_like(samples)
+    converted[..., 0] = samples[..., 0]
+    converted[..., 1] = np.degrees(np.unwrap(longitude, axis=-1))
+    converted[..., 2] = np.degrees(latitude)
+    converted[..., 3] = height
+    return converted
+
@@ -0,0 +1,276 @@
+''' optional timing instrumentation for the stages of the TLE to CZML pipeline '''
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# upper bounds, in seconds, of the histogram buckets stage durations are counted in
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# histogram every stage duration is observed in, labelled with the stage name
+STAGE_METRIC = 'tle2czml_stage_duration_seconds'
+
+# stage durations of the request currently being handled, see collect()
+_collected = ContextVar('tle2czml_collected_timings', default=None)
+
+
+class Histogram:
+    'cumulative histogram of observed values'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        'counts value in every bucket whose upper bound it does not exceed'
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def data(self):
+        'returns the histogram as a dict'
+        return {
+            'buckets': list(zip(self.buckets, self.counts)),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class _Stage:
+    'context manager timing a single run of a stage'
+    __slots__ = ('instrumentation', 'name', 'started')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoStage:
+    'context manager used in place of _Stage while instrumentation is disabled'
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def series_name(metric, labels):
+    'returns the name of a series in the Prometheus text format, eg metric{stage="parse"}'
+    if not labels:
+        return metric
+    return '{}{{{}}}'.format(metric, ','.join(
+        '{}="{}"'.format(name, _escape_label(value)) for name, value in labels))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Instrumentation:
+    'collects counters, gauges and histograms, and times named stages'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = True
+        self.buckets = buckets
+        # all keyed by (metric, sorted tuple of label pairs)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.descriptions = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def describe(self, metric, description):
+        'sets the help text rendered for metric'
+        self.descriptions[metric] = description
+
+    def stage(self, name):
+        'returns a context manager timing the enclosed block as stage name'
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name, seconds):
+        'records that stage name took seconds'
+        if not self.enabled:
+            return
+        self.observe_value(STAGE_METRIC, seconds, stage=name)
+
+        timings = _collected.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+        for listener in self.listeners:
+            listener(name, seconds)
+
+    def observe_value(self, metric, value, **labels):
+        'counts value in the histogram metric'
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, metric, amount=1, **labels):
+        'adds amount to the counter metric'
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, metric, value, **labels):
+        'sets the gauge metric to value'
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def add_gauge(self, metric, amount, **labels):
+        'adds amount, which may be negative, to the gauge metric'
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def add_listener(self, listener):
+        'calls listener(name, seconds) for every observed stage'
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        'stops calling listener'
+        self.listeners.remove(listener)
+
+    def snapshot(self):
+        'returns a copy of every series, keyed by series name'
+        with self._lock:
+            return {
+                'counters': {series_name(*key): value
+                             for key, value in self.counters.items()},
+                'gauges': {series_name(*key): value
+                           for key, value in self.gauges.items()},
+                'histograms': {series_name(*key): histogram.data()
+                               for key, histogram in self.histograms.items()},
+            }
+
+    def reset(self):
+        'clears every series'
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def render_prometheus(self):
+        'returns every series in the Prometheus text exposition format'
+        lines = []
+        with self._lock:
+            for series, kind in ((self.counters, 'counter'), (self.gauges, 'gauge')):
+                for metric in sorted(set(key[0] for key in series)):
+                    self._render_header(lines, metric, kind)
+                    for key in sorted(k for k in series if k[0] == metric):
+                        lines.append('{} {}'.format(series_name(*key), _format_value(series[key])))
+
+            for metric in sorted(set(key[0] for key in self.histograms)):
+                self._render_header(lines, metric, 'histogram')
+                for key in sorted(k for k in self.histograms if k[0] == metric):
+                    labels = key[1]
+                    histogram = self.histograms[key]
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        bucket_labels = labels + (('le', _format_value(float(bound))),)
+                        lines.append('{} {}'.format(
+                            series_name(metric + '_bucket', bucket_labels), count))
+                    lines.append('{} {}'.format(
+                        series_name(metric + '_sum', labels), _format_value(histogram.sum)))
+                    lines.append('{} {}'.format(
+                        series_name(metric + '_count', labels), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def _render_header(self, lines, metric, kind):
+        if metric in self.descriptions:
+            lines.append('# HELP {} {}'.format(metric, self.descriptions[metric]))
+        lines.append('# TYPE {} {}'.format(metric, kind))
+
+
+INSTRUMENTATION = Instrumentation()
+INSTRUMENTATION.describe(STAGE_METRIC, 'Time spent in each stage of the TLE to CZML pipeline.')
+INSTRUMENTATION.describe('tle2czml_satellites_processed_total',
+                         'Satellites converted to CZML packets.')
+INSTRUMENTATION.describe('tle2czml_satellites_collapsed_total',
+                         'Satellites dropped for repeating a NORAD catalog number.')
+INSTRUMENTATION.describe('tle2czml_propagations_shared_total',
+                         'Satellites whose samples were shared with another one repeating '
+                         'its TLE lines.')
+
+
+def stage(name):
+    'times the enclosed block as stage name on the default instrumentation'
+    return INSTRUMENTATION.stage(name)
+
+
+def increment(metric, amount=1, **labels):
+    'adds amount to the counter metric on the default instrumentation'
+    INSTRUMENTATION.increment(metric, amount, **labels)
+
+
+def start_collection():
+    'starts summing stage durations for the current context, returns a token for stop_collection'
+    return _collected.set({})
+
+
+def collected():
+    'returns the stage durations summed since start_collection, or None'
+    return _collected.get()
+
+
+def stop_collection(token):
+    'stops summing stage durations started by start_collection'
+    _collected.reset(token)
+
+
+@contextmanager
+def collect():
+    'sums the durations of every stage run inside the block into the yielded dict'
+    token = start_collection()
+    try:
+        yield collected()
+    finally:
+        stop_collection(token)
+
+
+def server_timing_header(timings):
+    'formats stage durations in seconds as a Server-Timing header value'
+    return ', '.join('{};dur={:.1f}'.format(name, seconds * 1000.0)
+                     for name, seconds in timings.items())
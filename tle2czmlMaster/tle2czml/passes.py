@@ -0,0 +1,232 @@
+''' predicts the passes of a whole catalog over a ground station
+
+The elevation of every satellite at every sample of a shared TimeGrid is computed
+as one array per chunk of satellites. Only the intervals where a satellite crosses
+the minimum elevation are refined, by bisection on the degree 5 Lagrange
+interpolation of its earth fixed samples, and each pass's culmination by a golden
+section search around its highest sample. Passes shorter than the time step can
+fall between two samples and be missed.
+'''
+
+import math
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+
+from . import ephemeris, frames
+from .instrumentation import INSTRUMENTATION, increment, stage
+from .tle2czml import (Colors, TimeGrid, deduplicate_tles, get_number_of_positions,
+                       read_tles, report_collapsed)
+
+DEFAULT_TIME_STEP = 60
+DEFAULT_MIN_ELEVATION = 0.0
+# satellites whose elevations are evaluated at once, bounding the earth fixed copies
+PASS_CHUNK_SIZE = 1024
+# halvings of a crossing interval, a minute shrinks to a few microseconds
+CROSSING_ITERATIONS = 24
+# golden section steps around the highest sample, two minutes shrink to under a millisecond
+CULMINATION_ITERATIONS = 30
+GOLDEN_SECTION = (math.sqrt(5) - 1) / 2
+
+INSTRUMENTATION.describe('passes_predicted_total', 'Satellite passes over ground stations found.')
+
+Pass = namedtuple('Pass', 'satellite rise culmination set max_elevation')
+
+
+def station_frame(latitude, longitude, altitude):
+    'returns the ecef position and local up unit vector of a station, in degrees and metres'
+    latitude = math.radians(latitude)
+    longitude = math.radians(longitude)
+    position = frames.geodetic_to_ecef(longitude, latitude, altitude)
+    up = np.array([math.cos(latitude) * math.cos(longitude),
+                   math.cos(latitude) * math.sin(longitude),
+                   math.sin(latitude)])
+    return position, up
+
+
+def sine_elevations(ecef, station, up):
+    'returns the sine of the elevation of ecef positions (..., 3) seen from the station'
+    relative = ecef - station
+    return np.einsum('...k,k->...', relative, up) / np.linalg.norm(relative, axis=-1)
+
+
+def visible_runs(above):
+    '''returns (rows, starts, ends) of every run of consecutive samples above the horizon,
+    ends being one past the last sample of the run
+    '''
+    padded = np.zeros((above.shape[0], above.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = above
+    change = np.diff(padded, axis=1)
+    # np.nonzero walks row by row, so the n-th start and the n-th end belong to the same run
+    rows, starts = np.nonzero(change == 1)
+    ends = np.nonzero(change == -1)[1]
+    return rows, starts, ends
+
+
+def highest_samples(sines, rows, starts, ends):
+    'returns the index of the highest sample of each run'
+    lengths = ends - starts
+    run_starts = np.cumsum(lengths) - lengths
+    flat = (np.repeat(rows * sines.shape[1] + starts - run_starts, lengths) +
+            np.arange(lengths.sum()))
+    values = sines.ravel()[flat]
+    run = np.repeat(np.arange(len(rows)), lengths)
+    highest = np.flatnonzero(values == np.maximum.reduceat(values, run_starts)[run])
+    # the first of equally high samples
+    highest = highest[np.unique(run[highest], return_index=True)[1]]
+    return flat[highest] - rows * sines.shape[1]
+
+
+def refine_crossings(windows, offsets, rising, station, up, sine_minimum):
+    'returns where, in window samples, each interval from offsets to offsets + 1 crosses'
+    low = offsets.astype(float)
+    high = low + 1
+    for _ in range(CROSSING_ITERATIONS):
+        middle = (low + high) / 2
+        above = sine_elevations(ephemeris.interpolate(windows, middle), station,
+                                up) > sine_minimum
+        # a rising satellite is above past the crossing, a setting one before it
+        before = above != rising
+        low = np.where(before, middle, low)
+        high = np.where(before, high, middle)
+    return (low + high) / 2
+
+
+def refine_culminations(windows, low, high, station, up):
+    'returns where, in window samples, elevation peaks between low and high, and its sine'
+    def sine_at(points):
+        return sine_elevations(ephemeris.interpolate(windows, points), station, up)
+
+    left = high - GOLDEN_SECTION * (high - low)
+    right = low + GOLDEN_SECTION * (high - low)
+    left_sine = sine_at(left)
+    right_sine = sine_at(right)
+    for _ in range(CULMINATION_ITERATIONS):
+        # drop the part beyond the lower probe, the other probe is reused in what is left
+        upper = right_sine > left_sine
+        low = np.where(upper, left, low)
+        high = np.where(upper, high, right)
+        left, right = (np.where(upper, right, high - GOLDEN_SECTION * (high - low)),
+                       np.where(upper, low + GOLDEN_SECTION * (high - low), left))
+        probes = sine_at(np.where(upper, right, left))
+        left_sine, right_sine = (np.where(upper, right_sine, probes),
+                                 np.where(upper, probes, left_sine))
+    points = (low + high) / 2
+    return points, sine_at(points)
+
+
+def crossing_times(ecef, rows, steps, rising, station, up, sine_minimum):
+    'returns the sample time of each crossing between steps and steps + 1, nan when unknown'
+    times = np.full(len(rows), np.nan)
+    windows, offsets = ephemeris.sample_windows(ecef, rows, steps)
+    # an orbit that decays next to the crossing cannot be interpolated
+    finite = np.isfinite(windows).all(axis=(1, 2))
+    if finite.any():
+        points = refine_crossings(windows[finite], offsets[finite], rising, station, up,
+                                  sine_minimum)
+        times[finite] = steps[finite] + points - offsets[finite]
+    return times
+
+
+def chunk_passes(ecef, station, up, sine_minimum):
+    '''returns the rows, rise, culmination and set sample times and highest sines of the passes
+    in one chunk of earth fixed samples
+    '''
+    n_times = ecef.shape[1]
+    sines = sine_elevations(ecef, station, up)
+    rows, starts, ends = visible_runs(sines > sine_minimum)
+    if not len(rows):
+        empty = np.empty(0)
+        return rows, empty, empty, empty, empty
+
+    rises = np.full(len(rows), np.nan)
+    risen = starts > 0
+    rises[risen] = crossing_times(ecef, rows[risen], starts[risen] - 1, True, station, up,
+                                  sine_minimum)
+    sets = np.full(len(rows), np.nan)
+    setting = ends < n_times
+    sets[setting] = crossing_times(ecef, rows[setting], ends[setting] - 1, False, station, up,
+                                   sine_minimum)
+
+    # the peak lies within a sample of the highest one
+    highest = highest_samples(sines, rows, starts, ends)
+    steps = np.clip(highest - 1, 0, max(n_times - 2, 0))
+    windows, offsets = ephemeris.sample_windows(ecef, rows, steps)
+    window_start = steps - offsets
+    low = np.maximum(highest - 1, 0) - window_start
+    high = np.minimum(highest + 1, n_times - 1) - window_start
+    culminations, highest_sines = refine_culminations(windows, low, high, station, up)
+    # a nan neighbour leaves the highest sample as the best known peak
+    unknown = ~np.isfinite(highest_sines)
+    culminations[unknown] = highest[unknown] - window_start[unknown]
+    highest_sines[unknown] = sines[rows[unknown], highest[unknown]]
+    return rows, rises, culminations + window_start, sets, highest_sines
+
+
+def predict_passes(positions, time_grid, latitude, longitude, altitude=0.0,
+                   min_elevation=DEFAULT_MIN_ELEVATION):
+    '''returns the passes above min_elevation degrees of TEME positions (sats, times, 3)
+    sampled on time_grid, as seen from a station, ordered by when they start
+
+    Times are seconds from the first sample; rise and set are None for passes already
+    under way when the window opens or still going when it closes.
+    '''
+    positions = np.asarray(positions, dtype=float)
+    station, up = station_frame(latitude, longitude, altitude)
+    sine_minimum = math.sin(math.radians(min_elevation))
+    gmst_angles = frames.gmst(time_grid.julian_dates)
+
+    found = []
+    for first in range(0, len(positions), PASS_CHUNK_SIZE):
+        with stage('elevation'):
+            ecef = frames.teme_to_ecef(positions[first:first + PASS_CHUNK_SIZE], gmst_angles)
+        with stage('refine'):
+            rows, rises, culminations, sets, sines = chunk_passes(ecef, station, up,
+                                                                  sine_minimum)
+        found.append((rows + first, rises, culminations, sets, sines))
+    if not found:
+        return []
+    rows, rises, culminations, sets, sines = (np.concatenate(column) for column in zip(*found))
+    increment('passes_predicted_total', len(rows))
+
+    time_step = time_grid.time_step
+    order = np.lexsort((rows, np.where(np.isnan(rises), -1, rises)))
+    return [Pass(int(rows[index]),
+                 None if np.isnan(rises[index]) else float(rises[index]) * time_step,
+                 float(culminations[index]) * time_step,
+                 None if np.isnan(sets[index]) else float(sets[index]) * time_step,
+                 math.degrees(math.asin(min(1.0, sines[index]))))
+            for index in order]
+
+
+def predict_tles(tles, start_time, latitude, longitude, altitude=0.0, end_time=None,
+                 min_elevation=DEFAULT_MIN_ELEVATION, time_step=DEFAULT_TIME_STEP):
+    '''returns the passes of the objects of a TLE string over a station as JSON ready dicts
+
+    The window defaults to 24 hours; latitude, longitude and min_elevation are in
+    degrees, altitude in metres and time_step in seconds.
+    '''
+    if end_time is None:
+        end_time = start_time + timedelta(hours=24)
+    with stage('parse'):
+        tles, collapsed = deduplicate_tles(tles)
+        report_collapsed(collapsed)
+        satellites = read_tles(tles, Colors())
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    with stage('propagate'):
+        positions = ephemeris.propagate_catalog(satellites, time_grid)
+
+    def isoformat(seconds):
+        if seconds is None:
+            return None
+        return (time_grid.start_time + timedelta(seconds=seconds)).isoformat()
+
+    return [{'satellite': satellites[found.satellite].sat_name,
+             'rise': isoformat(found.rise),
+             'culmination': isoformat(found.culmination),
+             'set': isoformat(found.set),
+             'maxElevation': found.max_elevation}
+            for found in predict_passes(positions, time_grid, latitude, longitude, altitude,
+                                        min_elevation)]
@@ -0,0 +1,154 @@
+''' generated serializers that write CZML objects without the property machinery
+
+data() on a packet calls getattr for every property, goes through class_property
+getters that call data() on each nested object, and isinstance checks every value.
+serializer() generates, once per class, a function that reads the hidden attributes
+directly and returns the same structure data() would. Classes with a hand written
+data(), and the compact model whose data() is already direct, keep their own.
+'''
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from datetime import date, datetime
+
+from . import czml
+
+# plain values of these types are replaced by their data() in _CZMLBaseObject.data
+NESTED_TYPES = (czml._CZMLBaseObject, czml._Colors, czml._Coordinates, czml._Positions)
+
+# properties whose getter returns self._<name>.data() when it is set, as class_property does
+DELEGATING_PROPERTIES = {
+    czml.CZMLPacket: ('description', 'position', 'label', 'billboard', 'clock', 'orientation',
+                      'point', 'positions', 'polyline', 'polygon', 'cone'),
+    czml.Color: ('rgba', 'rgbaf'),
+}
+
+SERIALIZERS = {}
+
+
+def serialize(obj):
+    'returns what obj.data() would, using the generated serializer for its class'
+    function = SERIALIZERS.get(type(obj))
+    if function is None:
+        function = serializer(type(obj))
+    return function(obj)
+
+
+def serializer(cls):
+    'returns the serializer for cls, generating it on first use'
+    function = SERIALIZERS.get(cls)
+    if function is None:
+        function = SERIALIZERS[cls] = build_serializer(cls)
+    return function
+
+
+def document(doc):
+    'returns the packets of a czml or compact CZML document as the list its data() yields'
+    return [serialize(packet) for packet in doc.packets]
+
+
+def dumps(doc):
+    'returns a CZML document as the same JSON as str(doc)'
+    return json.dumps(document(doc))
+
+
+def build_serializer(cls):
+    'returns a function equivalent to cls.data, generated when cls uses the base data()'
+    if cls is czml._Coordinates:
+        return coordinates
+    if not issubclass(cls, czml._CZMLBaseObject):
+        return cls.data
+    data = cls.data
+    if data is czml._CZMLBaseObject.data:
+        return generate(cls)
+    if data is czml.CZMLPacket.data:
+        # the packet data() is the base one without replacing nested plain values
+        return generate(cls, unwrap=False)
+    if data is czml.Number.data:
+        return collapse_number(generate(cls))
+    return data
+
+
+def generate(cls, unwrap=True):
+    'compiles a function writing the properties of cls in order, as _CZMLBaseObject.data'
+    function_name = 'serialize_' + cls.__name__
+    lines = ['def {}(obj):'.format(function_name), '    d = {}']
+    namespace = {'serialize': serialize, 'NESTED_TYPES': NESTED_TYPES,
+                 'DATE_TYPES': (date, datetime), 'OFFSET_TYPES': (int, float)}
+
+    for index, name in enumerate(cls._properties):
+        key = repr(name)
+        owner, attribute = find_attribute(cls, name)
+        getter = attribute.fget if isinstance(attribute, property) else None
+        hidden_attribute = getattr(getter, 'hidden_attribute', None)
+        if hidden_attribute is None and name in DELEGATING_PROPERTIES.get(owner, ()):
+            hidden_attribute = '_' + name
+
+        if hidden_attribute is not None and hasattr(getter, 'allow_offset'):
+            # datetime_property
+            lines += ['    v = obj.' + hidden_attribute,
+                      '    if isinstance(v, DATE_TYPES):',
+                      '        d[{}] = v.isoformat()'.format(key)]
+            if getter.allow_offset:
+                lines += ['    elif isinstance(v, OFFSET_TYPES):',
+                          '        d[{}] = v'.format(key)]
+        elif hidden_attribute is not None:
+            # class_property, or a property delegating to the nested object's data()
+            lines += ['    v = obj.' + hidden_attribute,
+                      '    if v is not None:',
+                      '        v = serialize(v)',
+                      '        if v is not None:',
+                      '            d[{}] = v'.format(key)]
+        else:
+            if getter is not None:
+                namespace['getter_{}'.format(index)] = getter
+                lines.append('    v = getter_{}(obj)'.format(index))
+            else:
+                lines.append('    v = obj.' + name)
+            lines.append('    if v is not None:')
+            if unwrap:
+                lines += ['        if isinstance(v, NESTED_TYPES):',
+                          '            v = serialize(v)']
+            lines.append('        d[{}] = v'.format(key))
+
+    lines.append('    return d')
+    exec(compile('\n'.join(lines), '<serializer {}>'.format(cls.__name__), 'exec'), namespace)
+    return namespace[function_name]
+
+
+def find_attribute(cls, name):
+    'returns the class defining name on cls and its value, or (None, None) for instance values'
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass, vars(klass)[name]
+    return None, None
+
+
+def collapse_number(serialize_properties):
+    'wraps a Number serializer to write a lone constant as the bare value, as Number.data'
+    def serialize_number(obj):
+        d = serialize_properties(obj)
+        if 'number' in d and len(d) == 1 and isinstance(d['number'], (int, float, str)):
+            return d['number']
+        return d
+    return serialize_number
+
+
+def coordinates(coords):
+    'returns the flat [Time, X, Y, Z, ...] list _Coordinates.data builds'
+    d = []
+    for coord in coords.coords or ():
+        t = coord.t
+        # _Coordinate stores numeric time tags as floats, checked first as the common case
+        if type(t) is float:
+            d += (t, coord.x, coord.y, coord.z)
+        elif t is None:
+            d += (coord.x, coord.y, coord.z)
+        elif isinstance(t, (date, datetime)):
+            d += (t.isoformat(), coord.x, coord.y, coord.z)
+        else:
+            d += (t, coord.x, coord.y, coord.z)
+    return d
@@ -0,0 +1,158 @@
+''' renders satellite packets from JSON templates compiled once per document
+
+Apart from the name, color, lead and trail times and position samples, everything
+create_satellite_packet writes is the same for every satellite of a document. The
+template is built once, without propagating anything, through the compact model for a
+stand in satellite whose varying fields are markers, encoded with the serializer's
+json, and split into literal JSON around them. Each satellite then only costs encoding
+its own fields, and the document is byte for byte what tles_to_czml writes through the
+object model.
+'''
+
+import copy
+import re
+
+from . import compact
+# encoded as serializer.dumps encodes the object model, so both write the same numbers
+from .serializer import json
+from .tle2czml import (create_converted_position, create_czml_file, create_path,
+                       create_position, create_satellite_packet, footprint_color, get_interval,
+                       point_color)
+
+# markers for fields spliced into a JSON string, and for fields replacing a whole value
+STRING_MARKER = '\x00{}\x00'
+VALUE_MARKER = '\x01{}\x01'
+ENCODED_MARKER = re.compile(r'"\\u0001(\w+)\\u0001"|\\u0000(\w+)\\u0000')
+
+
+class Template:
+    '''
+    JSON with named holes, rendered with str.format from already encoded field values
+    '''
+
+    def __init__(self, data):
+        encoded = json.dumps(data)
+        parts = []
+        self.fields = []
+        last = 0
+        for match in ENCODED_MARKER.finditer(encoded):
+            name = match.group(1) or match.group(2)
+            parts.append(escape_braces(encoded[last:match.start()]))
+            parts.append('{' + name + '}')
+            self.fields.append(name)
+            last = match.end()
+        parts.append(escape_braces(encoded[last:]))
+        self.render = ''.join(parts).format
+
+
+def escape_braces(text):
+    'returns literal JSON safe to use as a str.format template'
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def encode_string(value):
+    'returns value JSON encoded without its quotes, to splice inside a JSON string'
+    return json.dumps(value)[1:-1]
+
+
+def satellite_template(sat, start_time, end_time, time_step, time_grid, reference_frame,
+                       ground_track=False, footprint=False, orbit_ring=False, overview=False,
+                       labels=True):
+    '''returns the template of a satellite packet, sat only provides the orbit and color of
+    the stand in, with a ground track, footprint, orbit ring, overview point and label as
+    asked for; nothing is propagated, the samples are a marker'''
+    stand_in = copy.copy(sat)
+    stand_in.sat_name = STRING_MARKER.format('name')
+    if reference_frame == 'INERTIAL':
+        position = create_position(start_time, end_time, sat.tle_object, time_step, time_grid,
+                                   compact, samples=[0.0, 0.0, 0.0, 0.0])
+        samples_key = 'cartesian'
+    else:
+        position = create_converted_position(time_grid.start_time, [0.0, 0.0, 0.0],
+                                             reference_frame, compact)
+        samples_key = 'cartographicDegrees' if reference_frame == 'CARTOGRAPHIC' else 'cartesian'
+
+    packet = create_satellite_packet(stand_in, start_time, end_time, time_step, position,
+                                     time_grid, compact, [] if ground_track else None,
+                                     [] if footprint else None, overview, labels,
+                                     [] if orbit_ring else None).data()
+    packet['position'][samples_key] = VALUE_MARKER.format('samples')
+    # the stand in is drawn in sat's color, replaced wherever the satellite color is written
+    if labels:
+        packet['label']['fillColor']['rgba'] = VALUE_MARKER.format('rgba')
+    if overview:
+        packet['point']['color']['rgba'] = VALUE_MARKER.format('pointRgba')
+    if 'path' in packet:
+        packet['path']['material']['solidColor']['color']['rgba'] = VALUE_MARKER.format('rgba')
+        packet['path']['leadTime'] = VALUE_MARKER.format('leadTime')
+        packet['path']['trailTime'] = VALUE_MARKER.format('trailTime')
+    if 'polyline' in packet:
+        packet['polyline']['material']['solidColor']['color']['rgba'] = VALUE_MARKER.format(
+            'rgba')
+    if ground_track:
+        packet['polyline']['positions']['cartographicDegrees'] = VALUE_MARKER.format('track')
+    elif orbit_ring:
+        packet['polyline']['positions']['cartesian'] = VALUE_MARKER.format('ring')
+    if footprint:
+        ellipse = packet['ellipse']
+        ellipse['semiMajorAxis']['number'] = VALUE_MARKER.format('radii')
+        ellipse['semiMinorAxis']['number'] = VALUE_MARKER.format('radii')
+        ellipse['material']['solidColor']['color']['rgba'] = VALUE_MARKER.format('footprintRgba')
+    return Template(packet)
+
+
+def render_satellite(template, sat, samples, start_time, end_time, availability, track=None,
+                     radii=None, ring=None):
+    '''returns the JSON packet of one satellite, samples as [Time, X, Y, Z, ...], track and
+    radii as create_coverage and ring as create_orbit_rings return them, for templates with
+    a ground track, footprint or orbit ring'''
+    fields = {}
+    if 'leadTime' in template.fields:
+        path = create_path(availability, sat, start_time, end_time, compact)
+        fields['leadTime'] = json.dumps(path.leadTime)
+        fields['trailTime'] = json.dumps(path.trailTime)
+    if 'rgba' in template.fields:
+        fields['rgba'] = json.dumps(sat.rgba)
+    if 'pointRgba' in template.fields:
+        fields['pointRgba'] = json.dumps(point_color(sat.rgba))
+    if 'track' in template.fields:
+        fields['track'] = json.dumps(track)
+    if 'ring' in template.fields:
+        fields['ring'] = json.dumps(ring)
+    if 'radii' in template.fields:
+        fields['radii'] = json.dumps(radii)
+        fields['footprintRgba'] = json.dumps(footprint_color(sat.rgba))
+    return template.render(name=encode_string(sat.sat_name),
+                           samples=json.dumps(list(map(float, samples))),
+                           **fields)
+
+
+def render_document(start_time, end_time, packets):
+    'returns the CZML document of the document packet followed by the rendered packets'
+    document_packet = create_czml_file(start_time, end_time, compact).packets[0]
+    return '[' + ', '.join([json.dumps(document_packet.data())] + packets) + ']'
+
+
+def render_satellites(satellites, sample_lists, start_time, end_time, time_step, time_grid,
+                      reference_frame='INERTIAL', track_lists=None, radius_lists=None,
+                      overview=False, labels=True, ring_lists=None):
+    '''returns the CZML document of the satellites, sample_lists holding each one\'s samples
+    and track_lists, radius_lists and ring_lists any ground tracks, footprints and rings'''
+    packets = []
+    if satellites:
+        track_lists = track_lists or [None] * len(satellites)
+        radius_lists = radius_lists or [None] * len(satellites)
+        ring_lists = ring_lists or [None] * len(satellites)
+        availability = get_interval(start_time, end_time)
+        # one template per combination, satellites SGP4 could not propagate have none of them
+        templates = {}
+        for sat, samples, track, radii, ring in zip(satellites, sample_lists, track_lists,
+                                                    radius_lists, ring_lists):
+            key = (track is not None, radii is not None, ring is not None)
+            if key not in templates:
+                templates[key] = satellite_template(satellites[0], start_time, end_time,
+                                                    time_step, time_grid, reference_frame, *key,
+                                                    overview=overview, labels=labels)
+            packets.append(render_satellite(templates[key], sat, samples, start_time, end_time,
+                                            availability, track, radii, ring))
+    return render_document(start_time, end_time, packets)
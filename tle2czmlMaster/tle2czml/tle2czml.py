@@ -1,27 +1,46 @@
 ''' generates .czml file or json used to visualize the satellites orbits '''
 
+import logging
 import math
-from datetime import datetime, timedelta
+import os
+from datetime import datetime, timedelta, timezone
 
-import pkg_resources
-import pytz
-from dateutil import parser
 from sgp4.earth_gravity import wgs72
+from sgp4.ext import jday
 from sgp4.io import twoline2rv
+from sgp4.propagation import sgp4
 
-from .czml import (CZML, Billboard, CZMLPacket, Description, Label, Path,
-                   Position)
+from . import czml, serializer
+from . import compact as compact_model
+from .instrumentation import increment, stage
 
 BILLBOARD_SCALE = 1.5
+POINT_PIXEL_SIZE = 5
 LABEL_FONT = "11pt Lucida Console"
 SATELITE_IMAGE_URI =("data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAABIAAAAYCAYAAAD3Va0xAAAACXBIWXMAAC4jAAAuIwF4pT92AAAKT2lDQ1BQaG90b3Nob3AgSUNDIHByb2ZpbGUAAHjanVNnVFPpFj333vRCS4iAlEtvUhUIIFJCi4AUkSYqIQkQSoghodkVUcERRUUEG8igiAOOjoCMFVEsDIoK2AfkIaKOg6OIisr74Xuja9a89+bN/rXXPues852zzwfACAyWSDNRNYAMqUIeEeCDx8TG4eQuQIEKJHAAEAizZCFz/SMBAPh+PDwrIsAHvgABeNMLCADATZvAMByH/w/qQplcAYCEAcB0kThLCIAUAEB6jkKmAEBGAYCdmCZTAKAEAGDLY2LjAFAtAGAnf+bTAICd+Jl7AQBblCEVAaCRACATZYhEAGg7AKzPVopFAFgwABRmS8Q5ANgtADBJV2ZIALC3AMDOEAuyAAgMADBRiIUpAAR7AGDIIyN4AISZABRG8lc88SuuEOcqAAB4mbI8uSQ5RYFbCC1xB1dXLh4ozkkXKxQ2YQJhmkAuwnmZGTKBNA/g88wAAKCRFRHgg/P9eM4Ors7ONo62Dl8t6r8G/yJiYuP+5c+rcEAAAOF0ftH+LC+zGoA7BoBt/qIl7gRoXgugdfeLZrIPQLUAoOnaV/Nw+H48PEWhkLnZ2eXk5NhKxEJbYcpXff5nwl/AV/1s+X48/Pf14L7iJIEyXYFHBPjgwsz0TKUcz5IJhGLc5o9H/LcL//wd0yLESWK5WCoU41EScY5EmozzMqUiiUKSKcUl0v9k4t8s+wM+3zUAsGo+AXuRLahdYwP2SycQWHTA4vcAAPK7b8HUKAgDgGiD4c93/+8//UegJQCAZkmScQAAXkQkLlTKsz/HCAAARKCBKrBBG/TBGCzABhzBBdzBC/xgNoRCJMTCQhBCCmSAHHJgKayCQiiGzbAdKmAv1EAdNMBRaIaTcA4uwlW4Dj1wD/phCJ7BKLyBCQRByAgTYSHaiAFiilgjjggXmYX4IcFIBBKLJCDJiBRRIkuRNUgxUopUIFVIHfI9cgI5h1xGupE7yAAygvyGvEcxlIGyUT3UDLVDuag3GoRGogvQZHQxmo8WoJvQcrQaPYw2oefQq2gP2o8+Q8cwwOgYBzPEbDAuxsNCsTgsCZNjy7EirAyrxhqwVqwDu4n1Y8+xdwQSgUXACTYEd0IgYR5BSFhMWE7YSKggHCQ0EdoJNwkDhFHCJyKTqEu0JroR+cQYYjIxh1hILCPWEo8TLxB7iEPENyQSiUMyJ7mQAkmxpFTSEtJG0m5SI+ksqZs0SBojk8naZGuyBzmULCAryIXkneTD5DPkG+Qh8lsKnWJAcaT4U+IoUspqShnlEOU05QZlmDJBVaOaUt2ooVQRNY9aQq2htlKvUYeoEzR1mjnNgxZJS6WtopXTGmgXaPdpr+h0uhHdlR5Ol9BX0svpR+iX6AP0dwwNhhWDx4hnKBmbGAcYZxl3GK+YTKYZ04sZx1QwNzHrmOeZD5lvVVgqtip8FZHKCpVKlSaVGyovVKmqpqreqgtV81XLVI+pXlN9rkZVM1PjqQnUlqtVqp1Q61MbU2epO6iHqmeob1Q/pH5Z/YkGWcNMw09DpFGgsV/jvMYgC2MZs3gsIWsNq4Z1gTXEJrHN2Xx2KruY/R27iz2qqaE5QzNKM1ezUvOUZj8H45hx+Jx0TgnnKKeX836K3hTvKeIpG6Y0TLkxZVxrqpaXllirSKtRq0frvTau7aedpr1Fu1n7gQ5Bx0onXCdHZ4/OBZ3nU9lT3acKpxZNPTr1ri6qa6UbobtEd79up+6Ynr5egJ5Mb6feeb3n+hx9L/1U/W36p/VHDFgGswwkBtsMzhg8xTVxbzwdL8fb8VFDXcNAQ6VhlWGX4YSRudE8o9VGjUYPjGnGXOMk423GbcajJgYmISZLTepN7ppSTbmmKaY7TDtMx83MzaLN1pk1mz0x1zLnm+eb15vft2BaeFostqi2uGVJsuRaplnutrxuhVo5WaVYVVpds0atna0l1rutu6cRp7lOk06rntZnw7Dxtsm2qbcZsOXYBtuutm22fWFnYhdnt8Wuw+6TvZN9un2N/T0HDYfZDqsdWh1+c7RyFDpWOt6azpzuP33F9JbpL2dYzxDP2DPjthPLKcRpnVOb00dnF2e5c4PziIuJS4LLLpc+Lpsbxt3IveRKdPVxXeF60vWdm7Obwu2o26/uNu5p7ofcn8w0nymeWTNz0MPIQ+BR5dE/C5+VMGvfrH5PQ0+BZ7XnIy9jL5FXrdewt6V3qvdh7xc+9j5yn+M+4zw33jLeWV/MN8C3yLfLT8Nvnl+F30N/I/9k/3r/0QCngCUBZwOJgUGBWwL7+Hp8Ib+OPzrbZfay2e1BjKC5QRVBj4KtguXBrSFoyOyQrSH355jOkc5pDoVQfujW0Adh5mGLw34MJ4WHhVeGP45wiFga0TGXNXfR3ENz30T6RJZE3ptnMU85ry1KNSo+qi5qPNo3ujS6P8YuZlnM1VidWElsSxw5LiquNm5svt/87fOH4p3iC+N7F5gvyF1weaHOwvSFpxapLhIsOpZATIhOOJTwQRAqqBaMJfITdyWOCnnCHcJnIi/RNtGI2ENcKh5O8kgqTXqS7JG8NXkkxTOlLOW5hCepkLxMDUzdmzqeFpp2IG0yPTq9MYOSkZBxQqohTZO2Z+pn5mZ2y6xlhbL+xW6Lty8elQfJa7OQrAVZLQq2QqboVFoo1yoHsmdlV2a/zYnKOZarnivN7cyzytuQN5zvn//tEsIS4ZK2pYZLVy0dWOa9rGo5sjxxedsK4xUFK4ZWBqw8uIq2Km3VT6vtV5eufr0mek1rgV7ByoLBtQFr6wtVCuWFfevc1+1dT1gvWd+1YfqGnRs+FYmKrhTbF5cVf9go3HjlG4dvyr+Z3JS0qavEuWTPZtJm6ebeLZ5bDpaql+aXDm4N2dq0Dd9WtO319kXbL5fNKNu7g7ZDuaO/PLi8ZafJzs07P1SkVPRU+lQ27tLdtWHX+G7R7ht7vPY07NXbW7z3/T7JvttVAVVN1WbVZftJ+7P3P66Jqun4lvttXa1ObXHtxwPSA/0HIw6217nU1R3SPVRSj9Yr60cOxx++/p3vdy0NNg1VjZzG4iNwRHnk6fcJ3/ceDTradox7rOEH0x92HWcdL2pCmvKaRptTmvtbYlu6T8w+0dbq3nr8R9sfD5w0PFl5SvNUyWna6YLTk2fyz4ydlZ19fi753GDborZ752PO32oPb++6EHTh0kX/i+c7vDvOXPK4dPKy2+UTV7hXmq86X23qdOo8/pPTT8e7nLuarrlca7nuer21e2b36RueN87d9L158Rb/1tWeOT3dvfN6b/fF9/XfFt1+cif9zsu72Xcn7q28T7xf9EDtQdlD3YfVP1v+3Njv3H9qwHeg89HcR/cGhYPP/pH1jw9DBY+Zj8uGDYbrnjg+OTniP3L96fynQ89kzyaeF/6i/suuFxYvfvjV69fO0ZjRoZfyl5O/bXyl/erA6xmv28bCxh6+yXgzMV70VvvtwXfcdx3vo98PT+R8IH8o/2j5sfVT0Kf7kxmTk/8EA5jz/GMzLdsAAAAgY0hSTQAAeiUAAICDAAD5/wAAgOkAAHUwAADqYAAAOpgAABdvkl/FRgAAAqtJREFUeNqMlM9rE0EUxz+z2TTbxpIwm5o0ZTUaW2gphdZLAzk0WBBBBI+9CIoXtYeCPXmqoGd/wJ6sRdJe+g+IB68iFEGFYE/1oKdiuhaKSW2mGQ9mwzZN0s5p5n3ffPa9N2+f4JTLdd3LwHMgb1nWn1wutzA2Nrbs68YpIXeAj0AeYH9/P7q9vf3K87ynpwa5rvsAeA2Eg/a9vT2AR57n3T4R5LruTeBlO00p5W9feJ6XCnWBDAPvgEg73bZtHMehodeMDhATWAfOdPpQf39/8HirU2qLwGS3tKWUweOQqbUuAt+FEEuNaC4AS90gQggGBgaaRa/VahjANWBRa72gte4FnnSqi78SiQQ9PT0AVKtVlFKYwDkgCswrpb5NTU1ldnd3UUpRqVQol8vHQI0io7WmVqvR19eHIYSoCiHKQoiltbW1rwcHB80XmZ2dbV5Op9PNtDKZDACbm5scHh4SCoUwAy+VrVQqN0qlUvPy3Nwctm2Tz+eJxWIUi0UcxyES+Z95vV5HKUUoFDrSkPcAEUyhWq1SKBTY2NhAKUUsFmN0dLSpa61RShEOh7VoRBMGfgLJ1qLu7OygtSabzZLNZrFtu6mXSiXS6TTxePyzH9GVVghAuVxGaw3A1tZWcx9sAyklhmGs+6DrJ/28juOQSCSO2Or1OsBf4I0PutoNYpomk5PHG314eBhgWUq5bbiuGwMudQNNTEwQjUaP2S3L8oDH/hgZ7wZJpVKMjIx0ku9LKX/5oFQnr97eXnK5HEKIdvIzKeV6cEKa7bzC4TAzMzNYltVOXgEeBg0G8KPVKxKJUCgUiMfjrZJuTIa7UsojvWACn4DvwEW/Caenp1sHF8AXYF5K+aHtaAFYXV09Pzg4uJJMJseHhobOBvTfwHugCLyVUtY71fPfAN2c0en5Bq0rAAAAAElFTkSuQmCC")
 MULTIPLIER = 60
 DESCRIPTION_TEMPLATE = 'Orbit of Satellite: '
 MINUTES_IN_DAY = 1440
+SECONDS_IN_DAY = 86400.0
 TIME_STEP = 300
 
 DEFAULT_RGBA = [213, 255, 0, 255]
-DEBUGGING = False
+GROUND_TRACK_WIDTH = 1
+# opacity of the footprint fill, out of 255
+FOOTPRINT_ALPHA = 64
+ORBIT_RING_VERTICES = 90
+ORBIT_RING_WIDTH = 1
+# satellites per page of a paginated document
+PAGE_SIZE = 500
+# first characters of alpha 5 catalog numbers, standing for 10 to 33, I and O are not used
+ALPHA5_DIGITS = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+# INERTIAL ships raw TEME vectors, FIXED and CARTOGRAPHIC are converted server side
+REFERENCE_FRAMES = ('INERTIAL', 'FIXED', 'CARTOGRAPHIC')
+# satellites converted per vectorized pass, bounds the size of the sample arrays
+FRAME_CHUNK_SIZE = 2048
+
+LOGGER = logging.getLogger(__name__)
 
 
 class Satellite:
@@ -50,19 +69,23 @@ class Satellite:
 class Colors:
     'defines rgba colors for satellites'
 
+    # colors read from rgba_list.txt, loaded by the first Colors() and shared after that
+    _loaded_rgbs = None
+
     def __init__(self):
-        path = 'rgba_list.txt'
-        filepath = pkg_resources.resource_filename(__name__, path)
-        colors_file = open(filepath, 'r')
+        if Colors._loaded_rgbs is None:
+            filepath = os.path.join(os.path.dirname(__file__), 'rgba_list.txt')
+            rgbs = []
 
-        rgbs = []
+            with open(filepath, 'r') as colors_file:
+                for color in colors_file:
+                    rgb = color.split()
+                    rgb.append(255)  # append value for alpha
+                    rgbs.append(rgb)
 
-        for color in colors_file:
-            rgb = color.split()
-            rgb.append(255)  # append value for alpha
-            rgbs.append(rgb)
+            Colors._loaded_rgbs = rgbs
 
-        self.rgbs = rgbs
+        self.rgbs = Colors._loaded_rgbs
         self.index = 0
 
     def get_next_color(self):
@@ -80,14 +103,57 @@ class Colors:
         return self.rgbs
 
 
+class TimeGrid:
+    '''
+    Sample times shared by every satellite in a document, computed once instead of per satellite
+    '''
+
+    def __init__(self, start_time, number_of_positions, time_step=TIME_STEP):
+        if start_time.tzinfo is not None:
+            start_time = start_time.astimezone(timezone.utc)
+        self.start_time = start_time
+        self.time_step = time_step
+        self.epoch = start_time.isoformat()
+
+        # seconds since start_time, as written in front of each sample
+        self.offsets = [index * time_step for index in range(number_of_positions)]
+        self.times = [start_time + timedelta(seconds=offset) for offset in self.offsets]
+
+        # julian day of the start's midnight, and each sample's fraction of a day past it,
+        # kept apart so sub second precision survives
+        self.start_jd = jday(start_time.year, start_time.month, start_time.day, 0, 0, 0)
+        self.start_fr = (start_time.hour * 3600 + start_time.minute * 60 + start_time.second +
+                         start_time.microsecond / 1e6) / SECONDS_IN_DAY
+        self.jd = []
+        self.fr = []
+        for offset in self.offsets:
+            fraction = self.start_fr + offset / SECONDS_IN_DAY
+            whole_days = math.floor(fraction)
+            self.jd.append(self.start_jd + whole_days)
+            self.fr.append(fraction - whole_days)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def julian_dates(self):
+        'returns each sample time as a single julian date'
+        return [jd + fr for jd, fr in zip(self.jd, self.fr)]
+
+    def minutes_since_epoch(self, sat_tle):
+        'returns the sgp4 tsince, in minutes past the tle epoch, of each sample'
+        start = ((self.start_jd - sat_tle.jdsatepoch) +
+                 (self.start_fr - getattr(sat_tle, 'jdsatepochF', 0.0))) * MINUTES_IN_DAY
+        return [start + offset / 60.0 for offset in self.offsets]
+
+
 # create CZML doc with default document packet
-def create_czml_file(start_time, end_time):
-    'create czml file using start_time and end_time'
+def create_czml_file(start_time, end_time, model=czml):
+    'create czml file using start_time and end_time, from the czml or compact model'
     interval = get_interval(start_time, end_time)
-    doc = CZML()
-    packet = CZMLPacket(id='document', version='1.0')
-    print(interval)
-    print(start_time.isoformat())
+    doc = model.CZML()
+    packet = model.CZMLPacket(id='document', version='1.0')
+    LOGGER.debug('Document interval: %s', interval)
 
     packet.clock = {"interval": interval, "currentTime": start_time.isoformat(
     ), "multiplier": MULTIPLIER, "range": "LOOP_STOP", "step": "SYSTEM_CLOCK_MULTIPLIER"}
@@ -95,29 +161,67 @@ def create_czml_file(start_time, end_time):
     return doc
 
 
-def create_satellite_packet(sat, sim_start_time, sim_end_time):
-    'Takes a satelite and returns its orbit'
+def create_satellite_packet(sat, sim_start_time, sim_end_time, time_step=TIME_STEP,
+                            position=None, time_grid=None, model=czml, ground_track=None,
+                            footprint_radii=None, overview=False, labels=True,
+                            orbit_ring=None):
+    '''
+    Takes a satelite and returns its orbit, position can be passed in when already computed
+    and time_grid when shared with other satellites. ground_track and footprint_radii, as
+    create_coverage returns them, add a ground track polyline and a footprint ellipse.
+    overview draws the satellite as a point, with a label unless labels is False, and
+    leaves out the description, billboard and path. orbit_ring, as create_orbit_rings
+    returns it, draws the orbit as a static polyline in place of the path.
+    '''
     availability = get_interval(sim_start_time, sim_end_time)
-    packet = CZMLPacket(id='Satellite/{}'.format(sat.sat_name))
+    packet = model.CZMLPacket(id='Satellite/{}'.format(sat.sat_name))
     packet.availability = availability
-    packet.description = Description("{} {}".format(DESCRIPTION_TEMPLATE, sat.sat_name))
-    packet.billboard = create_bill_board()
-    packet.label = create_label(sat.sat_name, sat.rgba)
-    packet.path = create_path(availability, sat, sim_start_time, sim_end_time)
-    packet.position = create_position(sim_start_time, sim_end_time, sat.tle_object)
+    if overview:
+        packet.point = create_point(sat.rgba, model)
+    else:
+        packet.description = model.Description("{} {}".format(DESCRIPTION_TEMPLATE,
+                                                               sat.sat_name))
+        packet.billboard = create_bill_board(model)
+    if labels:
+        packet.label = create_label(sat.sat_name, sat.rgba, model)
+    if not overview and orbit_ring is None:
+        with stage('path'):
+            packet.path = create_path(availability, sat, sim_start_time, sim_end_time, model)
+    if position is None:
+        with stage('propagate'):
+            position = create_position(sim_start_time, sim_end_time, sat.tle_object, time_step,
+                                       time_grid, model)
+    packet.position = position
+    if ground_track is not None:
+        packet.polyline = create_ground_track(ground_track, sat.rgba, model)
+    elif orbit_ring is not None:
+        packet.polyline = create_orbit_ring(orbit_ring, sat.rgba, model)
+    if footprint_radii is not None:
+        epoch = time_grid.epoch if time_grid is not None else sim_start_time.isoformat()
+        packet.ellipse = create_footprint(footprint_radii, epoch, sat.rgba, model)
     return packet
 
 
-def create_bill_board():
+def create_bill_board(model=czml):
     'returns a billboard'
-    bill_board = Billboard(scale=BILLBOARD_SCALE, show=True)
+    bill_board = model.Billboard(scale=BILLBOARD_SCALE, show=True)
     bill_board.image = SATELITE_IMAGE_URI
     return bill_board
 
 
-def create_label(sat_id, rgba):
+def create_point(rgba, model=czml):
+    'returns a point in the satellite color'
+    return model.Point(show=True, color={"rgba": point_color(rgba)}, pixelSize=POINT_PIXEL_SIZE)
+
+
+def point_color(rgba):
+    'returns the satellite color as the whole numbers czml.Color writes'
+    return [int(component) for component in rgba]
+
+
+def create_label(sat_id, rgba, model=czml):
     'creates a label'
-    lab = Label(text=sat_id, show=True)
+    lab = model.Label(text=sat_id, show=True)
     lab.fillColor = {"rgba": rgba}
     lab.font = LABEL_FONT
     lab.horizontalOrigin = "LEFT"
@@ -129,9 +233,9 @@ def create_label(sat_id, rgba):
     return lab
 
 
-def create_path(total_path_interval, sat, sim_start_time, sim_end_time):
+def create_path(total_path_interval, sat, sim_start_time, sim_end_time, model=czml):
     'creates a lead and trailing path'
-    path = Path()
+    path = model.Path()
 
     path.show = [{"interval": total_path_interval, "boolean": False}]
     path.width = 1
@@ -145,91 +249,191 @@ def create_path(total_path_interval, sat, sim_start_time, sim_end_time):
     left_over_minutes = minutes_in_sim % sat.orbital_time_in_minutes
     number_of_full_orbits = math.floor(minutes_in_sim/sat.orbital_time_in_minutes)
 
-    sub_path_interval_start = parser.parse(start_epoch_str)
     # first interval roughly half an orbit, rest of the path intervals are full orbits
-    sub_path_interval_end = sub_path_interval_start + timedelta(minutes=left_over_minutes)
-    sub_path_interval_str = (sub_path_interval_start.isoformat() + '/' +
-                             sub_path_interval_end.isoformat())
+    boundaries = [datetime.fromisoformat(start_epoch_str)]
+    boundaries.append(boundaries[0] + timedelta(minutes=left_over_minutes))
+    for _ in range(number_of_full_orbits):
+        boundaries.append(boundaries[-1] + timedelta(minutes=sat.orbital_time_in_minutes))
 
     orbital_time_in_seconds = (sat.orbital_time_in_minutes * 60.0)
 
-    if DEBUGGING:
+    # checked once, the interval loops below run for every orbit of every satellite
+    debug = LOGGER.isEnabledFor(logging.DEBUG)
+    if debug:
         # goes from tle epoch to 12/24 hours in future
-        print('Total Path Interval: ' + total_path_interval)
-
-    lead_or_trail_times = []
-
-    for _ in range(number_of_full_orbits + 1):
-        lead_or_trail_times.append({
-            "interval": sub_path_interval_str,
-            "epoch": sub_path_interval_start.isoformat(),
-            "number": [
-                0, orbital_time_in_seconds,
-                orbital_time_in_seconds, 0
-            ]
-        })
-
-        if DEBUGGING:
-            print('Sub interval string: ' + sub_path_interval_str)
-
-        sub_path_interval_start = sub_path_interval_end
-        sub_path_interval_end = (sub_path_interval_start +
-                                 timedelta(minutes=sat.orbital_time_in_minutes))
-        sub_path_interval_str = (sub_path_interval_start.isoformat() + '/' +
-                                 sub_path_interval_end.isoformat())
-
-    path.leadTime = lead_or_trail_times
-
-    if DEBUGGING:
-        print()
-
-    sub_path_interval_start = parser.parse(start_epoch_str)
-    # first interval roughly half an orbit, rest of the path intervals are full orbits
-    sub_path_interval_end = sub_path_interval_start + timedelta(minutes=left_over_minutes)
-    sub_path_interval_str = (sub_path_interval_start.isoformat() + '/' +
-                             sub_path_interval_end.isoformat())
-
-    lead_or_trail_times = []
-
-    for _ in range(number_of_full_orbits + 1):
-        lead_or_trail_times.append({
-            "interval": sub_path_interval_str,
-            "epoch": sub_path_interval_start.isoformat(),
-            "number":[
-                0, 0,
-                orbital_time_in_seconds, orbital_time_in_seconds
-            ]
-        })
-
-        if DEBUGGING:
-            print('Sub interval string: ' + sub_path_interval_str)
+        LOGGER.debug('Total Path Interval: %s', total_path_interval)
+
+    # lead and trail times share their intervals, so each boundary is formatted once
+    boundary_strs = [boundary.isoformat() for boundary in boundaries]
+    intervals = [(start + '/' + end, start)
+                 for start, end in zip(boundary_strs, boundary_strs[1:])]
+    if debug:
+        for interval, _ in intervals:
+            LOGGER.debug('Sub interval string: %s', interval)
+
+    path.leadTime = [{
+        "interval": interval,
+        "epoch": epoch,
+        "number": [
+            0, orbital_time_in_seconds,
+            orbital_time_in_seconds, 0
+        ]
+    } for interval, epoch in intervals]
+
+    path.trailTime = [{
+        "interval": interval,
+        "epoch": epoch,
+        "number": [
+            0, 0,
+            orbital_time_in_seconds, orbital_time_in_seconds
+        ]
+    } for interval, epoch in intervals]
 
-        sub_path_interval_start = sub_path_interval_end
-        sub_path_interval_end = (sub_path_interval_start +
-                                 timedelta(minutes=sat.orbital_time_in_minutes))
+    return path
 
-        sub_path_interval_str = (sub_path_interval_start.isoformat() + '/' +
-                                 sub_path_interval_end.isoformat())
+def create_ground_track(track, rgba, model=czml):
+    'creates a polyline along the ground, track as [Longitude, Latitude, Height, ...] degrees'
+    polyline = model.Polyline()
+    polyline.show = True
+    polyline.followSurface = True
+    polyline.width = GROUND_TRACK_WIDTH
+    polyline.material = {"solidColor": {"color": {"rgba": rgba}}}
+    polyline.positions = {"cartographicDegrees": track}
+    return polyline
+
+
+def create_orbit_ring(ring, rgba, model=czml):
+    'creates a line around one orbit, ring as inertial [X, Y, Z, ...] metres'
+    polyline = model.Polyline()
+    polyline.show = True
+    polyline.followSurface = False
+    polyline.width = ORBIT_RING_WIDTH
+    polyline.material = {"solidColor": {"color": {"rgba": rgba}}}
+    polyline.positions = {"cartesian": ring, "referenceFrame": "INERTIAL"}
+    return polyline
+
+
+def create_orbit_rings(satellites, time_grid, vertices=ORBIT_RING_VERTICES):
+    '''
+    Returns each satellite's orbit from the start of the grid as a ring of vertices closed on
+    its first one, None where SGP4 could not propagate the whole orbit
+    '''
+    # numpy is only needed, and only imported, for orbit rings
+    import numpy as np
+
+    from . import ephemeris
+
+    with stage('propagate'):
+        orbits = ephemeris.propagate_orbits(satellites, time_grid, vertices)
+    rings = np.concatenate((orbits, orbits[:, :1]), axis=1).reshape(len(satellites),
+                                                                     (vertices + 1) * 3)
+    complete = np.isfinite(orbits).all(axis=(1, 2))
+    return [ring if whole else None for ring, whole in zip(rings.tolist(), complete)]
+
+
+def create_footprint(radii, epoch, rgba, model=czml):
+    'creates a translucent circle below the satellite, radii as [Time, metres, ...] from epoch'
+    footprint = model.Ellipse()
+    footprint.show = True
+    footprint.fill = True
+    footprint.semiMajorAxis = {"epoch": epoch, "number": radii}
+    footprint.semiMinorAxis = {"epoch": epoch, "number": radii}
+    footprint.material = {"solidColor": {"color": {"rgba": footprint_color(rgba)}}}
+    return footprint
+
+
+def footprint_color(rgba):
+    'returns the satellite color with the footprint opacity'
+    return list(rgba[:3]) + [FOOTPRINT_ALPHA]
+
+
+def create_coverage(satellites, time_grid, half_angle=None):
+    '''
+    Returns each satellite's ground track and, given a sensor half angle in degrees, its
+    footprint radii, computed for the whole catalog in vectorized passes
+    '''
+    # numpy is only needed, and only imported, for coverage
+    from . import coverage, ephemeris
+
+    with stage('propagate'):
+        positions = ephemeris.propagate_catalog(satellites, time_grid)
+    with stage('coverage'):
+        return coverage.coverage(positions, time_grid, half_angle)
+
+
+def create_position(start_time, end_time, tle, time_step=TIME_STEP, time_grid=None,
+                    model=czml, samples=None):
+    'creates a position, from the get_future_sat_positions samples when already computed'
+    if time_grid is None:
+        time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                             time_step)
+    pos = model.Position()
+    pos.interpolationAlgorithm = "LAGRANGE"
+    pos.interpolationDegree = 5
+    pos.referenceFrame = "INERTIAL"
+    pos.epoch = time_grid.epoch
 
-    path.trailTime = lead_or_trail_times
+    if samples is None:
+        samples = get_future_sat_positions(tle, len(time_grid), start_time, time_step, time_grid)
+    pos.cartesian = samples
+    return pos
 
-    return path
 
-def create_position(start_time, end_time, tle):
-    'creates a position'
-    pos = Position()
+def create_converted_position(start_time, samples, reference_frame, model=czml):
+    'creates a position from samples already converted to the FIXED or CARTOGRAPHIC frame'
+    pos = model.Position()
     pos.interpolationAlgorithm = "LAGRANGE"
     pos.interpolationDegree = 5
-    pos.referenceFrame = "INERTIAL"
     pos.epoch = start_time.isoformat()
+    if reference_frame == 'CARTOGRAPHIC':
+        pos.cartographicDegrees = samples
+    else:
+        pos.referenceFrame = "FIXED"
+        pos.cartesian = samples
+    return pos
 
+
+def create_converted_positions(satellites, start_time, end_time, reference_frame,
+                               time_step=TIME_STEP, time_grid=None, model=czml):
+    '''
+    Propagates the satellites and converts every sample out of TEME in vectorized passes
+    sharing one sidereal time grid, returns a position per satellite
+    '''
+    # numpy is only needed, and only imported, when converting frames
+    import numpy as np
+    from . import frames
+
+    if time_grid is None:
+        time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                             time_step)
+    number_of_positions = len(time_grid)
+    julian_dates = time_grid.julian_dates
+    if reference_frame == 'CARTOGRAPHIC':
+        convert = frames.teme_samples_to_cartographic
+    else:
+        convert = frames.teme_samples_to_fixed
+
+    positions = []
+    memo = {}
+    for first in range(0, len(satellites), FRAME_CHUNK_SIZE):
+        chunk = satellites[first:first + FRAME_CHUNK_SIZE]
+        with stage('propagate'):
+            samples = sample_satellites(chunk, time_grid, memo)
+        with stage('transform'):
+            converted = convert(np.reshape(samples, (len(chunk), number_of_positions, 4)),
+                                julian_dates)
+            positions.extend(create_converted_position(time_grid.start_time, sat_samples,
+                                                       reference_frame, model)
+                             for sat_samples in converted.reshape(len(chunk), -1).tolist())
+    return positions
+
+
+def get_number_of_positions(start_time, end_time, time_step=TIME_STEP):
+    'returns the number of samples needed to cover the interval'
     diff = end_time - start_time
-    number_of_positions = int(diff.total_seconds()/300)
+    number_of_positions = int(diff.total_seconds()/time_step)
     # so that there's more than one position
-    number_of_positions += 5
-    pos.cartesian = get_future_sat_positions(
-        tle, number_of_positions, start_time)
-    return pos
+    return number_of_positions + 5
 
 
 def get_interval(current_time, end_time):
@@ -237,25 +441,46 @@ def get_interval(current_time, end_time):
     return current_time.isoformat() + "/" + end_time.isoformat()
 
 
-def get_future_sat_positions(sat_tle, number_of_positions, start_time):
-    'returns an array of satellite positions'
-    time_step = 0
+def get_future_sat_positions(sat_tle, number_of_positions, start_time, time_step=TIME_STEP,
+                             time_grid=None):
+    'returns an array of satellite positions, sampled on time_grid when one is shared'
+    if time_grid is None:
+        time_grid = TimeGrid(start_time, number_of_positions, time_step)
     output = []
-    for _ in range(number_of_positions):
-        current_time = start_time + timedelta(seconds=time_step)
-        eci_position, _ = sat_tle.propagate(current_time.year, current_time.month, current_time.day,
-                                            current_time.hour, current_time.minute,
-                                            current_time.second)
+    for offset, tsince in zip(time_grid.offsets, time_grid.minutes_since_epoch(sat_tle)):
+        eci_position, _ = sgp4(sat_tle, tsince)
 
-        output.append(time_step)
+        output.append(offset)
         output.append(eci_position[0] * 1000)  # converts km's to m's
         output.append(eci_position[1] * 1000)
         output.append(eci_position[2] * 1000)
-        time_step += TIME_STEP
 
     return output
 
 
+def sample_satellites(satellites, time_grid, memo=None):
+    '''
+    returns get_future_sat_positions of every satellite on time_grid, propagating each
+    distinct pair of tle lines once and sharing its samples with the satellites repeating
+    it; memo, a dict, carries the samples from one call to the next on the same grid
+    '''
+    if memo is None:
+        memo = {}
+    samples = []
+    shared = 0
+    for sat in satellites:
+        lines = (sat.raw_tle[1], sat.raw_tle[2])
+        if lines in memo:
+            shared += 1
+        else:
+            memo[lines] = get_future_sat_positions(sat.tle_object, len(time_grid),
+                                                   time_grid.start_time, time_grid.time_step,
+                                                   time_grid)
+        samples.append(memo[lines])
+    increment('tle2czml_propagations_shared_total', shared)
+    return samples
+
+
 def get_satellite_orbit(raw_tle, sim_start_time, sim_end_time, czml_file_name):
     'returns orbit of the satellite'
     tle_sgp4 = twoline2rv(raw_tle[1], raw_tle[2], wgs72)
@@ -263,12 +488,8 @@ def get_satellite_orbit(raw_tle, sim_start_time, sim_end_time, czml_file_name):
     sat = Satellite(raw_tle, tle_sgp4, DEFAULT_RGBA)
     doc = create_czml_file(sim_start_time, sim_end_time)
 
-    if DEBUGGING:
-        print()
-        print('Satellite Name: ', sat.get_satellite_name)
-        print('TLE Epoch: ', sat.tle_epoch)
-        print('Orbit time in Minutes: ', sat.orbital_time_in_minutes)
-        print()
+    LOGGER.debug('Satellite Name: %s, TLE Epoch: %s, Orbit time in Minutes: %s',
+                 sat.sat_name, sat.tle_epoch, sat.orbital_time_in_minutes)
 
     sat_packet = create_satellite_packet(sat, sim_start_time, sim_end_time)
     doc.packets.append(sat_packet)
@@ -276,8 +497,11 @@ def get_satellite_orbit(raw_tle, sim_start_time, sim_end_time, czml_file_name):
         file.write(str(doc))
 
 
-def read_tles(tles: str, rgbs):
-    'reads tle from string'
+def read_tles(tles: str, rgbs, keep=None):
+    '''
+    reads tle from string, keep(index, raw_tle) can select the satellites parsed,
+    the others are skipped but still take their color
+    '''
     raw_tle = []
     sats = []
 
@@ -286,49 +510,235 @@ def read_tles(tles: str, rgbs):
         raw_tle.append(line)
 
         if i % 3 == 0:
-            tle_object = twoline2rv(raw_tle[1], raw_tle[2], wgs72)
-            sats.append(Satellite(raw_tle, tle_object, rgbs.get_next_color()))
+            rgba = rgbs.get_next_color()
+            if keep is None or keep(i // 3 - 1, raw_tle):
+                tle_object = twoline2rv(raw_tle[1], raw_tle[2], wgs72)
+                sats.append(Satellite(raw_tle, tle_object, rgba))
             raw_tle = []
         i += 1
 
     return sats
 
 
-def tles_to_czml(tles, start_time=None, end_time=None, silent=False):
+def count_tles(tles: str, keep=None):
+    '''returns the number of satellites in a tle string, those keep(index, raw_tle) selects
+    when given, without parsing them'''
+    lines = tles.splitlines()
+    if keep is None:
+        return len(lines) // 3
+    return sum(1 for index in range(len(lines) // 3)
+               if keep(index, lines[3 * index:3 * index + 3]))
+
+
+def catalog_number(field):
+    'returns the NORAD catalog number written as field, decoding alpha 5 numbers like A0001'
+    field = field.strip()
+    if field[:1].isalpha():
+        if len(field) != 5 or not field[1:].isdigit():
+            raise ValueError('invalid alpha 5 catalog number: {!r}'.format(field))
+        return (ALPHA5_DIGITS.index(field[0].upper()) + 10) * 10000 + int(field[1:])
+    return int(field)
+
+
+def norad_id(raw_tle):
+    'returns the NORAD catalog number of a tle, decoding alpha 5 numbers'
+    return catalog_number(raw_tle[1][2:7])
+
+
+def tle_epoch(raw_tle):
+    'returns the epoch of a tle as (year, day of the year), ordered as the epochs are'
+    year = int(raw_tle[1][18:20])
+    # two digit years from 57 on are the 1900s
+    return (year + (1900 if year >= 57 else 2000), float(raw_tle[1][20:32]))
+
+
+def deduplicate_tles(tles: str):
+    '''
+    returns tles with every NORAD catalog number once, in the place it first appears and with
+    its newest epoch, and the number of tles collapsed; tles without duplicates are returned
+    as they are, and tles whose number or epoch cannot be read are kept
+    '''
+    lines = tles.splitlines()
+    entries = [lines[index:index + 3] for index in range(0, len(lines) - 2, 3)]
+    # NORAD catalog number to the index of the entry kept for it, in the order first seen
+    kept = {}
+    for index, raw_tle in enumerate(entries):
+        try:
+            key = norad_id(raw_tle)
+            epoch = tle_epoch(raw_tle)
+        except (ValueError, IndexError):
+            # kept apart from every other tle
+            key, epoch = ('unread', index), None
+        if key not in kept:
+            kept[key] = index
+        elif epoch > tle_epoch(entries[kept[key]]):
+            kept[key] = index
+    collapsed = len(entries) - len(kept)
+    if not collapsed:
+        return tles, 0
+    return ''.join('\n'.join(entries[index]) + '\n' for index in kept.values()), collapsed
+
+
+def select_satellites(page=None, page_size=PAGE_SIZE, norad_ids=None):
+    '''
+    returns the read_tles keep function selecting page, counted from 0, of the catalog
+    split into pages of page_size satellites, and or the satellites whose NORAD catalog
+    numbers are within the inclusive (first, last) norad_ids, None to keep them all
+    '''
+    if page is None and norad_ids is None:
+        return None
+
+    def keep(index, raw_tle):
+        if page is not None and index // page_size != page:
+            return False
+        if norad_ids is not None:
+            try:
+                number = norad_id(raw_tle)
+            except (ValueError, IndexError):
+                return False
+            return norad_ids[0] <= number <= norad_ids[1]
+        return True
+    return keep
+
+
+def report_collapsed(collapsed, silent=False):
+    'counts, and unless silent logs, the satellites deduplicate_tles collapsed'
+    increment('tle2czml_satellites_collapsed_total', collapsed)
+    if collapsed and not silent:
+        LOGGER.info('Collapsed %s satellites repeating a NORAD catalog number', collapsed)
+
+
+def tles_to_czml(tles, start_time=None, end_time=None, silent=False, time_step=TIME_STEP,
+                 reference_frame='INERTIAL', compact=False, templated=False, ground_tracks=False,
+                 footprint_half_angle=None, overview=False, labels=True, orbit_rings=False,
+                 ring_vertices=ORBIT_RING_VERTICES, page=None, page_size=PAGE_SIZE,
+                 norad_ids=None, deduplicate=True):
     """
     Converts the contents of a TLE file to CZML and returns the JSON as a string
+
+    Each satellite is logged at DEBUG level on the module logger unless silent is set.
+    reference_frame is one of REFERENCE_FRAMES: INERTIAL positions are SGP4's TEME vectors,
+    FIXED and CARTOGRAPHIC are converted server side so clients need not transform them.
+    compact builds the document from the slotted compact model, which writes the same JSON
+    in a fraction of the memory. templated skips the object model and splices each
+    satellite's fields into JSON templated once per document, again writing the same JSON.
+    ground_tracks adds each satellite's ground track as a polyline, and footprint_half_angle,
+    the half angle in degrees of a nadir pointing sensor, its footprint as an ellipse.
+    overview draws each satellite as a point instead of a billboard with a path, a fraction
+    of the document for large catalogs, and labels=False leaves out the name labels.
+    orbit_rings draws one orbit of each satellite through ring_vertices inertial vertices in
+    place of the path, static lines the client need not recompute as time passes.
+    page, counted from 0, and norad_ids, an inclusive (first, last) range of NORAD catalog
+    numbers, limit the document to those satellites, each page a document of its own that
+    clients can load in parallel. Only the selected satellites are parsed and propagated,
+    and they keep the colors they have in the whole catalog.
+    deduplicate keeps one satellite per NORAD catalog number, the one with the newest epoch,
+    before the catalog is paged, since repeated satellites would repeat their packet ids.
+    Satellites repeating the same tle lines are propagated once either way.
     """
+    if reference_frame not in REFERENCE_FRAMES:
+        raise ValueError('reference_frame must be one of {}'.format(', '.join(REFERENCE_FRAMES)))
+    if orbit_rings and ground_tracks:
+        raise ValueError('orbit_rings and ground_tracks both draw the polyline, choose one')
+    if orbit_rings and ring_vertices < 3:
+        raise ValueError('ring_vertices must be at least 3')
+    if page is not None and (page < 0 or page_size < 1):
+        raise ValueError('page must be at least 0 and page_size at least 1')
+
     rgbs = Colors()
-    satellite_array = read_tles(tles, rgbs)
+    with stage('parse'):
+        if deduplicate:
+            tles, collapsed = deduplicate_tles(tles)
+            report_collapsed(collapsed, silent)
+        satellite_array = read_tles(tles, rgbs, select_satellites(page, page_size, norad_ids))
+    increment('tle2czml_satellites_processed_total', len(satellite_array))
 
     if not start_time:
-        start_time = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start_time = datetime.now(timezone.utc)
 
     if not end_time:
         end_time = start_time + timedelta(hours=24)
 
-    doc = create_czml_file(start_time, end_time)
-
-    for sat in satellite_array:
-        sat_name = sat.sat_name
-        orbit_time_in_minutes = sat.orbital_time_in_minutes
-        tle_epoch = sat.tle_epoch
-
-        if not silent:
-            print()
-            print('Satellite Name: ', sat_name)
-            print('TLE Epoch: ', tle_epoch)
-            print('Orbit time in Minutes: ', orbit_time_in_minutes)
-            print()
-
-        sat_packet = create_satellite_packet(sat, start_time, end_time)
+    debug = not silent and LOGGER.isEnabledFor(logging.DEBUG)
+    time_grid = TimeGrid(start_time, get_number_of_positions(start_time, end_time, time_step),
+                         time_step)
+    if ground_tracks or footprint_half_angle is not None:
+        track_lists, radius_lists = create_coverage(satellite_array, time_grid,
+                                                    footprint_half_angle)
+        if not ground_tracks:
+            track_lists = [None] * len(satellite_array)
+    else:
+        track_lists = radius_lists = [None] * len(satellite_array)
+    if orbit_rings:
+        ring_lists = create_orbit_rings(satellite_array, time_grid, ring_vertices)
+    else:
+        ring_lists = [None] * len(satellite_array)
+
+    if templated:
+        return create_templated_czml(satellite_array, start_time, end_time, time_step,
+                                     time_grid, reference_frame, debug, track_lists,
+                                     radius_lists, overview, labels, ring_lists)
+
+    model = compact_model if compact else czml
+    doc = create_czml_file(start_time, end_time, model)
+
+    if reference_frame == 'INERTIAL':
+        with stage('propagate'):
+            positions = [create_position(start_time, end_time, sat.tle_object, time_step,
+                                         time_grid, model, samples)
+                         for sat, samples in zip(satellite_array,
+                                                 sample_satellites(satellite_array, time_grid))]
+    else:
+        positions = create_converted_positions(satellite_array, start_time, end_time,
+                                               reference_frame, time_step, time_grid, model)
+
+    for sat, position, track, radii, ring in zip(satellite_array, positions, track_lists,
+                                                 radius_lists, ring_lists):
+        if debug:
+            LOGGER.debug('Satellite Name: %s, TLE Epoch: %s, Orbit time in Minutes: %s',
+                         sat.sat_name, sat.tle_epoch, sat.orbital_time_in_minutes)
+
+        sat_packet = create_satellite_packet(sat, start_time, end_time, time_step, position,
+                                             time_grid, model, track, radii, overview, labels,
+                                             ring)
 
         doc.packets.append(sat_packet)
 
-    return str(doc)
-
-
-def create_czml(inputfile_path, outputfile_path=None, start_time=None, end_time=None):
+    with stage('encode'):
+        return serializer.dumps(doc)
+
+
+def create_templated_czml(satellites, start_time, end_time, time_step, time_grid,
+                          reference_frame, debug=False, track_lists=None, radius_lists=None,
+                          overview=False, labels=True, ring_lists=None):
+    'returns the CZML of tles_to_czml rendered from packet templates instead of objects'
+    # only imported when rendering from templates
+    from . import templates
+
+    if debug:
+        for sat in satellites:
+            LOGGER.debug('Satellite Name: %s, TLE Epoch: %s, Orbit time in Minutes: %s',
+                         sat.sat_name, sat.tle_epoch, sat.orbital_time_in_minutes)
+
+    if reference_frame == 'INERTIAL':
+        with stage('propagate'):
+            sample_lists = sample_satellites(satellites, time_grid)
+    else:
+        sample_lists = [position.cartesian or position.cartographicDegrees
+                        for position in create_converted_positions(
+                            satellites, start_time, end_time, reference_frame, time_step,
+                            time_grid, compact_model)]
+
+    with stage('encode'):
+        return templates.render_satellites(satellites, sample_lists, start_time, end_time,
+                                           time_step, time_grid, reference_frame, track_lists,
+                                           radius_lists, overview, labels, ring_lists)
+
+
+def create_czml(inputfile_path, outputfile_path=None, start_time=None, end_time=None,
+                time_step=TIME_STEP, reference_frame='INERTIAL', compact=False, templated=False,
+                ground_tracks=False, footprint_half_angle=None, overview=False, labels=True,
+                orbit_rings=False, ring_vertices=ORBIT_RING_VERTICES):
     """
     Takes in a file of TLE's and returns a CZML file visualising their orbits.
     """
@@ -336,13 +746,26 @@ def create_czml(inputfile_path, outputfile_path=None, start_time=None, end_time=
     with open(inputfile_path, 'r') as tle_src:
         #print(tle_src.read())
         doc = tles_to_czml(
-            tle_src.read(), start_time=start_time, end_time=end_time)
+            tle_src.read(), start_time=start_time, end_time=end_time, time_step=time_step,
+            reference_frame=reference_frame, compact=compact, templated=templated,
+            ground_tracks=ground_tracks, footprint_half_angle=footprint_half_angle,
+            overview=overview, labels=labels, orbit_rings=orbit_rings,
+            ring_vertices=ring_vertices)
         if not outputfile_path:
             outputfile_path = "orbit.czml"
         with open(outputfile_path, 'w') as file:
             file.write(str(doc))
     
 
-def db_create_czml(inputData, start_time=None, end_time=None):
-    doc=tles_to_czml(inputData, start_time=start_time, end_time=end_time)
+def db_create_czml(inputData, start_time=None, end_time=None, reference_frame='INERTIAL',
+                   compact=False, templated=False, ground_tracks=False,
+                   footprint_half_angle=None, overview=False, labels=True, orbit_rings=False,
+                   ring_vertices=ORBIT_RING_VERTICES, page=None, page_size=PAGE_SIZE,
+                   norad_ids=None, time_step=TIME_STEP, deduplicate=True):
+    doc=tles_to_czml(inputData, start_time=start_time, end_time=end_time, time_step=time_step,
+                     reference_frame=reference_frame, compact=compact, templated=templated,
+                     ground_tracks=ground_tracks, footprint_half_angle=footprint_half_angle,
+                     overview=overview, labels=labels, orbit_rings=orbit_rings,
+                     ring_vertices=ring_vertices, page=page, page_size=page_size,
+                     norad_ids=norad_ids, deduplicate=deduplicate)
     return str(doc)
\ No newline at end of file
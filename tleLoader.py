@@ -0,0 +1,253 @@
+''' loads TLE files into the spaceObjectTle table in batches
+
+Each TLE is stored as a line 1 row and a line 2 row, in the columns retrieve_tle_entries
+reassembles them from, one element set per satellite. A newer element set replaces the
+rows stored of its satellite in the transaction inserting it, while TLEs no newer than
+the one stored are skipped, so loading the same file again changes nothing, and a load
+that failed part way can be run again to load the rest:
+
+    python tleLoader.py catalog.tle --batch-size 2000
+
+With --history every element set is kept whole in spaceObjectTleHistory instead, by
+catalog number and epoch, for the routes replaying a past time.
+'''
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+
+from tle2czmlMaster.tle2czml.instrumentation import INSTRUMENTATION, stage
+from tle2czmlMaster.tle2czml.tle2czml import (Colors, count_tles, deduplicate_tles, norad_id,
+                                              read_tles)
+
+INSTRUMENTATION.describe('db_rows_written_total', 'Rows inserted into the spaceObjectTle table.')
+
+LOGGER = logging.getLogger(__name__)
+
+# TLEs inserted and committed together
+BATCH_SIZE = 1000
+INSERT_QUERY = ("INSERT INTO spaceObjectTle (LineNumber, NoradCatID, InternationalDesignator, "
+                "Epoch, Motion, MeanMotion, RadPressureCoef, Element) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+STORED_QUERY = "SELECT NoradCatID, Epoch FROM spaceObjectTle WHERE LineNumber = 1"
+DELETE_QUERY = "DELETE FROM spaceObjectTle WHERE NoradCatID = ?"
+HISTORY_INSERT_QUERY = ("INSERT INTO spaceObjectTleHistory (NoradCatID, EpochTime, Name, Line1, "
+                        "Line2) VALUES (?, ?, ?, ?, ?)")
+HISTORY_STORED_QUERY = "SELECT NoradCatID, EpochTime FROM spaceObjectTleHistory"
+
+
+def tle_rows(raw_tle):
+    '''returns the line 1 and line 2 rows of a tle, line 2 keeps inclination, right ascension,
+    eccentricity, argument of perigee and mean anomaly in the columns following NoradCatID;
+    fixed width fields keep their padding, so they are reassembled where they were read'''
+    line1, line2 = raw_tle[1], raw_tle[2]
+    return [(1, line1[2:7], line1[9:17].strip(), line1[18:32], line1[33:43].strip(),
+             line1[44:52].strip(), line1[53:61].strip(), line1[64:69]),
+            (2, line2[2:7], line2[8:16], line2[17:25], line2[26:33], line2[34:42],
+             line2[43:51], line2[52:69])]
+
+
+def epoch_time(epoch):
+    '''returns a YYDDD.DDDDDDDD epoch in seconds since 1970, the same whether the Epoch
+    column holds text or numbers'''
+    epoch = '{:014.8f}'.format(float(epoch))
+    year = int(epoch[:2])
+    # two digit years from 57 are the 1900s, as in the TLE format
+    year += 1900 if year >= 57 else 2000
+    start_of_year = datetime(year, 1, 1, tzinfo=timezone.utc)
+    return start_of_year.timestamp() + (float(epoch[2:]) - 1) * 86400.0
+
+
+def tle_epoch_time(line1):
+    'returns the epoch of a tle line 1 in seconds since 1970'
+    return epoch_time(line1[18:32])
+
+
+def history_rows(raw_tle):
+    'returns the spaceObjectTleHistory row of a tle'
+    return [(norad_id(raw_tle), tle_epoch_time(raw_tle[1]), raw_tle[0].strip(),
+             raw_tle[1].rstrip(), raw_tle[2].rstrip())]
+
+
+def history_key(norad, epoch_time):
+    'returns the key a TLE is stored under in spaceObjectTleHistory'
+    return int(norad), round(float(epoch_time), 3)
+
+
+def norad_key(norad):
+    '''returns the key a satellite is stored under, the same whether the NoradCatID column
+    holds text or numbers'''
+    return str(norad).strip().zfill(5)
+
+
+class LoadReport:
+    '''
+    How many TLEs a load read, inserted and skipped, and how long it took
+    '''
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.rows = 0
+        self.replaced = 0
+        self.stored = 0
+        self.repeated = 0
+        self.batches = 0
+        self.seconds = 0.0
+        # of seconds, those spent inserting and committing
+        self.insert_seconds = 0.0
+
+    def rows_per_second(self):
+        'returns the rows inserted per second'
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return ('{} TLEs read, {} inserted in {} batches, {} of them replacing older ones, '
+                '{} already stored, {} repeated in the file; {:.2f} s, {:.2f} s inserting, '
+                '{:.0f} rows/s').format(
+                    self.read, self.inserted, self.batches, self.replaced, self.stored,
+                    self.repeated, self.seconds, self.insert_seconds, self.rows_per_second())
+
+
+def load_tles(tles, conn, batch_size=BATCH_SIZE, history=False):
+    '''loads the newest TLE of each satellite in a tle string into the spaceObjectTle table
+    of conn, unless as new a one is stored, or every TLE not yet stored into the
+    spaceObjectTleHistory table if history, committing every batch_size TLEs, and returns
+    a LoadReport'''
+    report = LoadReport()
+    started = time.perf_counter()
+    report.read = count_tles(tles)
+    cursor = conn.cursor()
+    with stage('db_query'):
+        cursor.execute(HISTORY_STORED_QUERY if history else STORED_QUERY)
+        stored_rows = cursor.fetchall()
+    # the NoradCatID values of the satellites whose rows a TLE replaces, by norad_key
+    replaced = {}
+    if history:
+        insert_query, rows_of = HISTORY_INSERT_QUERY, history_rows
+        keep = history_filter(stored_rows, report)
+    else:
+        insert_query, rows_of = INSERT_QUERY, tle_rows
+        tles, report.repeated = deduplicate_tles(tles)
+        keep = newer_filter(stored_rows, report, replaced)
+
+    with stage('tle_parse'):
+        satellites = read_tles(tles, Colors(), keep)
+
+    for first in range(0, len(satellites), batch_size):
+        batch = satellites[first:first + batch_size]
+        rows = [row for sat in batch for row in rows_of(sat.raw_tle)]
+        keys = [norad_key(sat.raw_tle[1][2:7]) for sat in batch]
+        deletes = [(norad,) for key in keys for norad in replaced.get(key, ())]
+        insert_batch(conn, cursor, insert_query, rows, report, deletes)
+        report.inserted += len(batch)
+        report.replaced += sum(1 for key in keys if key in replaced)
+    report.seconds = time.perf_counter() - started
+    LOGGER.info('Loaded TLEs: %s', report)
+    return report
+
+
+def newer_filter(stored_rows, report, replaced):
+    '''returns the read_tles keep function skipping the TLEs no newer than the element set
+    stored of their satellite, among the (NoradCatID, Epoch) stored_rows, and recording in
+    replaced the NoradCatID values of the satellites whose rows the others replace'''
+    # the epochs stored of each satellite and the NoradCatID values they are stored under
+    stored = {}
+    for norad, epoch in stored_rows:
+        epochs, values = stored.setdefault(norad_key(norad), ([], set()))
+        epochs.append(round(epoch_time(epoch), 3))
+        values.add(norad)
+
+    def keep(index, raw_tle):
+        'parses only the TLEs newer than the one stored'
+        key = norad_key(raw_tle[1][2:7])
+        if key in stored:
+            epochs, values = stored[key]
+            epoch = round(tle_epoch_time(raw_tle[1]), 3)
+            # several element sets stored, as loaded before sets were replaced, are
+            # rewritten with the newest one
+            if max(epochs) > epoch or (max(epochs) == epoch and len(epochs) == 1):
+                report.stored += 1
+                return False
+            replaced[key] = values
+        return True
+    return keep
+
+
+def history_filter(stored_rows, report):
+    '''returns the read_tles keep function skipping the TLEs among the (NoradCatID,
+    EpochTime) stored_rows or earlier in the file'''
+    stored = set(history_key(norad, epoch) for norad, epoch in stored_rows)
+    seen = set()
+
+    def keep(index, raw_tle):
+        'parses only the TLEs neither stored nor earlier in the file'
+        key = history_key(norad_id(raw_tle), tle_epoch_time(raw_tle[1]))
+        if key in stored:
+            report.stored += 1
+            return False
+        if key in seen:
+            report.repeated += 1
+            return False
+        seen.add(key)
+        return True
+    return keep
+
+
+def insert_batch(conn, cursor, query, rows, report, deletes=()):
+    '''deletes the rows of the NoradCatID values in deletes and inserts rows with query in
+    one transaction, rolling it back if any row fails'''
+    started = time.perf_counter()
+    try:
+        with stage('db_insert'):
+            if deletes:
+                cursor.executemany(DELETE_QUERY, deletes)
+            cursor.executemany(query, rows)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    report.insert_seconds += time.perf_counter() - started
+    INSTRUMENTATION.increment('db_rows_written_total', len(rows))
+    report.rows += len(rows)
+    report.batches += 1
+
+
+def main(argv=None):
+    'loads the TLE files given on the command line into the database'
+    # imported here so the loader can be used with other connections without mariadb
+    import spaceObjectsDataAccess
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('files', nargs='+', help='TLE files, a name line before each TLE')
+    arg_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='TLEs inserted per transaction (default: %(default)s)')
+    arg_parser.add_argument('--history', action='store_true',
+                            help='add the TLEs to spaceObjectTleHistory, for /getData?time=')
+    args = arg_parser.parse_args(argv)
+    if args.batch_size < 1:
+        arg_parser.error('--batch-size must be at least 1')
+
+    try:
+        conn = spaceObjectsDataAccess.connect_database()
+    except spaceObjectsDataAccess.mariadb.Error as error:
+        print(spaceObjectsDataAccess.CONNECTION_ERROR + ': ' + str(error), file=sys.stderr)
+        return 1
+    try:
+        if args.history:
+            spaceObjectsDataAccess.create_history_table(conn)
+        else:
+            spaceObjectsDataAccess.create_indexes(conn)
+        for file_name in args.files:
+            with open(file_name, 'r') as tle_file:
+                report = load_tles(tle_file.read(), conn, args.batch_size, args.history)
+            print('{}: {}'.format(file_name, report))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())